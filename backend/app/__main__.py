@@ -1,12 +1,66 @@
+from __future__ import annotations
+
+import argparse
+import os
+from pathlib import Path
+from typing import Optional, Sequence
+
 import uvicorn
 
+from .config import get_settings
+from .retrieval.shared_segment import prepare_shared_index, segment_path_for
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the WAFR chatbot API.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes. More than one disables auto-reload.",
+    )
+    parser.add_argument(
+        "--shared-index",
+        action="store_true",
+        help=(
+            "Pack EMBEDDINGS_FILE into a memory-mapped segment before the workers start "
+            "and serve from it, so the matrix and texts are held once per node."
+        ),
+    )
+    parser.add_argument(
+        "--segment",
+        type=Path,
+        default=None,
+        help="Segment location (defaults to EMBEDDINGS_FILE with a .segment suffix).",
+    )
+    parser.add_argument(
+        "--prepare-only",
+        action="store_true",
+        help="Build or refresh the segment and exit; running workers pick it up on reload.",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
+    if args.shared_index or args.prepare_only:
+        settings = get_settings()
+        segment = args.segment or segment_path_for(settings.embeddings_file)
+        rebuilt = prepare_shared_index(settings.embeddings_file, segment)
+        print(f"{'Wrote' if rebuilt else 'Reusing'} shared index segment {segment}")
+        if args.prepare_only:
+            return
+        # Workers are spawned, not forked, so the setting travels through the environment.
+        os.environ["SHARED_INDEX_PATH"] = str(segment)
 
-def main() -> None:
     uvicorn.run(
         "app.main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        reload=args.workers == 1,
         factory=False,
     )
 
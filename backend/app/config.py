@@ -1,6 +1,6 @@
 from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Literal, Optional, Union
 
 from pydantic import HttpUrl, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -12,9 +12,16 @@ class Settings(BaseSettings):
         "Backend service for the AWS Well-Architected Framework chatbot."
     )
     api_version: str = "0.1.0"
+    # Load the model and store after the server starts accepting connections; `/ready`
+    # reports 503 (and chat endpoints refuse requests) until loading finishes.
+    startup_background_load: bool = False
+    # Run one probe query through the embedder and store before reporting ready.
+    startup_warmup: bool = True
 
     # CORS
-    frontend_origins: List[str] = [
+    # Comma-separated in the environment; the `str` member makes pydantic-settings hand the
+    # raw value to `_split_origins` instead of failing to decode it as JSON.
+    frontend_origins: Union[List[str], str] = [
         "http://localhost:5173",
         "http://127.0.0.1:5173",
     ]
@@ -23,13 +30,87 @@ class Settings(BaseSettings):
     scraper_output_dir: Path = Path(__file__).resolve().parents[2] / "data" / "raw"
     scraper_concurrency: int = 3
     scraper_request_timeout: float = 15.0
+    # Per-host politeness: token bucket of this many requests/second with small bursts.
+    scraper_host_rate: float = 2.0
+    scraper_host_burst: int = 3
+    # Retries on network errors, 429 and 5xx (exponential backoff, Retry-After honoured up
+    # to the max delay so a hostile header cannot stall a worker for hours).
+    scraper_max_retries: int = 3
+    scraper_retry_backoff: float = 1.0
+    scraper_retry_max_delay: float = 60.0
+    # Crawl mode: link hops from the roots and pages saved per crawl.
+    scraper_crawl_max_depth: int = 3
+    scraper_crawl_max_pages: int = 500
 
     # Retrieval + embeddings
     embeddings_file: Path = (
         Path(__file__).resolve().parents[2] / "data" / "processed" / "wafr_chunks_with_embeddings.jsonl"
     )
+    # Serve from this memory-mapped index segment instead of `embeddings_file`, so all
+    # workers share one copy of the matrix and texts. `python -m app --shared-index`
+    # builds it and sets this for the workers (`--prepare-only` just refreshes it).
+    shared_index_path: Optional[Path] = None
+    # Poll the index source (`embeddings_file` or `shared_index_path`) this often and
+    # hot-swap the in-memory index when it changes; 0 disables watching
+    # (POST /admin/reload still works).
+    store_watch_interval_seconds: float = 5.0
+    # Required in the `X-Admin-Token` header by admin endpoints; unset disables them.
+    admin_token: Optional[str] = None
     embedding_model_name: str = "sentence-transformers/all-MiniLM-L6-v2"
     retrieval_top_k: int = 4
+    # Threads that run query encoding + retrieval for the async /chat path.
+    embedding_executor_workers: int = 4
+    # Micro-batch concurrent query encodes: flush after this many queries or this long.
+    # A max size of 1 disables batching.
+    embedding_batch_max_size: int = 16
+    embedding_batch_max_wait_ms: float = 5.0
+    # "exact" scores every chunk; "ivf" probes the nearest inverted lists only.
+    retrieval_backend: Literal["exact", "ivf"] = "exact"
+    # Lists probed per query with the IVF backend: higher = better recall, slower search.
+    retrieval_ivf_n_probe: int = 8
+    # "int8" scores against quantized codes, then rescores top_k * factor candidates in float32.
+    retrieval_quantization: Literal["none", "int8"] = "none"
+    retrieval_rescore_factor: int = 4
+    # Fuse BM25 lexical matches with dense results (reciprocal rank fusion).
+    retrieval_hybrid: bool = False
+    retrieval_hybrid_candidates: int = 20
+    retrieval_rrf_k: int = 60
+    # Maximal marginal relevance: 1.0 keeps the plain relevance order, lower values trade
+    # relevance for diversity among `retrieval_mmr_candidates` fetched candidates.
+    retrieval_mmr_lambda: float = 1.0
+    retrieval_mmr_candidates: int = 20
+    # Merge hits on consecutive chunks of one document into a single passage.
+    retrieval_merge_adjacent: bool = False
+
+    # Prompt token budget (None = unbounded). Context chunks are packed greedily by score;
+    # history keeps the newest turns within its share of the budget.
+    max_prompt_tokens: Optional[int] = 3000
+    prompt_history_max_share: float = 0.3
+
+    # Vector store: "memory" loads EMBEDDINGS_FILE; "elasticsearch" queries a shared index.
+    vector_store: Literal["memory", "elasticsearch"] = "memory"
+    elasticsearch_url: Optional[str] = None
+    elasticsearch_api_key: Optional[str] = None
+    elasticsearch_index: str = "wafr-chunks"
+    # Pooled connections per Elasticsearch node and per-request timeout (seconds).
+    elasticsearch_max_connections: int = 10
+    elasticsearch_request_timeout: float = 10.0
+    # kNN candidates examined per shard; higher = better recall, slower search.
+    elasticsearch_num_candidates: int = 100
+    # Vector size used when the API bootstraps a missing index.
+    elasticsearch_embedding_dims: int = 384
+
+    # Query embedding cache (entries keyed on normalised query text; size 0 disables)
+    query_cache_size: int = 1024
+    query_cache_ttl_seconds: Optional[float] = 3600.0
+
+    # LLM answer cache; invalidated whenever the embeddings file changes (size 0 disables).
+    # Not used with VECTOR_STORE=elasticsearch, whose index can change unnoticed.
+    answer_cache_size: int = 256
+    # Reuse an answer for a different query with the same context above this cosine similarity.
+    answer_cache_similarity_threshold: Optional[float] = None
+    # Optional SQLite file that persists cached answers across restarts.
+    answer_cache_path: Optional[Path] = None
 
     # LLM (DeepSeek)
     deepseek_api_key: Optional[str] = None
@@ -37,6 +118,25 @@ class Settings(BaseSettings):
     deepseek_model_name: str = "deepseek-chat"
     deepseek_temperature: float = 0.2
     deepseek_max_output_tokens: int = 600
+    deepseek_timeout: float = 30.0
+    # Upper bound on concurrent upstream connections held by the async client.
+    llm_max_connections: int = 200
+    # Idle keep-alive connections kept in the pool and how long they may idle (seconds).
+    llm_max_keepalive_connections: int = 50
+    llm_keepalive_expiry: float = 60.0
+    # Negotiate HTTP/2 when the optional `h2` package is installed.
+    llm_http2: bool = True
+    # Retries on 429/5xx/network errors: jittered exponential backoff, Retry-After honoured.
+    llm_max_retries: int = 2
+    llm_retry_base_delay: float = 0.25
+    llm_retry_max_delay: float = 8.0
+    # Hedge a request still pending after this latency percentile (None disables hedging).
+    llm_hedge_percentile: Optional[float] = None
+    llm_hedge_min_samples: int = 20
+    # Consecutive failures that open the circuit; answers fall back to the top matches
+    # preview until the reset window passes.
+    llm_circuit_failure_threshold: int = 5
+    llm_circuit_reset_seconds: float = 30.0
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
@@ -47,6 +147,22 @@ class Settings(BaseSettings):
             return [item.strip() for item in value.split(",") if item.strip()]
         return value
 
+    @field_validator("shared_index_path", "llm_hedge_percentile", mode="before")
+    @classmethod
+    def _empty_as_none(cls, value: object) -> object:
+        # `KEY=` in an env file means "unset", not an empty number or path.
+        if isinstance(value, str) and not value.strip():
+            return None
+        return value
+
+    @field_validator("shared_index_path")
+    @classmethod
+    def _segment_is_a_file(cls, value: Optional[Path]) -> Optional[Path]:
+        # A missing segment is fine (the launcher or the reloader picks it up later).
+        if value is not None and value.exists() and not value.is_file():
+            raise ValueError(f"SHARED_INDEX_PATH must point to a segment file, got {value}")
+        return value
+
 
 @lru_cache
 def get_settings() -> Settings:
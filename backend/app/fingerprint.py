@@ -0,0 +1,12 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+
+def file_fingerprint(path: Path) -> str:
+    """Cheap change marker for a file: modification time and size."""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return "missing"
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
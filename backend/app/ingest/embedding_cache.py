@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Mapping, Optional
+
+import numpy as np
+
+from ..retrieval.binary_index import load_binary_index
+
+CONTENT_HASH_FIELD = "content_hash"
+
+
+def content_hash(text: str, model_name: str) -> str:
+    """Identity of an embedding: the chunk text and the model that encodes it."""
+    return hashlib.sha256(f"{model_name}\x00{text}".encode("utf-8")).hexdigest()
+
+
+@dataclass
+class EmbeddingStats:
+    """How many vectors a run reused versus computed."""
+
+    reused: int = 0
+    computed: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.reused + self.computed
+
+
+class PreviousEmbeddings:
+    """Vectors from the last `file`/`npy` output, looked up by content hash.
+
+    `.npy` outputs stay memory-mapped, so only the reused rows are read from disk.
+    Records written before content hashes were stored are ignored.
+    """
+
+    def __init__(self, vectors: Mapping[str, int], matrix: np.ndarray | list) -> None:
+        self._rows = dict(vectors)
+        self._matrix = matrix
+
+    @classmethod
+    def load(cls, output_path: Path) -> "PreviousEmbeddings":
+        if not output_path.exists():
+            return cls({}, [])
+        if output_path.suffix == ".npy":
+            try:
+                matrix, records = load_binary_index(output_path)
+            except (FileNotFoundError, ValueError):
+                return cls({}, [])
+            rows = {
+                record[CONTENT_HASH_FIELD]: row
+                for row, record in enumerate(records)
+                if CONTENT_HASH_FIELD in record
+            }
+            return cls(rows, matrix)
+
+        rows: dict[str, int] = {}
+        vectors: list[list[float]] = []
+        with output_path.open(encoding="utf-8") as stream:
+            for line in stream:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if CONTENT_HASH_FIELD in record and "embedding" in record:
+                    rows[record[CONTENT_HASH_FIELD]] = len(vectors)
+                    vectors.append(record["embedding"])
+        return cls(rows, vectors)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get(self, key: str) -> Optional[list[float]]:
+        row = self._rows.get(key)
+        if row is None:
+            return None
+        vector = self._matrix[row]
+        return vector.tolist() if hasattr(vector, "tolist") else list(vector)
+
+
+class EmbeddingCache:
+    """Local SQLite store of vectors keyed by content hash, shared across runs and writers."""
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path))
+        self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+
+    def get(self, key: str) -> Optional[list[float]]:
+        row = self._db.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return np.frombuffer(row[0], dtype=np.float32).tolist()
+
+    def put_many(self, items: Iterable[tuple[str, list[float]]]) -> None:
+        self._db.executemany(
+            "INSERT OR REPLACE INTO embeddings VALUES (?, ?)",
+            ((key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items),
+        )
+        self._db.commit()
+
+    def close(self) -> None:
+        self._db.close()
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
+import os
 import re
 from dataclasses import dataclass
 from pathlib import Path
@@ -9,6 +11,11 @@ from typing import Iterable, Iterator, Sequence
 
 from ..config import get_settings
 from .chunker import TextChunk, chunk_text
+from .tokenizer import count_tokens
+
+# Part of the manifest key: bump whenever `chunk_text` or `build_chunk_payloads` change
+# their output, so the next run rechunks everything instead of reusing stale chunks.
+CHUNK_FORMAT_VERSION = 1
 
 
 @dataclass
@@ -81,11 +88,52 @@ def build_chunk_payloads(
             "chunk_index": index,
             "text": chunk.content,
             "word_count": chunk.word_count,
+            "token_count": count_tokens(chunk.content),
             "summary": summary,
             "doc_type": document.doc_type,
         }
 
 
+def document_hash(document: RawDocument) -> str:
+    payload = "\x00".join([document.identifier, document.source, document.doc_type, document.content])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _manifest_path(output_path: Path) -> Path:
+    return output_path.with_suffix(".manifest.json")
+
+
+def load_previous_chunks(
+    output_path: Path, params: dict
+) -> tuple[dict[str, str], dict[str, list[tuple[int, int]]]]:
+    """Document hashes and the byte spans of each document's chunk lines in `output_path`,
+    from the last run with the same `params`. Only offsets are kept, not the lines."""
+
+    manifest_path = _manifest_path(output_path)
+    if not (output_path.exists() and manifest_path.exists()):
+        return {}, {}
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except ValueError:
+        return {}, {}
+    if manifest.get("params") != params:
+        return {}, {}
+
+    spans: dict[str, list[tuple[int, int]]] = {}
+    offset = 0
+    with output_path.open("rb") as stream:
+        for line in stream:
+            start, offset = offset, offset + len(line)
+            if not line.strip():
+                continue
+            document_spans = spans.setdefault(json.loads(line)["document_id"], [])
+            if document_spans and document_spans[-1][1] == start:
+                document_spans[-1] = (document_spans[-1][0], offset)
+            else:
+                document_spans.append((start, offset))
+    return manifest.get("documents", {}), spans
+
+
 def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
     settings = get_settings()
     parser = argparse.ArgumentParser(
@@ -115,6 +163,11 @@ def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
         default=40,
         help="Words of overlap between consecutive chunks (default: 40).",
     )
+    parser.add_argument(
+        "--rechunk-all",
+        action="store_true",
+        help="Chunk every document again instead of reusing chunks of unchanged documents.",
+    )
     return parser.parse_args(argv)
 
 
@@ -123,22 +176,69 @@ def run(argv: Sequence[str] | None = None) -> Path:
     args.output.mkdir(parents=True, exist_ok=True)
 
     output_path = args.output / "wafr_chunks.jsonl"
-    total_chunks = 0
+    params = {
+        "version": CHUNK_FORMAT_VERSION,
+        "chunk_size": args.chunk_size,
+        "overlap": args.overlap,
+    }
+    previous_hashes: dict[str, str] = {}
+    previous_spans: dict[str, list[tuple[int, int]]] = {}
+    if not args.rechunk_all:
+        previous_hashes, previous_spans = load_previous_chunks(output_path, params)
+
+    # Chunks stream into a temporary file; reused ones are copied from the previous output
+    # by byte span, so memory stays flat however large the corpus is.
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    hashes: dict[str, str] = {}
+    chunk_count = 0
+    rechunked = 0
+    previous = output_path.open("rb") if previous_spans else None
+    try:
+        with tmp_path.open("wb") as out:
+            for document in discover_documents(args.input):
+                if document.doc_type == "pdf":
+                    # PDFs require further processing (e.g. OCR) which is not implemented yet.
+                    continue
+                digest = document_hash(document)
+                hashes[document.identifier] = digest
+                spans = previous_spans.get(document.identifier)
+                if spans and previous_hashes.get(document.identifier) == digest:
+                    for start, end in spans:
+                        previous.seek(start)
+                        block = previous.read(end - start)
+                        out.write(block)
+                        chunk_count += block.count(b"\n")
+                    continue
+                rechunked += 1
+                for payload in build_chunk_payloads(
+                    document,
+                    chunk_size=args.chunk_size,
+                    overlap=args.overlap,
+                ):
+                    out.write((json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8"))
+                    chunk_count += 1
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    finally:
+        if previous is not None:
+            previous.close()
+
+    if rechunked == 0 and hashes == previous_hashes:
+        # Leave the output untouched so downstream steps see no change.
+        tmp_path.unlink()
+        print(f"No documents changed; {chunk_count} chunks unchanged -> {output_path}")  # noqa: T201
+        return output_path
+
+    os.replace(tmp_path, output_path)
+    _manifest_path(output_path).write_text(
+        json.dumps({"params": params, "documents": hashes}, indent=2) + "\n",
+        encoding="utf-8",
+    )
 
-    with output_path.open("w", encoding="utf-8") as writer:
-        for document in discover_documents(args.input):
-            if document.doc_type == "pdf":
-                # PDFs require further processing (e.g. OCR) which is not implemented yet.
-                continue
-            for payload in build_chunk_payloads(
-                document,
-                chunk_size=args.chunk_size,
-                overlap=args.overlap,
-            ):
-                writer.write(json.dumps(payload, ensure_ascii=False) + "\n")
-                total_chunks += 1
-
-    print(f"Generated {total_chunks} chunks -> {output_path}")  # noqa: T201
+    print(  # noqa: T201
+        f"Generated {chunk_count} chunks ({rechunked} of {len(hashes)} documents rechunked) -> {output_path}"
+    )
     return output_path
 
 
@@ -2,15 +2,32 @@ from __future__ import annotations
 
 import argparse
 import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from pathlib import Path
-from typing import Iterable, Iterator, Sequence
-
-from elasticsearch import Elasticsearch
+from typing import Iterable, Iterator, Optional, Sequence
 
 from ..config import get_settings
+from ..fingerprint import file_fingerprint
+from ..retrieval.ann import IVFIndex, IVFSearchBackend, ivf_path_for, measure_recall, sample_queries
+from ..retrieval.bm25 import BM25Index, bm25_path_for
+from ..retrieval.es_store import create_client as create_es_client
+from ..retrieval.in_memory_store import InMemoryVectorStore
+from .embedding_cache import (
+    CONTENT_HASH_FIELD,
+    EmbeddingCache,
+    EmbeddingStats,
+    PreviousEmbeddings,
+    content_hash,
+)
 from .generate_chunks import parse_args as parse_chunk_args, run as generate_chunks
-from .model_loader import get_embedding_model
+from .model_loader import EmbeddingModel, get_embedding_model
 from .writers import (
+    BinaryChunkWriter,
     ChunkWriter,
     ElasticsearchChunkWriter,
     FileChunkWriter,
@@ -26,28 +43,180 @@ def load_chunk_records(path: Path) -> Iterator[dict]:
             yield json.loads(line)
 
 
-def add_embeddings(records: Iterable[dict], model_name: str) -> Iterator[dict]:
-    model = get_embedding_model(model_name)
-    texts: list[str] = []
-    buffered: list[dict] = []
+# Reused records wait for the next encoded batch so output order is preserved; this caps
+# how many may be held back when almost everything is reused.
+MAX_PENDING_RECORDS = 1024
+# Batches queued per worker process; bounds memory while keeping every worker busy.
+MAX_IN_FLIGHT_PER_WORKER = 2
+
+_worker_model: Optional[EmbeddingModel] = None
+
+
+def _as_list(vector: object) -> list[float]:
+    return vector.tolist() if hasattr(vector, "tolist") else list(vector)
+
+
+def _init_worker(model_name: str, threads: int) -> None:
+    """Load the model once per worker process and stop workers oversubscribing the CPU."""
+    global _worker_model
+    _worker_model = get_embedding_model(model_name)
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(threads)
+
 
+def _encode_in_worker(texts: list[str]) -> list[list[float]]:
+    assert _worker_model is not None, "worker initialiser did not run"
+    return [_as_list(vector) for vector in _worker_model.encode(texts, convert_to_numpy=True)]
+
+
+def _plan_batches(
+    records: Iterable[dict],
+    model_name: str,
+    batch_size: int,
+    previous: Optional[PreviousEmbeddings],
+    cache: Optional[EmbeddingCache],
+    stats: EmbeddingStats,
+) -> Iterator[tuple[list[dict], list[dict]]]:
+    """Yield `(pending, missing)` groups: records in order, and those still needing a vector."""
+
+    pending: list[dict] = []
+    missing: list[dict] = []
     for record in records:
-        texts.append(record["text"])
-        buffered.append(record)
+        key = content_hash(record["text"], model_name)
+        record[CONTENT_HASH_FIELD] = key
+        vector = previous.get(key) if previous is not None else None
+        if vector is None and cache is not None:
+            vector = cache.get(key)
+
+        pending.append(record)
+        if vector is not None:
+            record["embedding"] = vector
+            stats.reused += 1
+        else:
+            missing.append(record)
+
+        if len(missing) >= batch_size or len(pending) >= MAX_PENDING_RECORDS:
+            yield pending, missing
+            pending, missing = [], []
+
+    if pending:
+        yield pending, missing
+
+
+def _store_vectors(
+    missing: list[dict],
+    vectors: Iterable[object],
+    cache: Optional[EmbeddingCache],
+    stats: EmbeddingStats,
+) -> None:
+    for payload, vector in zip(missing, vectors, strict=False):
+        payload["embedding"] = _as_list(vector)
+    if cache is not None:
+        cache.put_many((payload[CONTENT_HASH_FIELD], payload["embedding"]) for payload in missing)
+    stats.computed += len(missing)
+
+
+def add_embeddings(
+    records: Iterable[dict],
+    model_name: str,
+    *,
+    batch_size: int = 32,
+    workers: int = 1,
+    previous: Optional[PreviousEmbeddings] = None,
+    cache: Optional[EmbeddingCache] = None,
+    stats: Optional[EmbeddingStats] = None,
+) -> Iterator[dict]:
+    """Attach an `embedding` and `content_hash` to every record, in input order.
+
+    A record whose text (with `model_name`) hashes to a vector in `previous` output or in
+    the local `cache` reuses it; only the rest are encoded, `batch_size` at a time.
+
+    With `workers > 1`, batches are encoded by a process pool whose processes each load
+    the model once. At most `workers * MAX_IN_FLIGHT_PER_WORKER` batches are queued, and
+    results are yielded strictly in submission order.
+    """
+
+    if batch_size < 1:
+        raise ValueError("batch_size must be >= 1")
+    stats = stats if stats is not None else EmbeddingStats()
+    batches = _plan_batches(records, model_name, batch_size, previous, cache, stats)
+
+    if workers <= 1:
+        model = get_embedding_model(model_name)
+        for pending, missing in batches:
+            if missing:
+                vectors = model.encode([payload["text"] for payload in missing], convert_to_numpy=True)
+                _store_vectors(missing, vectors, cache, stats)
+            yield from pending
+        return
+
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    # "spawn" avoids forking a parent that may already hold torch/OpenMP thread pools.
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(model_name, threads),
+    ) as pool:
+        in_flight: deque[tuple[list[dict], list[dict], Optional[Future]]] = deque()
+        for pending, missing in batches:
+            future = None
+            if missing:
+                future = pool.submit(_encode_in_worker, [payload["text"] for payload in missing])
+            in_flight.append((pending, missing, future))
+            while len(in_flight) >= workers * MAX_IN_FLIGHT_PER_WORKER:
+                yield from _complete(in_flight.popleft(), cache, stats)
+        while in_flight:
+            yield from _complete(in_flight.popleft(), cache, stats)
+
+
+def _complete(
+    batch: tuple[list[dict], list[dict], Optional[Future]],
+    cache: Optional[EmbeddingCache],
+    stats: EmbeddingStats,
+) -> list[dict]:
+    pending, missing, future = batch
+    if future is not None:
+        _store_vectors(missing, future.result(), cache, stats)
+    return pending
+
+
+def build_ann_index(
+    chunks_file: Path,
+    *,
+    n_lists: int,
+    n_probe: int,
+    top_k: int = 4,
+    recall_queries: int = 200,
+) -> float:
+    """Build the IVF index next to `chunks_file` and report its recall against brute force."""
+
+    source_fingerprint = file_fingerprint(chunks_file)
+    embeddings = InMemoryVectorStore(chunks_file).embeddings
+    index = IVFIndex.build(embeddings, n_lists)
+    index_path = ivf_path_for(chunks_file)
+    index.save(index_path, source_fingerprint=source_fingerprint)
+
+    backend = IVFSearchBackend(embeddings, index, n_probe)
+    recall = measure_recall(embeddings, backend, sample_queries(embeddings, recall_queries), top_k)
+    print(  # noqa: T201
+        f"Built IVF index with {index.n_lists} lists -> {index_path} "
+        f"(recall@{top_k} vs brute force at n_probe={n_probe}: {recall:.3f})"
+    )
+    return recall
+
 
-        if len(texts) >= 32:
-            vectors = model.encode(texts, convert_to_numpy=True)
-            for payload, vector in zip(buffered, vectors, strict=False):
-                payload["embedding"] = vector.tolist() if hasattr(vector, "tolist") else list(vector)
-                yield payload
-            texts.clear()
-            buffered.clear()
+def build_bm25_index(chunks_file: Path) -> Path:
+    """Build the BM25 lexical index next to `chunks_file`, aligned with its rows."""
 
-    if texts:
-        vectors = model.encode(texts, convert_to_numpy=True)
-        for payload, vector in zip(buffered, vectors, strict=False):
-            payload["embedding"] = vector.tolist() if hasattr(vector, "tolist") else list(vector)
-            yield payload
+    # Fingerprint before reading, so a file replaced mid-build is not vouched for.
+    source_fingerprint = file_fingerprint(chunks_file)
+    index = BM25Index.build(InMemoryVectorStore(chunks_file).texts())
+    index_path = bm25_path_for(chunks_file)
+    index.save(index_path, source_fingerprint=source_fingerprint)
+    print(f"Built BM25 index over {len(index)} chunks -> {index_path}")  # noqa: T201
+    return index_path
 
 
 def create_writer(
@@ -56,16 +225,27 @@ def create_writer(
     output_path: Path,
     index_name: str,
     es_host: str | None,
+    es_bulk_docs: int = 500,
+    es_bulk_bytes: int = 5 * 1024 * 1024,
+    es_parallel: int = 4,
 ) -> ChunkWriter:
     if mode == "stdout":
         return StdoutChunkWriter()
     if mode == "file":
         return FileChunkWriter(output_path)
+    if mode == "npy":
+        return BinaryChunkWriter(output_path)
     if mode == "elasticsearch":
         if not es_host:
             raise ValueError("Elasticsearch host must be provided when using elasticsearch mode.")
-        client = Elasticsearch(es_host)
-        return ElasticsearchChunkWriter(client, index_name=index_name)
+        client = create_es_client(es_host, max_connections=es_parallel)
+        return ElasticsearchChunkWriter(
+            client,
+            index_name=index_name,
+            max_docs=es_bulk_docs,
+            max_bytes=es_bulk_bytes,
+            parallelism=es_parallel,
+        )
     raise ValueError(f"Unsupported writer mode: {mode}")
 
 
@@ -83,7 +263,7 @@ def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
     )
     parser.add_argument(
         "--writer",
-        choices=["stdout", "file", "elasticsearch"],
+        choices=["stdout", "file", "npy", "elasticsearch"],
         default="stdout",
         help="Where to send the enriched records.",
     )
@@ -91,13 +271,25 @@ def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
         "--output",
         type=Path,
         default=settings.scraper_output_dir.parent / "processed" / "wafr_chunks_with_embeddings.jsonl",
-        help="Output path when using the 'file' writer.",
+        help="Output path when using the 'file' or 'npy' writer ('npy' swaps the suffix for .npy).",
     )
     parser.add_argument(
         "--embedding-model",
         default="sentence-transformers/all-MiniLM-L6-v2",
         help="SentenceTransformer model identifier.",
     )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=32,
+        help="Chunks per model.encode call (default: 32).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Encoder processes; each loads the model once (default: 1, in-process).",
+    )
     parser.add_argument(
         "--es-host",
         default=None,
@@ -108,6 +300,52 @@ def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
         default="wafr-chunks",
         help="Target Elasticsearch index name.",
     )
+    parser.add_argument(
+        "--es-bulk-docs",
+        type=int,
+        default=500,
+        help="Documents per Elasticsearch bulk request (default: 500).",
+    )
+    parser.add_argument(
+        "--es-bulk-bytes",
+        type=int,
+        default=5 * 1024 * 1024,
+        help="Maximum NDJSON bytes per bulk request (default: 5 MiB).",
+    )
+    parser.add_argument(
+        "--es-parallel",
+        type=int,
+        default=4,
+        help="Concurrent bulk requests (default: 4).",
+    )
+    parser.add_argument(
+        "--ann-lists",
+        type=int,
+        default=0,
+        help="Build an IVF index with this many lists next to the 'file'/'npy' output (0 disables).",
+    )
+    parser.add_argument(
+        "--ann-probe",
+        type=int,
+        default=settings.retrieval_ivf_n_probe,
+        help="Lists probed when measuring IVF recall (default: RETRIEVAL_IVF_N_PROBE).",
+    )
+    parser.add_argument(
+        "--bm25",
+        action="store_true",
+        help="Build a BM25 index next to the 'file'/'npy' output for hybrid retrieval.",
+    )
+    parser.add_argument(
+        "--embedding-cache",
+        type=Path,
+        default=settings.scraper_output_dir.parent / "processed" / "embedding_cache.sqlite",
+        help="SQLite cache of vectors keyed by text + model hash, reused across runs.",
+    )
+    parser.add_argument(
+        "--reembed-all",
+        action="store_true",
+        help="Ignore the previous output and the embedding cache; encode every chunk.",
+    )
     parser.add_argument(
         "--refresh-chunks",
         action="store_true",
@@ -118,6 +356,8 @@ def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
 
 def run(argv: Sequence[str] | None = None) -> None:
     args = parse_args(argv)
+    if (args.ann_lists or args.bm25) and args.writer not in {"file", "npy"}:
+        raise ValueError("--ann-lists and --bm25 require the 'file' or 'npy' writer.")
 
     chunks_path = args.chunks_path
     if args.refresh_chunks or not chunks_path.exists():
@@ -130,16 +370,54 @@ def run(argv: Sequence[str] | None = None) -> None:
             ]
         )
 
-    records = load_chunk_records(chunks_path)
-    enriched_records = add_embeddings(records, args.embedding_model)
-
     writer = create_writer(
         args.writer,
         output_path=args.output,
         index_name=args.es_index,
         es_host=args.es_host,
+        es_bulk_docs=args.es_bulk_docs,
+        es_bulk_bytes=args.es_bulk_bytes,
+        es_parallel=args.es_parallel,
     )
-    writer.write(enriched_records)
+
+    previous = None
+    if not args.reembed_all and args.writer in {"file", "npy"}:
+        previous = PreviousEmbeddings.load(writer.output_path)
+    # Only open (and create) the cache when its vectors can be reused and new ones kept.
+    cache = None
+    if not args.reembed_all and args.writer != "stdout":
+        cache = EmbeddingCache(args.embedding_cache)
+    stats = EmbeddingStats()
+    started = time.perf_counter()
+    try:
+        records = load_chunk_records(chunks_path)
+        writer.write(
+            add_embeddings(
+                records,
+                args.embedding_model,
+                batch_size=args.batch_size,
+                workers=args.workers,
+                previous=previous,
+                cache=cache,
+                stats=stats,
+            )
+        )
+    finally:
+        if cache is not None:
+            cache.close()
+    elapsed = time.perf_counter() - started
+    # stderr keeps the stdout writer's JSON lines clean.
+    print(  # noqa: T201
+        f"Embedded {stats.total} chunks: {stats.reused} reused, {stats.computed} computed "
+        f"in {elapsed:.1f}s ({stats.total / max(elapsed, 1e-9):.1f} chunks/s, "
+        f"workers={args.workers}, batch size={args.batch_size})",
+        file=sys.stderr,
+    )
+
+    if args.ann_lists:
+        build_ann_index(writer.output_path, n_lists=args.ann_lists, n_probe=args.ann_probe)
+    if args.bm25:
+        build_bm25_index(writer.output_path)
 
 
 def main() -> None:
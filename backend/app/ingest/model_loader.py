@@ -4,8 +4,6 @@ from functools import lru_cache
 from hashlib import sha256
 from typing import Protocol
 
-from sentence_transformers import SentenceTransformer
-
 
 class EmbeddingModel(Protocol):
     def encode(self, sentences: list[str], convert_to_numpy: bool = False) -> list[list[float]]:
@@ -30,4 +28,7 @@ class DummyEmbeddingModel:
 def get_embedding_model(name: str = "sentence-transformers/all-MiniLM-L6-v2") -> EmbeddingModel:
     if name == "dummy":
         return DummyEmbeddingModel()
+    # Imported here: sentence-transformers pulls in torch, which takes seconds to import.
+    from sentence_transformers import SentenceTransformer
+
     return SentenceTransformer(name)
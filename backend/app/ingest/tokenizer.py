@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import re
+
+# Letter runs, digit runs and single punctuation marks, roughly how BPE tokenizers split.
+_PIECE_PATTERN = re.compile(r"[^\W\d_]+|\d+|[^\w\s]|_")
+CHARS_PER_WORD_TOKEN = 5
+DIGITS_PER_TOKEN = 3
+
+
+def _piece_tokens(piece: str) -> int:
+    if piece[0].isdigit():
+        return -(-len(piece) // DIGITS_PER_TOKEN)
+    if piece[0].isalpha():
+        return -(-len(piece) // CHARS_PER_WORD_TOKEN)
+    return 1
+
+
+def count_tokens(text: str) -> int:
+    """Estimate LLM tokens for `text` without a model-specific vocabulary.
+
+    Short words count as one token, longer words as one per five characters, digits in
+    groups of three and punctuation marks individually. For English prose this is close
+    to (and usually slightly above) the counts of common BPE tokenizers, which is the
+    safe direction for budgeting prompts.
+    """
+
+    return sum(_piece_tokens(piece) for piece in _PIECE_PATTERN.findall(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Longest whitespace-delimited prefix of `text` within `max_tokens`."""
+
+    words: list[str] = []
+    used = 0
+    for word in text.split():
+        cost = count_tokens(word)
+        if used + cost > max_tokens:
+            break
+        words.append(word)
+        used += cost
+    return " ".join(words)
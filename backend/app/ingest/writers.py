@@ -1,11 +1,23 @@
 from __future__ import annotations
 
 import json
+import os
+import random
+import threading
+import time
 from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Iterable, Mapping
+from typing import Iterable, Iterator, Mapping
 
-from elasticsearch import Elasticsearch
+import numpy as np
+from elasticsearch import ApiError, Elasticsearch, TransportError
+
+from ..fingerprint import file_fingerprint
+from ..retrieval.binary_index import write_binary_index
+from ..retrieval.es_store import ensure_index
+from ..retrieval.quantization import ScalarQuantizedMatrix, quantized_path_for
 
 
 ChunkPayload = Mapping[str, object]
@@ -26,37 +38,182 @@ class StdoutChunkWriter(ChunkWriter):
 
 
 class FileChunkWriter(ChunkWriter):
-    """Persist payloads locally (e.g., to inspect embeddings before indexing)."""
+    """Persist payloads locally (e.g., to inspect embeddings before indexing).
+
+    Lines are streamed to a temporary file that replaces `output_path` once complete, so
+    a running API never loads a half-written file.
+    """
+
+    def __init__(self, output_path: Path) -> None:
+        self.output_path = output_path
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    def write(self, payloads: Iterable[ChunkPayload]) -> None:
+        tmp_path = self.output_path.with_name(self.output_path.name + ".tmp")
+        try:
+            with tmp_path.open("w", encoding="utf-8") as stream:
+                for payload in payloads:
+                    stream.write(json.dumps(payload, ensure_ascii=False) + "\n")
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        os.replace(tmp_path, self.output_path)
+
+
+class BinaryChunkWriter(ChunkWriter):
+    """Persist payloads as a memory-mappable float32 matrix plus a metadata sidecar.
+
+    The int8 codes used by `RETRIEVAL_QUANTIZATION=int8` are written alongside.
+    """
 
     def __init__(self, output_path: Path) -> None:
+        if output_path.suffix != ".npy":
+            output_path = output_path.with_suffix(".npy")
         self.output_path = output_path
         self.output_path.parent.mkdir(parents=True, exist_ok=True)
 
     def write(self, payloads: Iterable[ChunkPayload]) -> None:
-        with self.output_path.open("w", encoding="utf-8") as stream:
-            for payload in payloads:
-                stream.write(json.dumps(payload, ensure_ascii=False) + "\n")
+        if not write_binary_index(payloads, self.output_path):
+            return
+        source_fingerprint = file_fingerprint(self.output_path)
+        matrix = np.load(self.output_path, mmap_mode="r", allow_pickle=False)
+        ScalarQuantizedMatrix.quantize(matrix).save(
+            quantized_path_for(self.output_path), source_fingerprint=source_fingerprint
+        )
+
+
+class BulkIndexError(RuntimeError):
+    """Some documents were rejected by Elasticsearch after all retries."""
+
+    def __init__(self, failures: Mapping[str, object]) -> None:
+        self.failures = dict(failures)
+        sample = "; ".join(f"{doc_id}: {error}" for doc_id, error in list(self.failures.items())[:3])
+        super().__init__(f"{len(self.failures)} documents failed to index ({sample})")
+
+
+# Per-item statuses worth retrying; anything else (e.g. mapping errors) is permanent.
+RETRYABLE_BULK_STATUSES = frozenset({429, 502, 503, 504})
 
 
 class ElasticsearchChunkWriter(ChunkWriter):
-    """Send payloads to an Elasticsearch ingest endpoint."""
+    """Stream payloads to Elasticsearch through bounded, parallel bulk requests.
+
+    Documents are serialised one at a time and flushed whenever a batch reaches
+    `max_docs` documents or `max_bytes` of NDJSON, so memory stays bounded by roughly
+    `(parallelism + 1) * max_bytes` whatever the corpus size. Up to `parallelism` bulk
+    requests run concurrently. Items rejected with a retryable status (429/5xx), or
+    batches whose request failed outright, are resent with jittered exponential backoff;
+    only the failed documents are resent. Documents still failing afterwards raise
+    `BulkIndexError` once every batch has been attempted.
+
+    A missing index is created with the kNN mapping from `es_store.index_mapping`, sized
+    from the first document's embedding.
+    """
 
     def __init__(
         self,
         client: Elasticsearch,
         index_name: str,
+        *,
+        max_docs: int = 500,
+        max_bytes: int = 5 * 1024 * 1024,
+        parallelism: int = 4,
+        max_retries: int = 3,
+        initial_backoff: float = 0.5,
+        max_backoff: float = 30.0,
     ) -> None:
         self.client = client
         self.index_name = index_name
-
-    def write(self, payloads: Iterable[ChunkPayload]) -> None:
-        actions = []
+        self.max_docs = max_docs
+        self.max_bytes = max_bytes
+        self.parallelism = parallelism
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.indexed = 0
+        self.retried = 0
+        self._index_ready = False
+        self._lock = threading.Lock()
+
+    def _batches(self, payloads: Iterable[ChunkPayload]) -> Iterator[dict[str, bytes]]:
+        batch: dict[str, bytes] = {}
+        size = 0
         for payload in payloads:
-            actions.append({"index": {"_index": self.index_name, "_id": payload["chunk_id"]}})
-            actions.append(payload)
+            if not self._index_ready:
+                ensure_index(self.client, self.index_name, len(payload["embedding"]))
+                self._index_ready = True
+            doc_id = str(payload["chunk_id"])
+            action = {"index": {"_index": self.index_name, "_id": doc_id}}
+            lines = (
+                json.dumps(action, ensure_ascii=False) + "\n" + json.dumps(payload, ensure_ascii=False) + "\n"
+            ).encode("utf-8")
+            if batch and (len(batch) >= self.max_docs or size + len(lines) > self.max_bytes):
+                yield batch
+                batch, size = {}, 0
+            batch[doc_id] = lines
+            size += len(lines)
+        if batch:
+            yield batch
+
+    def _backoff(self, attempt: int) -> float:
+        return min(self.max_backoff, self.initial_backoff * 2**attempt) * random.uniform(0.5, 1.0)
+
+    def _send(self, batch: dict[str, bytes]) -> dict[str, object]:
+        """Index one batch, retrying failed items; returns permanent failures by document ID."""
+
+        remaining = batch
+        failures: dict[str, object] = {}
+        for attempt in range(self.max_retries + 1):
+            retry: dict[str, bytes] = {}
+            errors: dict[str, object] = {}
+            try:
+                response = self.client.bulk(body=b"".join(remaining.values()))
+            except (ApiError, TransportError) as exc:
+                status = getattr(exc, "status_code", None)
+                errors = {doc_id: str(exc) for doc_id in remaining}
+                if status is not None and status not in RETRYABLE_BULK_STATUSES:
+                    failures.update(errors)
+                    return failures
+                retry = remaining
+            else:
+                succeeded = 0
+                for item in response.get("items", []):
+                    result = next(iter(item.values()))
+                    status = result.get("status", 200)
+                    if status < 300:
+                        succeeded += 1
+                        continue
+                    doc_id = str(result.get("_id"))
+                    errors[doc_id] = result.get("error") or status
+                    if status in RETRYABLE_BULK_STATUSES and doc_id in remaining:
+                        retry[doc_id] = remaining[doc_id]
+                    else:
+                        failures[doc_id] = errors[doc_id]
+                with self._lock:
+                    self.indexed += succeeded
+
+            if not retry:
+                return failures
+            if attempt == self.max_retries:
+                failures.update({doc_id: errors[doc_id] for doc_id in retry})
+                return failures
+            with self._lock:
+                self.retried += len(retry)
+            time.sleep(self._backoff(attempt))
+            remaining = retry
+        return failures
 
-        if not actions:
-            return
-
-        body_lines = "\n".join(json.dumps(action, ensure_ascii=False) for action in actions) + "\n"
-        self.client.bulk(body=body_lines)
+    def write(self, payloads: Iterable[ChunkPayload]) -> None:
+        failures: dict[str, object] = {}
+        in_flight: deque[Future] = deque()
+        with ThreadPoolExecutor(
+            max_workers=self.parallelism, thread_name_prefix="wafr-es-bulk"
+        ) as pool:
+            for batch in self._batches(payloads):
+                in_flight.append(pool.submit(self._send, batch))
+                while len(in_flight) >= self.parallelism:
+                    failures.update(in_flight.popleft().result())
+            while in_flight:
+                failures.update(in_flight.popleft().result())
+        if failures:
+            raise BulkIndexError(failures)
@@ -1,19 +1,266 @@
-from fastapi import Depends, FastAPI, HTTPException, status
+from __future__ import annotations
+
+import asyncio
+import json
+import secrets
+import sys
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Optional
+
+from fastapi import Depends, FastAPI, Header, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from .config import Settings, get_settings
+from .fingerprint import file_fingerprint
 from .schemas import ChatRequest, ChatResponse
-from .services.chat_service import RetrievalAugmentedChatService
+from .services.chat_service import RetrievalAugmentedChatService, RetrievalIndex, StreamEvent
+from .services.embedding_batcher import EmbeddingMicroBatcher
 from .ingest.model_loader import get_embedding_model
+from .retrieval.ann import ivf_path_for
+from .retrieval.binary_index import manifest_path_for, metadata_path_for
+from .retrieval.bm25 import BM25Index, bm25_path_for, load_or_build_bm25
 from .retrieval.in_memory_store import InMemoryVectorStore
-from .services.llm.deepseek import DeepSeekClient
+from .retrieval.quantization import quantized_path_for
+from .retrieval.shared_segment import SEGMENT_SUFFIX, SharedIndexSegment
+from .services.llm.resilience import CircuitBreaker, RetryPolicy
+from .services.store_reloader import StoreReloader
+
+if TYPE_CHECKING:
+    from .retrieval.es_store import ElasticsearchVectorStore
+
+
+def _format_sse(event: StreamEvent) -> str:
+    return f"event: {event.event}\ndata: {json.dumps(event.data, ensure_ascii=False)}\n\n"
+
+
+def _create_es_store(settings: Settings) -> ElasticsearchVectorStore:
+    # The Elasticsearch client is only imported when that store is configured.
+    from .retrieval.es_store import ElasticsearchVectorStore, create_client, ensure_index
+
+    if not settings.elasticsearch_url:
+        raise ValueError("ELASTICSEARCH_URL must be set when VECTOR_STORE=elasticsearch.")
+    client = create_client(
+        settings.elasticsearch_url,
+        api_key=settings.elasticsearch_api_key,
+        max_connections=settings.elasticsearch_max_connections,
+        request_timeout=settings.elasticsearch_request_timeout,
+    )
+    ensure_index(client, settings.elasticsearch_index, settings.elasticsearch_embedding_dims)
+    return ElasticsearchVectorStore(
+        client,
+        settings.elasticsearch_index,
+        num_candidates=settings.elasticsearch_num_candidates,
+        hybrid=settings.retrieval_hybrid,
+        hybrid_candidates=settings.retrieval_hybrid_candidates,
+        rrf_k=settings.retrieval_rrf_k,
+    )
+
+
+def _index_source(settings: Settings) -> Path:
+    return settings.shared_index_path or settings.embeddings_file
+
+
+def _index_sidecars(settings: Settings) -> list[Path]:
+    """Files next to the index source that `_load_index` reads under these settings."""
+
+    source = _index_source(settings)
+    sidecars = []
+    if source.suffix == ".npy":
+        sidecars += [metadata_path_for(source), manifest_path_for(source)]
+    if settings.retrieval_quantization == "int8":
+        sidecars.append(quantized_path_for(source))
+    if settings.retrieval_backend == "ivf":
+        sidecars.append(ivf_path_for(source))
+    if settings.retrieval_hybrid and source.suffix != SEGMENT_SUFFIX:
+        sidecars.append(bm25_path_for(source))
+    return sidecars
+
+
+def _load_index(settings: Settings) -> RetrievalIndex:
+    """Build the in-memory store (plus BM25 for hybrid retrieval) from the index source."""
+
+    source = _index_source(settings)
+    generation = file_fingerprint(source)
+    store = InMemoryVectorStore(
+        source,
+        backend=settings.retrieval_backend,
+        ivf_n_probe=settings.retrieval_ivf_n_probe,
+        quantization=settings.retrieval_quantization,
+        rescore_factor=settings.retrieval_rescore_factor,
+    )
+    lexical_index = None
+    if settings.retrieval_hybrid:
+        # Read BM25 from the same file as the store, so both always describe the same rows.
+        if source.suffix != SEGMENT_SUFFIX:
+            lexical_index = load_or_build_bm25(source, store.texts())
+        else:
+            lexical_index = SharedIndexSegment(source).lexical_index()
+            if lexical_index is None:
+                lexical_index = BM25Index.build(store.texts())
+    return RetrievalIndex(store, lexical_index, generation=generation)
+
+
+class AppServices:
+    """The chat service and everything behind it, built by the app lifespan.
+
+    Nothing heavy happens at import or in `create_app`: the embedding model, the vector
+    store and the LLM clients are created by `load()`, which the lifespan runs in a
+    worker thread, either before the server accepts requests or, with
+    `startup_background_load`, in the background while `/ready` reports 503.
+
+    The in-memory index is owned by a `StoreReloader`, which rebuilds it in the
+    background when the embeddings file changes (or on `POST /admin/reload`) and swaps
+    it into the chat service.
+    """
+
+    def __init__(self, settings: Settings) -> None:
+        self.settings = settings
+        self.chat_service: Optional[RetrievalAugmentedChatService] = None
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.reloader: Optional[StoreReloader[RetrievalIndex]] = None
+        self._closers: list[Callable[[], object]] = []
+
+    @property
+    def ready(self) -> bool:
+        return self.chat_service is not None and self.load_seconds is not None
+
+    def load(self) -> None:
+        settings = self.settings
+        started = time.perf_counter()
+        if settings.vector_store == "elasticsearch":
+            index = RetrievalIndex(_create_es_store(settings))
+            self._closers.append(index.store.close)
+        else:
+            self.reloader = StoreReloader(
+                _index_source(settings),
+                lambda: _load_index(settings),
+                watch_interval=settings.store_watch_interval_seconds,
+                sidecars=_index_sidecars(settings),
+            )
+            self._closers.append(self.reloader.close)
+            try:
+                index = self.reloader.load()
+            except (FileNotFoundError, ValueError):
+                index = RetrievalIndex(None)
+
+        embedder = get_embedding_model(settings.embedding_model_name)
+        if settings.embedding_batch_max_size > 1:
+            embedder = EmbeddingMicroBatcher(
+                embedder,
+                max_batch_size=settings.embedding_batch_max_size,
+                max_wait_ms=settings.embedding_batch_max_wait_ms,
+            )
+            self._closers.append(embedder.close)
+
+        llm_client = None
+        async_llm_client = None
+        if settings.deepseek_api_key:
+            from .services.llm.deepseek import AsyncDeepSeekClient, DeepSeekClient
+
+            client_options = dict(
+                api_key=settings.deepseek_api_key,
+                base_url=str(settings.deepseek_base_url),
+                model=settings.deepseek_model_name,
+                temperature=settings.deepseek_temperature,
+                max_output_tokens=settings.deepseek_max_output_tokens,
+                timeout=settings.deepseek_timeout,
+                max_connections=settings.llm_max_connections,
+                max_keepalive_connections=settings.llm_max_keepalive_connections,
+                keepalive_expiry=settings.llm_keepalive_expiry,
+                http2=settings.llm_http2,
+                retry_policy=RetryPolicy(
+                    max_retries=settings.llm_max_retries,
+                    base_delay=settings.llm_retry_base_delay,
+                    max_delay=settings.llm_retry_max_delay,
+                ),
+                # One breaker for both clients: they talk to the same upstream.
+                circuit_breaker=CircuitBreaker(
+                    settings.llm_circuit_failure_threshold,
+                    settings.llm_circuit_reset_seconds,
+                ),
+            )
+            llm_client = DeepSeekClient(**client_options)
+            self._closers.append(llm_client.close)
+            async_llm_client = AsyncDeepSeekClient(
+                **client_options,
+                hedge_percentile=settings.llm_hedge_percentile,
+                hedge_min_samples=settings.llm_hedge_min_samples,
+            )
+
+        chat_service = RetrievalAugmentedChatService(
+            settings=settings,
+            embedder=embedder,
+            store=index.store,
+            llm_client=llm_client,
+            lexical_index=index.lexical_index,
+            async_llm_client=async_llm_client,
+        )
+        chat_service.swap_index(index)
+        if self.reloader is not None:
+            self.reloader.start(chat_service.swap_index)
+        if settings.startup_warmup:
+            chat_service.warm_up()
+        self.chat_service = chat_service
+        self.load_seconds = time.perf_counter() - started
+
+    def load_in_background(self) -> None:
+        try:
+            self.load()
+        except Exception as exc:  # noqa: BLE001 - reported through /ready
+            self.error = f"{type(exc).__name__}: {exc}"
+            print(f"[error] Failed to load services: {self.error}", file=sys.stderr)  # noqa: T201
+
+    def require_chat_service(self) -> RetrievalAugmentedChatService:
+        if not self.ready:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="The service is still loading." if self.error is None else self.error,
+                headers={"Retry-After": "5"},
+            )
+        return self.chat_service
+
+    def index_status(self) -> dict[str, object]:
+        store = self.require_chat_service().index.store
+        report: dict[str, object] = {
+            "store": self.settings.vector_store,
+            "chunks": len(store) if store is not None else 0,
+        }
+        if self.reloader is not None:
+            report.update(self.reloader.status())
+        return report
+
+    async def aclose(self) -> None:
+        if self.chat_service is not None:
+            await self.chat_service.aclose()
+        for close in reversed(self._closers):
+            close()
 
 
 def create_app(settings: Settings) -> FastAPI:
+    services = AppServices(settings)
+
+    @asynccontextmanager
+    async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+        if settings.startup_background_load:
+            loading = asyncio.create_task(asyncio.to_thread(services.load_in_background))
+        else:
+            await asyncio.to_thread(services.load)
+            loading = None
+        yield
+        if loading is not None:
+            # The load runs in a thread and cannot be cancelled; let it finish first.
+            await loading
+        await services.aclose()
+
     app = FastAPI(
         title=settings.api_title,
         description=settings.api_description,
         version=settings.api_version,
+        lifespan=lifespan,
     )
 
     app.add_middleware(
@@ -24,46 +271,101 @@ def create_app(settings: Settings) -> FastAPI:
         allow_headers=["*"],
     )
 
-    store = None
-    try:
-        store = InMemoryVectorStore(settings.embeddings_file)
-    except (FileNotFoundError, ValueError):
-        store = None
-
-    embedder = get_embedding_model(settings.embedding_model_name)
-
-    llm_client = None
-    if settings.deepseek_api_key:
-        llm_client = DeepSeekClient(
-            api_key=settings.deepseek_api_key,
-            base_url=str(settings.deepseek_base_url),
-            model=settings.deepseek_model_name,
-            temperature=settings.deepseek_temperature,
-            max_output_tokens=settings.deepseek_max_output_tokens,
-        )
-
-    chat_service = RetrievalAugmentedChatService(
-        settings=settings,
-        embedder=embedder,
-        store=store,
-        llm_client=llm_client,
-    )
+    app.state.services = services
 
     @app.get("/health", tags=["system"])
     def health() -> dict[str, str]:
         return {"status": "ok"}
 
+    @app.get("/ready", tags=["system"])
+    def ready() -> JSONResponse:
+        if services.ready:
+            return JSONResponse({"status": "ready", "load_seconds": services.load_seconds})
+        body: dict[str, object] = {"status": "loading" if services.error is None else "failed"}
+        if services.error is not None:
+            body["detail"] = services.error
+        return JSONResponse(body, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    @app.get("/stats", tags=["system"])
+    def stats(
+        service: RetrievalAugmentedChatService = Depends(services.require_chat_service),
+    ) -> dict[str, dict[str, object]]:
+        return service.stats()
+
+    @app.get("/index/status", tags=["system"])
+    def index_status() -> dict[str, object]:
+        return services.index_status()
+
+    @app.post("/admin/reload", tags=["system"])
+    async def reload_index(
+        wait: bool = False,
+        x_admin_token: Optional[str] = Header(default=None),
+    ) -> JSONResponse:
+        """Rebuild the in-memory index in the background and swap it in when ready."""
+
+        if not settings.admin_token or not secrets.compare_digest(
+            x_admin_token or "", settings.admin_token
+        ):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token.")
+        services.require_chat_service()
+        if services.reloader is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="The Elasticsearch store is updated in place; there is nothing to reload.",
+            )
+        pending = services.reloader.reload()
+        if not wait:
+            return JSONResponse(services.index_status(), status_code=status.HTTP_202_ACCEPTED)
+        try:
+            await asyncio.wrap_future(pending)
+        except Exception as exc:  # noqa: BLE001 - the previous index keeps serving
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Reload failed: {type(exc).__name__}: {exc}",
+            ) from exc
+        return JSONResponse(services.index_status())
+
     @app.post("/chat", response_model=ChatResponse, tags=["chat"])
-    def chat_endpoint(
-        payload: ChatRequest, service: ChatService = Depends(lambda: chat_service)
+    async def chat_endpoint(
+        payload: ChatRequest,
+        service: RetrievalAugmentedChatService = Depends(services.require_chat_service),
     ) -> ChatResponse:
         try:
-            return service.answer(payload)
+            return await service.answer_async(payload)
         except ValueError as exc:  # pragma: no cover - defensive guard
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)
             ) from exc
 
+    @app.post("/chat/stream", tags=["chat"])
+    async def chat_stream_endpoint(
+        payload: ChatRequest,
+        service: RetrievalAugmentedChatService = Depends(services.require_chat_service),
+    ) -> StreamingResponse:
+        events = service.stream_answer(payload)
+        try:
+            # Run validation + retrieval before the response starts so bad requests
+            # still get a 400 instead of a broken stream.
+            first = await anext(events)
+        except ValueError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)
+            ) from exc
+
+        async def body() -> AsyncIterator[str]:
+            yield _format_sse(first)
+            try:
+                async for event in events:
+                    yield _format_sse(event)
+            except Exception as exc:  # noqa: BLE001 - the status line is already sent
+                yield _format_sse(StreamEvent("error", {"detail": str(exc)}))
+
+        return StreamingResponse(
+            body(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
     return app
 
 
@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Protocol
+
+import numpy as np
+
+IVF_SUFFIX = ".ivf.npz"
+
+
+def ivf_path_for(chunks_file: Path) -> Path:
+    """Location of the IVF index that accompanies an embeddings file.
+
+    Appended to the full file name, so `chunks.jsonl` and `chunks.npy` side by side get
+    separate indexes.
+    """
+    return chunks_file.with_name(chunks_file.name + IVF_SUFFIX)
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices of the `top_k` highest scores, best first, without a full sort."""
+    count = scores.shape[0]
+    if top_k <= 0 or count == 0:
+        return np.empty(0, dtype=np.int64)
+    if top_k < count:
+        candidates = np.argpartition(scores, count - top_k)[count - top_k :]
+    else:
+        candidates = np.arange(count)
+    return candidates[np.argsort(scores[candidates])[::-1]]
+
+
+def top_k_indices_rows(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Row-wise `top_k_indices` for a `(queries, rows)` score matrix."""
+    count = scores.shape[1]
+    top_k = min(top_k, count)
+    if top_k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+    if top_k < count:
+        candidates = np.argpartition(scores, count - top_k, axis=1)[:, count - top_k :]
+    else:
+        candidates = np.broadcast_to(np.arange(count), scores.shape)
+    order = np.argsort(np.take_along_axis(scores, candidates, axis=1), axis=1)[:, ::-1]
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+class SearchBackend(Protocol):
+    def search(
+        self, query_unit: np.ndarray, top_k: int, subset: np.ndarray | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Return `(row_indices, scores)` for the best `top_k` rows, best first.
+
+        `subset` is a sorted array of row indices; when given, only those rows are scored.
+        """
+        ...
+
+    def search_batch(
+        self, queries_unit: np.ndarray, top_k: int, subset: np.ndarray | None = None
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        """`search` for each row of a `(queries, dims)` matrix."""
+        ...
+
+
+class ExactSearchBackend:
+    """Brute-force dot product against every row of the embedding matrix."""
+
+    def __init__(self, embeddings: np.ndarray) -> None:
+        self._embeddings = embeddings
+
+    def search(
+        self, query_unit: np.ndarray, top_k: int, subset: np.ndarray | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        if subset is not None:
+            return _search_rows(self._embeddings, subset, query_unit, top_k)
+        scores = self._embeddings @ query_unit
+        indices = top_k_indices(scores, top_k)
+        return indices, scores[indices]
+
+    def search_batch(
+        self, queries_unit: np.ndarray, top_k: int, subset: np.ndarray | None = None
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        matrix = self._embeddings if subset is None else self._embeddings[subset]
+        # One matrix-matrix product for every query, then a row-wise partial sort.
+        scores = np.ascontiguousarray((matrix @ queries_unit.T).T)
+        indices = top_k_indices_rows(scores, top_k)
+        top_scores = np.take_along_axis(scores, indices, axis=1)
+        if subset is not None:
+            indices = subset[indices].astype(np.int64)
+        return list(zip(indices, top_scores))
+
+
+def _search_rows(
+    embeddings: np.ndarray, rows: np.ndarray, query_unit: np.ndarray, top_k: int
+) -> tuple[np.ndarray, np.ndarray]:
+    scores = embeddings[rows] @ query_unit
+    best = top_k_indices(scores, top_k)
+    return rows[best].astype(np.int64), scores[best]
+
+
+class IVFIndex:
+    """Inverted-file index: rows bucketed by their nearest spherical k-means centroid."""
+
+    def __init__(self, centroids: np.ndarray, list_offsets: np.ndarray, list_rows: np.ndarray) -> None:
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_rows = list_rows
+        # Fingerprint of the embeddings file a saved index was built from.
+        self.source_fingerprint: str | None = None
+
+    @property
+    def n_lists(self) -> int:
+        return int(self.centroids.shape[0])
+
+    @classmethod
+    def build(
+        cls,
+        embeddings: np.ndarray,
+        n_lists: int,
+        *,
+        iterations: int = 20,
+        max_training_rows: int = 256,
+        seed: int = 0,
+    ) -> "IVFIndex":
+        """Cluster unit-normalised rows into `n_lists` buckets.
+
+        Args:
+            embeddings: Unit-normalised float32 matrix.
+            n_lists: Number of inverted lists (clamped to the row count).
+            iterations: Lloyd iterations over the training sample.
+            max_training_rows: Training sample size per list; the rest are only assigned.
+            seed: Seed for the sampling and centroid initialisation.
+        """
+
+        count = embeddings.shape[0]
+        if count == 0:
+            raise ValueError("Cannot build an IVF index over an empty matrix.")
+        n_lists = max(1, min(n_lists, count))
+        rng = np.random.default_rng(seed)
+
+        sample_size = min(count, n_lists * max_training_rows)
+        sample_rows = np.sort(rng.choice(count, size=sample_size, replace=False))
+        sample = np.asarray(embeddings[sample_rows], dtype=np.float32)
+        centroids = sample[rng.choice(sample_size, size=n_lists, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            counts = np.bincount(assignment, minlength=n_lists)
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = sample[rng.choice(sample_size, size=int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = (sums / np.maximum(norms, 1e-12)).astype(np.float32)
+
+        assignment = _assign(embeddings, centroids)
+        order = np.argsort(assignment, kind="stable").astype(np.int32)
+        counts = np.bincount(assignment, minlength=n_lists)
+        offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return cls(centroids, offsets, order)
+
+    def probe(self, query_unit: np.ndarray, n_probe: int) -> np.ndarray:
+        """Row indices stored in the `n_probe` lists closest to the query."""
+        lists = top_k_indices(self.centroids @ query_unit, min(n_probe, self.n_lists))
+        return np.concatenate(
+            [self.list_rows[self.list_offsets[i] : self.list_offsets[i + 1]] for i in lists]
+        )
+
+    def save(self, path: Path, *, source_fingerprint: str = "") -> None:
+        tmp_path = path.with_name(path.name + ".tmp")
+        with tmp_path.open("wb") as stream:
+            np.savez(
+                stream,
+                centroids=self.centroids,
+                list_offsets=self.list_offsets,
+                list_rows=self.list_rows,
+                source=np.asarray(source_fingerprint),
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "IVFIndex":
+        with np.load(path, allow_pickle=False) as archive:
+            index = cls(archive["centroids"], archive["list_offsets"], archive["list_rows"])
+            if "source" in archive.files:
+                index.source_fingerprint = str(archive["source"]) or None
+        return index
+
+
+def _assign(embeddings: np.ndarray, centroids: np.ndarray, block_size: int = 65536) -> np.ndarray:
+    assignment = np.empty(embeddings.shape[0], dtype=np.int64)
+    for start in range(0, embeddings.shape[0], block_size):
+        block = np.asarray(embeddings[start : start + block_size], dtype=np.float32)
+        assignment[start : start + block.shape[0]] = np.argmax(block @ centroids.T, axis=1)
+    return assignment
+
+
+class IVFSearchBackend:
+    """Score only the rows in the `n_probe` inverted lists nearest to the query.
+
+    `n_probe` is the recall/latency knob: probing every list is equivalent to exact search.
+    """
+
+    def __init__(self, embeddings: np.ndarray, index: IVFIndex, n_probe: int) -> None:
+        if n_probe <= 0:
+            raise ValueError("n_probe must be > 0")
+        self._embeddings = embeddings
+        self._index = index
+        self._n_probe = n_probe
+
+    def search(
+        self, query_unit: np.ndarray, top_k: int, subset: np.ndarray | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        rows = np.sort(self._index.probe(query_unit, self._n_probe))
+        if subset is not None:
+            rows = np.intersect1d(rows, subset, assume_unique=True)
+            if rows.shape[0] < top_k:
+                # Narrow filters can leave the probed lists nearly empty; the subset is
+                # small enough to scan exactly.
+                rows = subset
+        return _search_rows(self._embeddings, rows, query_unit, top_k)
+
+    def search_batch(
+        self, queries_unit: np.ndarray, top_k: int, subset: np.ndarray | None = None
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        # Each query probes different lists, so there is no shared matrix to multiply.
+        return [self.search(query, top_k, subset) for query in queries_unit]
+
+
+class RescoringBackend:
+    """Shortlist with an approximate backend, then rescore the shortlist exactly.
+
+    Used with quantized candidates: the inner backend returns `top_k * rescore_factor`
+    rows from the compact matrix and only those rows are read from the float32 matrix.
+    """
+
+    def __init__(self, candidates: SearchBackend, embeddings: np.ndarray, rescore_factor: int) -> None:
+        if rescore_factor < 1:
+            raise ValueError("rescore_factor must be >= 1")
+        self._candidates = candidates
+        self._embeddings = embeddings
+        self._rescore_factor = rescore_factor
+
+    def search(
+        self, query_unit: np.ndarray, top_k: int, subset: np.ndarray | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        rows, _ = self._candidates.search(query_unit, top_k * self._rescore_factor, subset)
+        return _search_rows(self._embeddings, np.sort(rows), query_unit, top_k)
+
+    def search_batch(
+        self, queries_unit: np.ndarray, top_k: int, subset: np.ndarray | None = None
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        shortlists = self._candidates.search_batch(queries_unit, top_k * self._rescore_factor, subset)
+        return [
+            _search_rows(self._embeddings, np.sort(rows), query, top_k)
+            for (rows, _), query in zip(shortlists, queries_unit)
+        ]
+
+
+def measure_recall(
+    embeddings: np.ndarray,
+    backend: SearchBackend,
+    queries: np.ndarray,
+    top_k: int,
+) -> float:
+    """Mean recall@k of `backend` against brute-force search for unit-normalised queries."""
+
+    exact = ExactSearchBackend(embeddings)
+    hits = 0
+    expected = 0
+    for query in queries:
+        truth, _ = exact.search(query, top_k)
+        found, _ = backend.search(query, top_k)
+        hits += len(np.intersect1d(truth, found))
+        expected += len(truth)
+    return hits / expected if expected else 1.0
+
+
+def sample_queries(embeddings: np.ndarray, count: int, *, noise: float = 0.05, seed: int = 0) -> np.ndarray:
+    """Perturbed copies of random rows, used as stand-in queries for recall checks."""
+
+    rng = np.random.default_rng(seed)
+    rows = np.sort(rng.choice(embeddings.shape[0], size=min(count, embeddings.shape[0]), replace=False))
+    queries = np.asarray(embeddings[rows], dtype=np.float32)
+    queries = queries + rng.normal(scale=noise, size=queries.shape).astype(np.float32)
+    norms = np.linalg.norm(queries, axis=1, keepdims=True)
+    return queries / np.maximum(norms, 1e-12)
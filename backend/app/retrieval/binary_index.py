@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Iterable, Mapping
+
+import numpy as np
+
+from ..fingerprint import file_fingerprint
+
+METADATA_SUFFIX = ".meta.jsonl"
+MANIFEST_SUFFIX = ".manifest.json"
+
+
+def metadata_path_for(matrix_path: Path) -> Path:
+    """Location of the metadata sidecar that accompanies an embedding matrix."""
+    return matrix_path.with_suffix(METADATA_SUFFIX)
+
+
+def manifest_path_for(matrix_path: Path) -> Path:
+    """Location of the manifest that ties an embedding matrix to its metadata sidecar."""
+    return matrix_path.with_suffix(MANIFEST_SUFFIX)
+
+
+def normalise_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def write_binary_index(payloads: Iterable[Mapping[str, object]], matrix_path: Path) -> int:
+    """Persist payloads as a unit-normalised float32 `.npy` matrix plus a JSONL sidecar.
+
+    The sidecar holds every payload field except `embedding`, one line per matrix row.
+    Payloads are streamed: each metadata line and normalised row goes straight to a
+    temporary file, so memory does not grow with the corpus.
+
+    Two files cannot be swapped in one atomic step, so a manifest recording the
+    fingerprints of both is renamed into place last. Until it lands, `load_binary_index`
+    finds the new matrix or metadata disagreeing with the old manifest and raises
+    `ValueError` rather than pairing rows with the wrong metadata.
+
+    Returns:
+        Number of rows written.
+    """
+
+    metadata_path = metadata_path_for(matrix_path)
+    manifest_path = manifest_path_for(matrix_path)
+    matrix_tmp = matrix_path.with_name(matrix_path.name + ".tmp")
+    rows_tmp = matrix_path.with_name(matrix_path.name + ".rows.tmp")
+    metadata_tmp = metadata_path.with_name(metadata_path.name + ".tmp")
+    manifest_tmp = manifest_path.with_name(manifest_path.name + ".tmp")
+
+    rows = 0
+    dims = 0
+    try:
+        with metadata_tmp.open("w", encoding="utf-8") as stream, rows_tmp.open("wb") as raw:
+            for payload in payloads:
+                record = dict(payload)
+                vector = np.asarray(record.pop("embedding"), dtype=np.float32)
+                if rows == 0:
+                    dims = vector.shape[0]
+                elif vector.shape != (dims,):
+                    raise ValueError(
+                        f"Embedding {rows} has shape {vector.shape}, expected ({dims},)."
+                    )
+                raw.write(normalise_rows(vector[None, :]).astype(np.float32, copy=False).tobytes())
+                stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+                rows += 1
+
+        # The row count is only known now; prepend the `.npy` header to the raw rows.
+        with matrix_tmp.open("wb") as stream, rows_tmp.open("rb") as raw:
+            np.lib.format.write_array_header_1_0(
+                stream, {"descr": "<f4", "fortran_order": False, "shape": (rows, dims)}
+            )
+            shutil.copyfileobj(raw, stream, 1024 * 1024)
+
+        # `os.replace` keeps mtime and size, so these are the fingerprints the final
+        # files will have.
+        manifest = {
+            "matrix": file_fingerprint(matrix_tmp),
+            "metadata": file_fingerprint(metadata_tmp),
+        }
+        manifest_tmp.write_text(json.dumps(manifest), encoding="utf-8")
+    except BaseException:
+        for path in (matrix_tmp, metadata_tmp, manifest_tmp):
+            path.unlink(missing_ok=True)
+        raise
+    finally:
+        rows_tmp.unlink(missing_ok=True)
+
+    os.replace(matrix_tmp, matrix_path)
+    os.replace(metadata_tmp, metadata_path)
+    os.replace(manifest_tmp, manifest_path)
+    return rows
+
+
+def _read_manifest(matrix_path: Path) -> dict | None:
+    try:
+        return json.loads(manifest_path_for(matrix_path).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+
+
+def load_binary_index(matrix_path: Path) -> tuple[np.ndarray, list[dict]]:
+    """Memory-map an embedding matrix written by `write_binary_index` and load its metadata.
+
+    Raises:
+        ValueError: The matrix and metadata do not belong together, e.g. because
+            `write_binary_index` is replacing them right now.
+    """
+
+    metadata_path = metadata_path_for(matrix_path)
+    if not metadata_path.exists():
+        raise FileNotFoundError(
+            f"Metadata sidecar not found at {metadata_path}. "
+            "Re-run the ingestion pipeline with the 'npy' writer."
+        )
+
+    manifest = _read_manifest(matrix_path)
+    matrix = np.load(matrix_path, mmap_mode="r", allow_pickle=False)
+    if matrix.ndim != 2 or matrix.dtype != np.float32:
+        raise ValueError(f"Expected a 2-D float32 matrix in {matrix_path}.")
+
+    records: list[dict] = []
+    with metadata_path.open(encoding="utf-8") as stream:
+        for line in stream:
+            if line.strip():
+                records.append(json.loads(line))
+
+    # Checked after reading: if either file was swapped since the manifest was read,
+    # the manifest has moved on or no longer matches the files on disk.
+    if manifest is not None and (
+        _read_manifest(matrix_path) != manifest
+        or file_fingerprint(matrix_path) != manifest["matrix"]
+        or file_fingerprint(metadata_path) != manifest["metadata"]
+    ):
+        raise ValueError(
+            f"{matrix_path} and {metadata_path} do not match their manifest; "
+            "the index is being rewritten or was modified by hand."
+        )
+    if len(records) != matrix.shape[0]:
+        raise ValueError(
+            f"Embedding matrix has {matrix.shape[0]} rows but metadata has {len(records)} records."
+        )
+    return matrix, records
+
+
+def load_jsonl_index(chunks_path: Path) -> tuple[np.ndarray, list[dict]]:
+    """Parse a JSONL chunks file into a unit-normalised matrix and records without `embedding`."""
+
+    records: list[dict] = []
+    # Convert each row as it is read so only one line's boxed floats are alive at a time.
+    embeddings: list[np.ndarray] = []
+    with chunks_path.open(encoding="utf-8") as stream:
+        for line in stream:
+            if not line.strip():
+                continue
+            payload = json.loads(line)
+            embeddings.append(np.asarray(payload.pop("embedding"), dtype=np.float32))
+            records.append(payload)
+    if not embeddings:
+        return np.zeros((0, 0), dtype=np.float32), records
+    return normalise_rows(np.vstack(embeddings)), records
+
+
+def spill_to_memmap(matrix: np.ndarray) -> np.memmap:
+    """Move a float32 matrix into an unlinked temporary file and map it read-only.
+
+    The rows then live in the page cache instead of the process heap: only pages that
+    are read (e.g. the rows being rescored) stay resident, and the kernel may evict them.
+    """
+
+    with tempfile.TemporaryFile() as stream:
+        np.ascontiguousarray(matrix, dtype=np.float32).tofile(stream)
+        stream.flush()
+        return np.memmap(stream, dtype=np.float32, mode="r", shape=matrix.shape)
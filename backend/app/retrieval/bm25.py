@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import os
+import re
+from pathlib import Path
+from typing import Iterable, Sequence
+
+import numpy as np
+
+from ..fingerprint import file_fingerprint
+from .ann import top_k_indices
+
+BM25_SUFFIX = ".bm25.npz"
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+
+def bm25_path_for(chunks_file: Path) -> Path:
+    """Location of the BM25 index that accompanies an embeddings file (see `ivf_path_for`)."""
+    return chunks_file.with_name(chunks_file.name + BM25_SUFFIX)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lower-case word tokens that keep WAFR identifiers such as `rel10-bp02` intact.
+
+    Hyphenated identifiers are also emitted part by part so `REL10` alone still matches.
+    """
+
+    tokens: list[str] = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        if "-" in token:
+            tokens.extend(token.split("-"))
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index stored as flat postings arrays.
+
+    Postings for term `t` live in `doc_ids[offsets[t]:offsets[t + 1]]` with matching
+    `term_freqs`; row numbers line up with the embedding matrix rows.
+    """
+
+    def __init__(
+        self,
+        terms: Sequence[str],
+        offsets: np.ndarray,
+        doc_ids: np.ndarray,
+        term_freqs: np.ndarray,
+        doc_lengths: np.ndarray,
+        *,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ) -> None:
+        self._vocabulary = {term: idx for idx, term in enumerate(terms)}
+        self._terms = list(terms)
+        self._offsets = offsets
+        self._doc_ids = doc_ids
+        self._term_freqs = term_freqs
+        self._doc_lengths = doc_lengths
+        self._k1 = k1
+        self._b = b
+        # Fingerprint of the chunks file a saved index was built from (see `load_or_build_bm25`).
+        self.source_fingerprint: str | None = None
+
+        doc_count = doc_lengths.shape[0]
+        doc_freqs = np.diff(offsets).astype(np.float32)
+        self._idf = np.log1p((doc_count - doc_freqs + 0.5) / (doc_freqs + 0.5)).astype(np.float32)
+        average_length = float(doc_lengths.mean()) if doc_count else 0.0
+        self._length_norm = (k1 * (1 - b + b * doc_lengths / max(average_length, 1e-12))).astype(
+            np.float32
+        )
+
+    def __len__(self) -> int:
+        return int(self._doc_lengths.shape[0])
+
+    @property
+    def terms(self) -> list[str]:
+        return self._terms
+
+    @property
+    def params(self) -> dict[str, float]:
+        return {"k1": self._k1, "b": self._b}
+
+    def arrays(self) -> dict[str, np.ndarray]:
+        """Postings and document lengths, keyed as the constructor arguments."""
+        return {
+            "offsets": self._offsets,
+            "doc_ids": self._doc_ids,
+            "term_freqs": self._term_freqs,
+            "doc_lengths": self._doc_lengths,
+        }
+
+    @classmethod
+    def build(cls, texts: Iterable[str], *, k1: float = 1.2, b: float = 0.75) -> "BM25Index":
+        postings: dict[str, list[tuple[int, int]]] = {}
+        doc_lengths: list[int] = []
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lengths.append(len(tokens))
+            counts: dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                postings.setdefault(token, []).append((row, count))
+
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum([len(postings[term]) for term in terms], out=offsets[1:])
+        doc_ids = np.empty(int(offsets[-1]), dtype=np.int32)
+        term_freqs = np.empty(int(offsets[-1]), dtype=np.float32)
+        for idx, term in enumerate(terms):
+            entries = np.asarray(postings[term], dtype=np.int64)
+            doc_ids[offsets[idx] : offsets[idx + 1]] = entries[:, 0]
+            term_freqs[offsets[idx] : offsets[idx + 1]] = entries[:, 1]
+
+        return cls(
+            terms,
+            offsets,
+            doc_ids,
+            term_freqs,
+            np.asarray(doc_lengths, dtype=np.float32),
+            k1=k1,
+            b=b,
+        )
+
+    def search(
+        self,
+        query: str,
+        top_k: int,
+        subset: np.ndarray | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Return `(row_indices, scores)` of the best-matching rows, best first.
+
+        Only postings of the query terms are touched, so cost scales with how common
+        the query terms are rather than with the corpus size.
+        """
+
+        term_ids = {self._vocabulary[token] for token in tokenize(query) if token in self._vocabulary}
+        if not term_ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        docs_parts: list[np.ndarray] = []
+        score_parts: list[np.ndarray] = []
+        for term_id in term_ids:
+            start, end = self._offsets[term_id], self._offsets[term_id + 1]
+            docs = self._doc_ids[start:end]
+            freqs = self._term_freqs[start:end]
+            docs_parts.append(docs)
+            score_parts.append(
+                self._idf[term_id] * freqs * (self._k1 + 1) / (freqs + self._length_norm[docs])
+            )
+
+        docs = np.concatenate(docs_parts)
+        contributions = np.concatenate(score_parts)
+        if subset is not None:
+            keep = np.isin(docs, subset)
+            docs, contributions = docs[keep], contributions[keep]
+            if docs.shape[0] == 0:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        unique_docs, inverse = np.unique(docs, return_inverse=True)
+        scores = np.bincount(inverse, weights=contributions).astype(np.float32)
+        best = top_k_indices(scores, top_k)
+        return unique_docs[best].astype(np.int64), scores[best]
+
+    def save(self, path: Path, *, source_fingerprint: str = "") -> None:
+        tmp_path = path.with_name(path.name + ".tmp")
+        with tmp_path.open("wb") as stream:
+            np.savez(
+                stream,
+                terms=np.asarray(self._terms, dtype=str),
+                **self.arrays(),
+                params=np.asarray([self._k1, self._b], dtype=np.float32),
+                source=np.asarray(source_fingerprint),
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "BM25Index":
+        with np.load(path, allow_pickle=False) as archive:
+            k1, b = (float(value) for value in archive["params"])
+            index = cls(
+                archive["terms"].tolist(),
+                archive["offsets"],
+                archive["doc_ids"],
+                archive["term_freqs"],
+                archive["doc_lengths"],
+                k1=k1,
+                b=b,
+            )
+            if "source" in archive.files:
+                index.source_fingerprint = str(archive["source"]) or None
+        return index
+
+
+def load_or_build_bm25(chunks_file: Path, texts: Iterable[str]) -> BM25Index:
+    """Load the BM25 index saved next to `chunks_file`, rebuilding it when missing or stale.
+
+    A saved index is only trusted when it records the fingerprint of `chunks_file` as it
+    is now; a matching row count alone says nothing about which texts were indexed.
+    """
+
+    index_path = bm25_path_for(chunks_file)
+    if index_path.exists():
+        index = BM25Index.load(index_path)
+        if index.source_fingerprint == file_fingerprint(chunks_file):
+            return index
+    return BM25Index.build(texts)
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import sys
+from typing import Iterable, Iterator, Mapping, Optional, Sequence
+
+import numpy as np
+
+# Low-cardinality fields stored as int32 codes into an interned vocabulary.
+CATEGORICAL_FIELDS: tuple[str, ...] = ("source", "pillar", "doc_type", "document_id")
+# Per-row strings stored as one UTF-8 blob plus int64 offsets.
+STRING_FIELDS: tuple[str, ...] = ("chunk_id", "text", "summary")
+# Optional integers stored as int32, with -1 for a missing value.
+INTEGER_FIELDS: tuple[str, ...] = ("chunk_index", "token_count")
+
+_MISSING = -1
+
+
+class PackedStrings(Sequence[str]):
+    """Strings decoded on access from a UTF-8 blob and `len + 1` offsets.
+
+    Rows flagged in `missing` read back as None.
+    """
+
+    def __init__(
+        self, blob: np.ndarray, offsets: np.ndarray, missing: Optional[np.ndarray] = None
+    ) -> None:
+        self.blob = blob
+        self.offsets = offsets
+        self.missing = missing
+
+    @classmethod
+    def pack(cls, values: Sequence[Optional[str]]) -> PackedStrings:
+        encoded = [value.encode("utf-8") if value is not None else b"" for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        missing = np.fromiter(
+            (value is None for value in values), dtype=np.bool_, count=len(values)
+        )
+        return cls(blob, offsets, missing if missing.any() else None)
+
+    def __len__(self) -> int:
+        return self.offsets.shape[0] - 1
+
+    def __getitem__(self, row: int) -> Optional[str]:  # type: ignore[override]
+        if self.missing is not None and self.missing[row]:
+            return None
+        start, end = self.offsets[row], self.offsets[row + 1]
+        return self.blob[start:end].tobytes().decode("utf-8")
+
+    def __iter__(self) -> Iterator[Optional[str]]:
+        for row in range(len(self)):
+            yield self[row]
+
+    @property
+    def nbytes(self) -> int:
+        extra = self.missing.nbytes if self.missing is not None else 0
+        return self.blob.nbytes + self.offsets.nbytes + extra
+
+
+class ChunkTable:
+    """Columnar chunk metadata for `InMemoryVectorStore`.
+
+    Instead of one dict per chunk, each field is a single array: categorical fields are
+    int32 codes into a small vocabulary of interned strings, per-row strings are packed
+    into one blob, and integers are int32. The arrays can be backed by a memory map (see
+    `shared_segment`); only the vocabularies and filter row groups are per-process.
+    Fields outside the three tuples above are not kept.
+    """
+
+    def __init__(
+        self,
+        arrays: Mapping[str, np.ndarray],
+        vocabularies: Mapping[str, list[str]],
+    ) -> None:
+        self.strings = {
+            field: PackedStrings(
+                arrays[f"{field}.blob"],
+                arrays[f"{field}.offsets"],
+                arrays.get(f"{field}.missing"),
+            )
+            for field in STRING_FIELDS
+        }
+        self.codes = {field: arrays[f"{field}.codes"] for field in CATEGORICAL_FIELDS}
+        self.integers = {field: arrays[field] for field in INTEGER_FIELDS}
+        self.vocabularies = {
+            field: [sys.intern(value) for value in vocabularies[field]]
+            for field in CATEGORICAL_FIELDS
+        }
+        self._lookup = {
+            field: {value: code for code, value in enumerate(values)}
+            for field, values in self.vocabularies.items()
+        }
+        self._groups = {
+            field: self._group_rows(self.codes[field], len(self.vocabularies[field]))
+            for field in CATEGORICAL_FIELDS
+        }
+
+    @classmethod
+    def from_records(cls, records: Iterable[Mapping[str, object]]) -> ChunkTable:
+        columns: dict[str, list] = {
+            field: [] for field in CATEGORICAL_FIELDS + STRING_FIELDS + INTEGER_FIELDS
+        }
+        lookups: dict[str, dict[str, int]] = {field: {} for field in CATEGORICAL_FIELDS}
+        for record in records:
+            for field in CATEGORICAL_FIELDS:
+                value = record.get(field)
+                if value is None:
+                    columns[field].append(_MISSING)
+                else:
+                    lookup = lookups[field]
+                    columns[field].append(lookup.setdefault(str(value), len(lookup)))
+            for field in STRING_FIELDS:
+                value = record.get(field)
+                columns[field].append(None if value is None else str(value))
+            for field in INTEGER_FIELDS:
+                value = record.get(field)
+                columns[field].append(_MISSING if value is None else int(value))
+        if any(value is None for value in columns["chunk_id"]):
+            raise ValueError("Every chunk record needs a chunk_id.")
+
+        arrays: dict[str, np.ndarray] = {}
+        for field in CATEGORICAL_FIELDS:
+            arrays[f"{field}.codes"] = np.asarray(columns[field], dtype=np.int32)
+        for field in STRING_FIELDS:
+            packed = PackedStrings.pack(columns[field])
+            arrays[f"{field}.blob"], arrays[f"{field}.offsets"] = packed.blob, packed.offsets
+            if packed.missing is not None:
+                arrays[f"{field}.missing"] = packed.missing
+        for field in INTEGER_FIELDS:
+            arrays[field] = np.asarray(columns[field], dtype=np.int32)
+        return cls(arrays, {field: list(lookup) for field, lookup in lookups.items()})
+
+    @staticmethod
+    def _group_rows(codes: np.ndarray, size: int) -> list[np.ndarray]:
+        # A stable sort keeps each group's rows ascending; missing (-1) rows sort first.
+        order = np.argsort(codes, kind="stable").astype(np.int64)
+        counts = np.bincount(codes[codes != _MISSING], minlength=size)
+        start = codes.shape[0] - int(counts.sum())
+        return np.split(order[start:], np.cumsum(counts)[:-1])
+
+    def arrays(self) -> dict[str, np.ndarray]:
+        """Every column array, keyed as accepted by the constructor."""
+        arrays: dict[str, np.ndarray] = {}
+        for field, packed in self.strings.items():
+            arrays[f"{field}.blob"], arrays[f"{field}.offsets"] = packed.blob, packed.offsets
+            if packed.missing is not None:
+                arrays[f"{field}.missing"] = packed.missing
+        for field, codes in self.codes.items():
+            arrays[f"{field}.codes"] = codes
+        arrays.update(self.integers)
+        return arrays
+
+    def __len__(self) -> int:
+        return len(self.strings["chunk_id"])
+
+    @property
+    def texts(self) -> PackedStrings:
+        return self.strings["text"]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in self.arrays().values())
+
+    def category(self, field: str, row: int) -> Optional[str]:
+        code = self.codes[field][row]
+        return None if code == _MISSING else self.vocabularies[field][code]
+
+    def integer(self, field: str, row: int) -> Optional[int]:
+        value = int(self.integers[field][row])
+        return None if value == _MISSING else value
+
+    def rows_where(self, field: str, value: str) -> np.ndarray:
+        """Sorted rows whose categorical `field` equals `value`."""
+        code = self._lookup[field].get(str(value))
+        if code is None:
+            return np.empty(0, dtype=np.int64)
+        return self._groups[field][code]
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from dataclasses import replace
+from typing import List, Sequence
+
+import numpy as np
+
+from .in_memory_store import RetrievedChunk
+
+
+def mmr_select(query: np.ndarray, vectors: np.ndarray, top_k: int, lambda_: float) -> list[int]:
+    """Rows of `vectors` picked by maximal marginal relevance, in pick order.
+
+    Each step takes the row maximising `lambda_ * sim(query, row) - (1 - lambda_) *
+    max(sim(row, picked))`. Both inputs must be unit-normalised. The pairwise
+    similarities are one matrix product and every step is a vector update, so the cost
+    is one `n x n` product plus `top_k` passes over `n` candidates.
+    """
+
+    count = vectors.shape[0]
+    if count == 0 or top_k <= 0:
+        return []
+    relevance = vectors @ query
+    pairwise = vectors @ vectors.T
+
+    picked = [int(np.argmax(relevance))]
+    redundancy = pairwise[picked[0]].copy()
+    available = np.ones(count, dtype=bool)
+    available[picked[0]] = False
+    while len(picked) < min(top_k, count):
+        scores = lambda_ * relevance - (1.0 - lambda_) * redundancy
+        scores[~available] = -np.inf
+        row = int(np.argmax(scores))
+        picked.append(row)
+        available[row] = False
+        np.maximum(redundancy, pairwise[row], out=redundancy)
+    return picked
+
+
+def _join_overlapping(first: str, second: str) -> str:
+    """Concatenate two chunk texts, dropping the words `second` repeats from `first`."""
+    head, tail = first.split(), second.split()
+    for size in range(min(len(head), len(tail)), 0, -1):
+        if head[-size:] == tail[:size]:
+            return " ".join(head + tail[size:])
+    return " ".join(head + tail)
+
+
+def merge_adjacent(chunks: Sequence[RetrievedChunk]) -> List[RetrievedChunk]:
+    """Merge hits with consecutive `chunk_index` in the same document into one passage.
+
+    Overlapping window text is included once. A merged passage takes the rank and the
+    best score of its highest-ranked member, and joins the member ids with `+` so that
+    answer-cache keys still tell it apart from a single chunk. Chunks without a
+    `document_id` or `chunk_index` are left as they are.
+    """
+
+    runs: dict[int, list[RetrievedChunk]] = {}
+    by_document: dict[str, list[tuple[int, int]]] = {}
+    for rank, chunk in enumerate(chunks):
+        if chunk.document_id is None or chunk.chunk_index is None:
+            runs[rank] = [chunk]
+            continue
+        by_document.setdefault(chunk.document_id, []).append((chunk.chunk_index, rank))
+
+    for hits in by_document.values():
+        hits.sort()
+        run = [hits[0]]
+        for hit in hits[1:]:
+            if hit[0] == run[-1][0] + 1:
+                run.append(hit)
+                continue
+            runs[min(rank for _, rank in run)] = [chunks[rank] for _, rank in run]
+            run = [hit]
+        runs[min(rank for _, rank in run)] = [chunks[rank] for _, rank in run]
+
+    merged: list[RetrievedChunk] = []
+    for rank in sorted(runs):
+        members = runs[rank]
+        if len(members) == 1:
+            merged.append(members[0])
+            continue
+        text = members[0].text
+        for member in members[1:]:
+            text = _join_overlapping(text, member.text)
+        merged.append(
+            replace(
+                members[0],
+                chunk_id="+".join(member.chunk_id for member in members),
+                text=text,
+                score=max(member.score for member in members),
+                token_count=None,
+                row=None,
+            )
+        )
+    return merged
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+from typing import Iterable, List, Mapping, Optional
+
+import numpy as np
+from elasticsearch import Elasticsearch
+
+from .fusion import reciprocal_rank_fusion
+from .in_memory_store import FILTER_FIELDS, RetrievedChunk
+
+EMBEDDING_FIELD = "embedding"
+
+
+def index_mapping(dims: int) -> dict:
+    """Mapping for chunk documents: keyword filter fields, BM25 text and a cosine kNN vector."""
+
+    return {
+        "properties": {
+            "chunk_id": {"type": "keyword"},
+            "document_id": {"type": "keyword"},
+            "source": {"type": "keyword"},
+            "pillar": {"type": "keyword"},
+            "doc_type": {"type": "keyword"},
+            "chunk_index": {"type": "integer"},
+            "word_count": {"type": "integer"},
+            "token_count": {"type": "integer"},
+            "content_hash": {"type": "keyword"},
+            "text": {"type": "text"},
+            "summary": {"type": "text", "index": False},
+            EMBEDDING_FIELD: {
+                "type": "dense_vector",
+                "dims": dims,
+                "index": True,
+                "similarity": "cosine",
+            },
+        }
+    }
+
+
+def ensure_index(client: Elasticsearch, index_name: str, dims: int) -> bool:
+    """Create `index_name` with the chunk mapping unless it exists; True when created."""
+
+    if client.indices.exists(index=index_name):
+        return False
+    client.indices.create(index=index_name, mappings=index_mapping(dims))
+    return True
+
+
+def create_client(
+    url: str,
+    *,
+    api_key: Optional[str] = None,
+    max_connections: int = 10,
+    request_timeout: float = 10.0,
+) -> Elasticsearch:
+    """Client with a pooled, keep-alive connection per node (`max_connections` each)."""
+
+    return Elasticsearch(
+        url,
+        api_key=api_key,
+        connections_per_node=max_connections,
+        request_timeout=request_timeout,
+        retry_on_timeout=True,
+    )
+
+
+class ElasticsearchVectorStore:
+    """Retrieval over an Elasticsearch index with the `InMemoryVectorStore` search interface.
+
+    Dense search is an approximate kNN query on the `dense_vector` field; `filters` on
+    `FILTER_FIELDS` become kNN pre-filters, so `top_k` hits are returned even for narrow
+    filters. With `hybrid=True` and a `query_text`, a BM25 `match` query is sent in the
+    same `_msearch` round trip and the two rankings are merged with reciprocal rank
+    fusion, as the in-memory hybrid path does. Scores are reported as cosine similarity.
+    """
+
+    def __init__(
+        self,
+        client: Elasticsearch,
+        index_name: str,
+        *,
+        num_candidates: int = 100,
+        hybrid: bool = False,
+        hybrid_candidates: int = 20,
+        rrf_k: int = 60,
+    ) -> None:
+        self._client = client
+        self._index_name = index_name
+        self._num_candidates = num_candidates
+        self._hybrid = hybrid
+        self._hybrid_candidates = hybrid_candidates
+        self._rrf_k = rrf_k
+
+    def __len__(self) -> int:
+        return int(self._client.count(index=self._index_name)["count"])
+
+    @staticmethod
+    def _filter_clauses(filters: Mapping[str, str] | None) -> list[dict]:
+        clauses = []
+        for field, value in (filters or {}).items():
+            if field not in FILTER_FIELDS:
+                raise ValueError(f"Unsupported filter field: {field}")
+            clauses.append({"term": {field: str(value)}})
+        return clauses
+
+    @staticmethod
+    def _unit_query(query_vector: Iterable[float]) -> list[float]:
+        query = np.asarray(list(query_vector), dtype=np.float32)
+        if query.ndim != 1:
+            raise ValueError("Query vector must be one-dimensional.")
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            raise ValueError("Query vector norm is zero; cannot normalise.")
+        return (query / norm).tolist()
+
+    def _knn_body(self, query: list[float], top_k: int, clauses: list[dict]) -> dict:
+        knn: dict[str, object] = {
+            "field": EMBEDDING_FIELD,
+            "query_vector": query,
+            "k": top_k,
+            "num_candidates": max(self._num_candidates, top_k),
+        }
+        if clauses:
+            knn["filter"] = clauses
+        return {"knn": knn, "size": top_k, "_source": {"excludes": [EMBEDDING_FIELD]}}
+
+    def _bm25_body(self, query_text: str, size: int, clauses: list[dict]) -> dict:
+        return {
+            "query": {"bool": {"must": {"match": {"text": query_text}}, "filter": clauses}},
+            "size": size,
+            "_source": {"excludes": [EMBEDDING_FIELD]},
+        }
+
+    @staticmethod
+    def _chunks(response: Mapping[str, object], *, cosine: bool) -> List[RetrievedChunk]:
+        results = []
+        for hit in response["hits"]["hits"]:
+            source = hit["_source"]
+            score = float(hit["_score"])
+            results.append(
+                RetrievedChunk(
+                    chunk_id=source.get("chunk_id", hit["_id"]),
+                    text=source["text"],
+                    # ES reports cosine kNN scores as (1 + cos) / 2; undo that.
+                    score=2 * score - 1 if cosine else score,
+                    source=source.get("source"),
+                    pillar=source.get("pillar"),
+                    summary=source.get("summary"),
+                    token_count=source.get("token_count"),
+                    document_id=source.get("document_id"),
+                    chunk_index=source.get("chunk_index"),
+                )
+            )
+        return results
+
+    def search(
+        self,
+        query_vector: Iterable[float],
+        top_k: int = 4,
+        *,
+        filters: Mapping[str, str] | None = None,
+        query_text: str | None = None,
+    ) -> List[RetrievedChunk]:
+        query = self._unit_query(query_vector)
+        clauses = self._filter_clauses(filters)
+        if not (self._hybrid and query_text):
+            response = self._client.search(
+                index=self._index_name, **self._knn_body(query, top_k, clauses)
+            )
+            return self._chunks(response, cosine=True)
+
+        candidates = max(top_k, self._hybrid_candidates)
+        dense, lexical = self._client.msearch(
+            index=self._index_name,
+            searches=[
+                {},
+                self._knn_body(query, candidates, clauses),
+                {},
+                self._bm25_body(query_text, candidates, clauses),
+            ],
+        )["responses"]
+        return reciprocal_rank_fusion(
+            [self._chunks(dense, cosine=True), self._chunks(lexical, cosine=False)],
+            top_k=top_k,
+            k=self._rrf_k,
+        )
+
+    def search_batch(
+        self,
+        query_matrix: np.ndarray,
+        top_k: int = 4,
+        *,
+        filters: Mapping[str, str] | None = None,
+    ) -> List[List[RetrievedChunk]]:
+        """Dense search for every row of `query_matrix` in a single `_msearch` request."""
+
+        queries = np.asarray(query_matrix, dtype=np.float32)
+        if queries.ndim != 2:
+            raise ValueError("Query matrix must be two-dimensional.")
+        if queries.shape[0] == 0:
+            return []
+        clauses = self._filter_clauses(filters)
+        searches: list[dict] = []
+        for row in queries:
+            searches.extend([{}, self._knn_body(self._unit_query(row), top_k, clauses)])
+        responses = self._client.msearch(index=self._index_name, searches=searches)["responses"]
+        return [self._chunks(response, cosine=True) for response in responses]
+
+    def close(self) -> None:
+        self._client.close()
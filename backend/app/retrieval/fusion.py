@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from dataclasses import replace
+from typing import List, Sequence
+
+from .in_memory_store import RetrievedChunk
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[RetrievedChunk]],
+    *,
+    top_k: int,
+    k: int = 60,
+) -> List[RetrievedChunk]:
+    """Merge ranked lists by summing `1 / (k + rank)` per chunk.
+
+    Rank-based fusion needs no score calibration between cosine and BM25 scores. The
+    returned chunks carry the fused score.
+    """
+
+    fused: dict[str, float] = {}
+    chunks: dict[str, RetrievedChunk] = {}
+    for ranking in rankings:
+        for rank, chunk in enumerate(ranking, start=1):
+            fused[chunk.chunk_id] = fused.get(chunk.chunk_id, 0.0) + 1.0 / (k + rank)
+            chunks.setdefault(chunk.chunk_id, chunk)
+
+    ordered = sorted(fused, key=fused.__getitem__, reverse=True)[:top_k]
+    return [replace(chunks[chunk_id], score=fused[chunk_id]) for chunk_id in ordered]
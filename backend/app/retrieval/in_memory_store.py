@@ -1,14 +1,27 @@
 from __future__ import annotations
 
-import json
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Iterable, List
+from typing import Iterable, List, Mapping
 
 import numpy as np
 
+from .ann import (
+    ExactSearchBackend,
+    IVFIndex,
+    IVFSearchBackend,
+    RescoringBackend,
+    SearchBackend,
+    ivf_path_for,
+)
+from ..fingerprint import file_fingerprint
+from .binary_index import load_binary_index, load_jsonl_index, spill_to_memmap
+from .chunk_table import ChunkTable
+from .quantization import ScalarQuantizedMatrix, quantized_path_for
+from .shared_segment import SEGMENT_SUFFIX, SharedIndexSegment
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True)
 class RetrievedChunk:
     chunk_id: str
     text: str
@@ -16,37 +29,152 @@ class RetrievedChunk:
     source: str | None = None
     pillar: str | None = None
     summary: str | None = None
+    token_count: int | None = None
+    document_id: str | None = None
+    chunk_index: int | None = None
+    # Matrix row in the store that returned the chunk, if it has one.
+    row: int | None = field(default=None, compare=False, repr=False)
+
+
+FILTER_FIELDS: tuple[str, ...] = ("pillar", "doc_type", "document_id")
 
 
 class InMemoryVectorStore:
-    """Simple cosine-similarity search over precomputed embeddings."""
+    """Simple cosine-similarity search over precomputed embeddings.
+
+    `chunks_file` may be the JSONL produced by the `file` writer or the `.npy` matrix
+    produced by the `npy` writer. The latter is memory-mapped read-only, so startup does
+    not parse embeddings and the pages are shared between worker processes. A
+    `.segment` file (see `shared_segment`) goes further: the texts and metadata columns
+    are mapped as well.
+
+    `backend="ivf"` searches through the IVF index stored next to `chunks_file` (built by
+    `index_chunks --ann-lists`), falling back to building one in memory when it is absent
+    or stale.
+
+    `quantization="int8"` scores against int8 codes (a quarter of the float32 memory)
+    and rescores the best `top_k * rescore_factor` candidates against the float32 matrix.
+    The float32 rows are then only read through a memory map: the `.npy`/`.segment`
+    file itself, or for JSONL a temporary file the parsed matrix is moved to.
+
+    Chunk metadata is held column-wise in a `ChunkTable` rather than as one dict per
+    chunk, and `RetrievedChunk`s are only built for the rows a search returns.
 
-    def __init__(self, chunks_file: Path) -> None:
+    Searches accept `filters` on the `FILTER_FIELDS` metadata. Row indexes per field value
+    are precomputed at load time so a filtered query only scores the matching rows.
+    """
+
+    def __init__(
+        self,
+        chunks_file: Path,
+        *,
+        backend: str = "exact",
+        ivf_n_probe: int = 8,
+        quantization: str = "none",
+        rescore_factor: int = 4,
+    ) -> None:
         if not chunks_file.exists():
             raise FileNotFoundError(
                 f"Processed chunks file not found at {chunks_file}. "
                 "Run the ingestion pipeline to generate embeddings."
             )
 
-        self._records: list[dict] = []
-        embeddings: list[list[float]] = []
-
-        with chunks_file.open(encoding="utf-8") as stream:
-            for line in stream:
-                if not line.strip():
-                    continue
-                payload = json.loads(line)
-                embeddings.append(payload["embedding"])
-                self._records.append(payload)
+        if chunks_file.suffix == SEGMENT_SUFFIX:
+            segment = SharedIndexSegment(chunks_file)
+            self._embeddings, self._table = segment.matrix, segment.table
+        else:
+            if chunks_file.suffix == ".npy":
+                self._embeddings, records = load_binary_index(chunks_file)
+            else:
+                self._embeddings, records = load_jsonl_index(chunks_file)
+            self._table = ChunkTable.from_records(records)
+            del records
 
-        if not self._records:
+        if not len(self._table):
             raise ValueError("No chunks were loaded from the embeddings file.")
 
-        matrix = np.asarray(embeddings, dtype=np.float32)
-        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
-        self._embeddings = matrix / np.maximum(norms, 1e-12)
+        self._quantized = self._load_quantized(chunks_file, quantization)
+        self._backend = self._create_backend(chunks_file, backend, ivf_n_probe)
+        if self._quantized is not None:
+            if chunks_file.suffix not in {".npy", SEGMENT_SUFFIX}:
+                # Parsed JSONL embeddings are on the heap; keep only the int8 codes there.
+                self._embeddings = spill_to_memmap(self._embeddings)
+            self._backend = RescoringBackend(self._backend, self._embeddings, rescore_factor)
+
+    def filter_rows(self, filters: Mapping[str, str] | None) -> np.ndarray | None:
+        """Sorted row indices matching every filter, or None when unfiltered."""
+
+        if not filters:
+            return None
+        subset: np.ndarray | None = None
+        for field, value in filters.items():
+            if field not in FILTER_FIELDS:
+                raise ValueError(f"Unsupported filter field: {field}")
+            rows = self._table.rows_where(field, value)
+            subset = rows if subset is None else np.intersect1d(subset, rows, assume_unique=True)
+        return subset
+
+    def _load_quantized(self, chunks_file: Path, quantization: str) -> ScalarQuantizedMatrix | None:
+        if quantization == "none":
+            return None
+        if quantization != "int8":
+            raise ValueError(f"Unsupported quantization: {quantization}")
+        quantized_path = quantized_path_for(chunks_file)
+        if quantized_path.exists():
+            quantized = ScalarQuantizedMatrix.load(quantized_path)
+            # Codes saved for another version of the file may still have the same shape.
+            if quantized.source_fingerprint == file_fingerprint(chunks_file):
+                return quantized
+        return ScalarQuantizedMatrix.quantize(self._embeddings)
+
+    def _create_backend(self, chunks_file: Path, backend: str, ivf_n_probe: int) -> SearchBackend:
+        matrix = self._embeddings if self._quantized is None else self._quantized
+        if backend == "exact":
+            return ExactSearchBackend(matrix)
+        if backend == "ivf":
+            index_path = ivf_path_for(chunks_file)
+            index = IVFIndex.load(index_path) if index_path.exists() else None
+            # A saved index is only valid for the exact file it was built from.
+            if index is None or index.source_fingerprint != file_fingerprint(chunks_file):
+                index = IVFIndex.build(self._embeddings, int(np.sqrt(len(self._table))))
+            return IVFSearchBackend(matrix, index, ivf_n_probe)
+        raise ValueError(f"Unsupported retrieval backend: {backend}")
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def texts(self) -> Iterable[str]:
+        """Chunk texts in row order (rows line up with `embeddings`)."""
+        return iter(self._table.texts)
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        """Unit-normalised embedding matrix (read-only view)."""
+        view = self._embeddings.view()
+        view.flags.writeable = False
+        return view
+
+    def embeddings_for(self, chunks: Iterable[RetrievedChunk]) -> np.ndarray:
+        """Unit-normalised embeddings of chunks this store returned, one row each."""
+        rows = [chunk.row for chunk in chunks]
+        if any(row is None for row in rows):
+            raise ValueError("Chunks were not returned by this store.")
+        return np.asarray(self._embeddings[rows], dtype=np.float32)
+
+    def search(
+        self,
+        query_vector: Iterable[float],
+        top_k: int = 4,
+        *,
+        filters: Mapping[str, str] | None = None,
+        query_text: str | None = None,
+    ) -> List[RetrievedChunk]:
+        """Top `top_k` chunks by cosine similarity.
+
+        `query_text` is accepted for parity with `ElasticsearchVectorStore`; lexical
+        matching for this store is done by a separate `BM25Index`.
+        """
 
-    def search(self, query_vector: Iterable[float], top_k: int = 4) -> List[RetrievedChunk]:
         query = np.asarray(list(query_vector), dtype=np.float32)
         if query.ndim != 1:
             raise ValueError("Query vector must be one-dimensional.")
@@ -56,20 +184,64 @@ class InMemoryVectorStore:
             raise ValueError("Query vector norm is zero; cannot normalise.")
         query_unit = query / query_norm
 
-        scores = np.dot(self._embeddings, query_unit)
-        top_indices = np.argsort(scores)[::-1][:top_k]
+        subset = self.filter_rows(filters)
+        if subset is not None and subset.shape[0] == 0:
+            return []
+
+        top_indices, top_scores = self._backend.search(query_unit, top_k, subset)
+        return self.chunks_for_rows(top_indices, top_scores)
+
+    def search_batch(
+        self,
+        query_matrix: np.ndarray,
+        top_k: int = 4,
+        *,
+        filters: Mapping[str, str] | None = None,
+    ) -> List[List[RetrievedChunk]]:
+        """Search for every row of `query_matrix` with one vectorised scoring pass."""
+
+        queries = np.asarray(query_matrix, dtype=np.float32)
+        if queries.ndim != 2:
+            raise ValueError("Query matrix must be two-dimensional.")
+        if queries.shape[0] == 0:
+            return []
+
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        if not np.all(norms > 0):
+            raise ValueError("Query vector norm is zero; cannot normalise.")
+        queries_unit = queries / norms
+
+        subset = self.filter_rows(filters)
+        if subset is not None and subset.shape[0] == 0:
+            return [[] for _ in range(queries.shape[0])]
+
+        return [
+            self.chunks_for_rows(indices, scores)
+            for indices, scores in self._backend.search_batch(queries_unit, top_k, subset)
+        ]
+
+    def chunks_for_rows(self, indices: Iterable[int], scores: Iterable[float]) -> List[RetrievedChunk]:
+        """Materialise `RetrievedChunk`s for row indices returned by a backend or BM25.
 
+        Only these rows are decoded from the columnar table; nothing else is held as
+        Python objects.
+        """
+        table = self._table
         results: list[RetrievedChunk] = []
-        for idx in top_indices:
-            record = self._records[int(idx)]
+        for idx, score in zip(indices, scores):
+            row = int(idx)
             results.append(
                 RetrievedChunk(
-                    chunk_id=record["chunk_id"],
-                    text=record["text"],
-                    score=float(scores[idx]),
-                    source=record.get("source"),
-                    pillar=record.get("pillar"),
-                    summary=record.get("summary"),
+                    chunk_id=table.strings["chunk_id"][row],
+                    text=table.strings["text"][row],
+                    score=float(score),
+                    source=table.category("source", row),
+                    pillar=table.category("pillar", row),
+                    summary=table.strings["summary"][row],
+                    token_count=table.integer("token_count", row),
+                    document_id=table.category("document_id", row),
+                    chunk_index=table.integer("chunk_index", row),
+                    row=row,
                 )
             )
         return results
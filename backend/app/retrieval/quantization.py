@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import numpy as np
+
+QUANTIZED_SUFFIX = ".int8.npz"
+
+
+def quantized_path_for(chunks_file: Path) -> Path:
+    """Location of the int8 codes that accompany an embeddings file (see `ivf_path_for`)."""
+    return chunks_file.with_name(chunks_file.name + QUANTIZED_SUFFIX)
+
+
+class ScalarQuantizedMatrix:
+    """int8 embedding codes with per-dimension scales (`codes * scales ≈ embeddings`).
+
+    Supports the subset of the ndarray interface the search backends rely on
+    (`shape`, row indexing and `@ query`), so it can stand in for the float32 matrix
+    while holding a quarter of the memory.
+    """
+
+    def __init__(self, codes: np.ndarray, scales: np.ndarray, *, block_size: int = 512) -> None:
+        if codes.dtype != np.int8 or codes.ndim != 2:
+            raise ValueError("codes must be a 2-D int8 matrix.")
+        if scales.shape != (codes.shape[1],):
+            raise ValueError("scales must hold one float per dimension.")
+        self.codes = codes
+        self.scales = scales.astype(np.float32, copy=False)
+        self._block_size = block_size
+        # Fingerprint of the embeddings file saved codes were quantized from.
+        self.source_fingerprint: str | None = None
+
+    @classmethod
+    def quantize(cls, matrix: np.ndarray, *, block_size: int = 65536) -> "ScalarQuantizedMatrix":
+        """Symmetrically quantize each dimension of `matrix` to [-127, 127]."""
+
+        dims = matrix.shape[1]
+        max_abs = np.zeros(dims, dtype=np.float32)
+        for start in range(0, matrix.shape[0], block_size):
+            block = np.asarray(matrix[start : start + block_size], dtype=np.float32)
+            np.maximum(max_abs, np.abs(block).max(axis=0, initial=0.0), out=max_abs)
+        scales = np.where(max_abs > 0, max_abs / 127.0, 1.0).astype(np.float32)
+
+        codes = np.empty(matrix.shape, dtype=np.int8)
+        for start in range(0, matrix.shape[0], block_size):
+            block = np.asarray(matrix[start : start + block_size], dtype=np.float32)
+            codes[start : start + block.shape[0]] = np.clip(np.rint(block / scales), -127, 127)
+        return cls(codes, scales)
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.codes.shape
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + self.scales.nbytes
+
+    def __len__(self) -> int:
+        return self.codes.shape[0]
+
+    def __getitem__(self, rows: object) -> "ScalarQuantizedMatrix":
+        codes = self.codes[rows]
+        if codes.ndim != 2:
+            raise IndexError("ScalarQuantizedMatrix only supports row selection.")
+        return ScalarQuantizedMatrix(codes, self.scales, block_size=self._block_size)
+
+    def __matmul__(self, query: np.ndarray) -> np.ndarray:
+        """Approximate dot products against a 1-D query or an `(dims, n)` query matrix."""
+
+        weighted = (self.scales[:, None] * query) if query.ndim == 2 else self.scales * query
+        weighted = weighted.astype(np.float32, copy=False)
+        rows = self.codes.shape[0]
+        out = np.empty((rows,) + weighted.shape[1:], dtype=np.float32)
+
+        # Widen the int8 codes `block_size` rows at a time so the float32 copy stays
+        # bounded. This saves memory, not time: a scan costs about the same as float32
+        # (`scan/int8` vs `scan/float32` in benchmarks/retrieval_latency.py).
+        buffer = np.empty((min(self._block_size, rows), self.codes.shape[1]), dtype=np.float32)
+        for start in range(0, rows, self._block_size):
+            block = self.codes[start : start + self._block_size]
+            count = block.shape[0]
+            np.copyto(buffer[:count], block, casting="unsafe")
+            np.dot(buffer[:count], weighted, out=out[start : start + count])
+        return out
+
+    def save(self, path: Path, *, source_fingerprint: str = "") -> None:
+        tmp_path = path.with_name(path.name + ".tmp")
+        with tmp_path.open("wb") as stream:
+            np.savez(
+                stream,
+                codes=self.codes,
+                scales=self.scales,
+                source=np.asarray(source_fingerprint),
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "ScalarQuantizedMatrix":
+        with np.load(path, allow_pickle=False) as archive:
+            matrix = cls(archive["codes"], archive["scales"])
+            if "source" in archive.files:
+                matrix.source_fingerprint = str(archive["source"]) or None
+        return matrix
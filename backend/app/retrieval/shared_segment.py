@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import json
+import os
+from functools import cached_property
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from ..fingerprint import file_fingerprint
+from .binary_index import load_binary_index, load_jsonl_index
+from .bm25 import BM25Index
+from .chunk_table import ChunkTable
+
+SEGMENT_SUFFIX = ".segment"
+MAGIC = b"WAFRSEG3"
+# Sections start on the first page boundary after the header, each 64-byte aligned.
+HEADER_SIZE = 4096
+_ALIGN = 64
+
+
+def segment_path_for(chunks_file: Path) -> Path:
+    return chunks_file.with_suffix(SEGMENT_SUFFIX)
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+def _json_section(value: object) -> np.ndarray:
+    return np.frombuffer(json.dumps(value, ensure_ascii=False).encode("utf-8"), dtype=np.uint8)
+
+
+def write_segment(
+    matrix: np.ndarray,
+    table: ChunkTable,
+    path: Path,
+    *,
+    lexical_index: Optional[BM25Index] = None,
+    source_fingerprint: str = "",
+) -> None:
+    """Pack a unit-normalised matrix, its chunk table and BM25 index into one mappable file.
+
+    Layout: `MAGIC`, a little-endian u64 header length and a JSON header, padded to
+    `HEADER_SIZE`; then the float32 matrix, every `ChunkTable` column array and the BM25
+    postings, each 64-byte aligned, plus the categorical vocabularies and BM25 terms as
+    JSON. The file is written to a temporary path and renamed, so attached readers keep
+    their old mapping.
+    """
+
+    arrays = {"matrix": np.ascontiguousarray(matrix, dtype=np.float32)}
+    arrays.update(
+        (f"table.{name}", np.ascontiguousarray(array)) for name, array in table.arrays().items()
+    )
+    arrays["vocabularies"] = _json_section(table.vocabularies)
+    if lexical_index is not None:
+        arrays.update(
+            (f"bm25.{name}", np.ascontiguousarray(array))
+            for name, array in lexical_index.arrays().items()
+        )
+        arrays["bm25.terms"] = _json_section(
+            {"terms": lexical_index.terms, **lexical_index.params}
+        )
+
+    sections: dict[str, list] = {}
+    position = HEADER_SIZE
+    for name, array in arrays.items():
+        position = _aligned(position)
+        sections[name] = [position, array.nbytes, array.dtype.str]
+        position += array.nbytes
+    header = json.dumps(
+        {
+            "rows": int(matrix.shape[0]),
+            "dims": int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+            "source_fingerprint": source_fingerprint,
+            "sections": sections,
+        }
+    ).encode("utf-8")
+    if len(MAGIC) + 8 + len(header) > HEADER_SIZE:
+        raise ValueError("Segment header does not fit in HEADER_SIZE.")
+
+    tmp_path = path.with_name(path.name + ".tmp")
+    with tmp_path.open("wb") as stream:
+        stream.write(MAGIC + len(header).to_bytes(8, "little") + header)
+        for name, array in arrays.items():
+            stream.seek(sections[name][0])
+            stream.write(memoryview(array).cast("B"))
+        stream.truncate(position)
+    os.replace(tmp_path, path)
+
+
+def read_header(path: Path) -> dict:
+    with path.open("rb") as stream:
+        prefix = stream.read(len(MAGIC) + 8)
+        if len(prefix) < len(MAGIC) + 8 or prefix[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not an index segment.")
+        return json.loads(stream.read(int.from_bytes(prefix[len(MAGIC) :], "little")))
+
+
+class SharedIndexSegment:
+    """Read-only view of a segment file, mapped with `mmap`.
+
+    Every process that opens the same file shares its pages through the page cache,
+    so the matrix, texts, metadata columns and BM25 postings cost memory once per node
+    rather than once per worker. Only the vocabularies, filter row groups and BM25 term
+    lookup are built per process, and only when `table` or `lexical_index()` is used.
+    """
+
+    def __init__(self, path: Path) -> None:
+        header = read_header(path)
+        self.path = path
+        self.source_fingerprint: str = header["source_fingerprint"]
+        self._sections: dict[str, list] = header["sections"]
+        self._buffer = np.memmap(path, dtype=np.uint8, mode="r")
+
+        rows, dims = header["rows"], header["dims"]
+        self.matrix: np.ndarray = self._section("matrix").reshape(rows, dims)
+
+    @cached_property
+    def table(self) -> ChunkTable:
+        return ChunkTable(self._arrays("table."), self._json("vocabularies"))
+
+    def _section(self, name: str) -> np.ndarray:
+        offset, size, dtype = self._sections[name]
+        return self._buffer[offset : offset + size].view(np.dtype(dtype))
+
+    def _arrays(self, prefix: str) -> dict[str, np.ndarray]:
+        return {
+            name.removeprefix(prefix): self._section(name)
+            for name in self._sections
+            if name.startswith(prefix) and name != "bm25.terms"
+        }
+
+    def _json(self, name: str) -> object:
+        return json.loads(self._section(name).tobytes().decode("utf-8"))
+
+    def lexical_index(self) -> Optional[BM25Index]:
+        """The BM25 index packed with the chunks, or None for a segment without one."""
+        if "bm25.terms" not in self._sections:
+            return None
+        meta = self._json("bm25.terms")
+        return BM25Index(
+            meta["terms"], **self._arrays("bm25."), k1=meta["k1"], b=meta["b"]
+        )
+
+
+def prepare_shared_index(source: Path, segment: Path) -> bool:
+    """(Re)build `segment` from a JSONL or `.npy` chunks file unless it is current.
+
+    Run by the parent process before workers start; returns True when a new segment
+    was written.
+    """
+
+    fingerprint = file_fingerprint(source)
+    if segment.exists():
+        try:
+            if read_header(segment)["source_fingerprint"] == fingerprint:
+                return False
+        except ValueError:
+            pass
+    if source.suffix == ".npy":
+        matrix, records = load_binary_index(source)
+    else:
+        matrix, records = load_jsonl_index(source)
+    table = ChunkTable.from_records(records)
+    del records
+    write_segment(
+        matrix,
+        table,
+        segment,
+        lexical_index=BM25Index.build(table.texts),
+        source_fingerprint=fingerprint,
+    )
+    return True
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from typing import Iterable, List, Mapping, Protocol
+
+import numpy as np
+
+from .in_memory_store import RetrievedChunk
+
+
+class VectorStore(Protocol):
+    """Search interface shared by `InMemoryVectorStore` and `ElasticsearchVectorStore`."""
+
+    def search(
+        self,
+        query_vector: Iterable[float],
+        top_k: int = 4,
+        *,
+        filters: Mapping[str, str] | None = None,
+        query_text: str | None = None,
+    ) -> List[RetrievedChunk]:
+        ...
+
+    def search_batch(
+        self,
+        query_matrix: np.ndarray,
+        top_k: int = 4,
+        *,
+        filters: Mapping[str, str] | None = None,
+    ) -> List[List[RetrievedChunk]]:
+        ...
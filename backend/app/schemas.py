@@ -1,7 +1,17 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Literal, Optional, get_args
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
+
+Pillar = Literal[
+    "Operational Excellence",
+    "Security",
+    "Reliability",
+    "Performance Efficiency",
+    "Cost Optimization",
+    "Sustainability",
+]
+_PILLARS_BY_NAME = {name.lower(): name for name in get_args(Pillar)}
 
 
 class ChatMessage(BaseModel):
@@ -14,6 +24,37 @@ class ChatRequest(BaseModel):
     history: Optional[List[ChatMessage]] = Field(
         default=None, description="Optional chat history for context."
     )
+    pillar: Optional[Pillar] = Field(
+        default=None,
+        description=(
+            "Restrict retrieval to one Well-Architected pillar (e.g. 'Security'); "
+            "matched case-insensitively."
+        ),
+    )
+    mmr_lambda: Optional[float] = Field(
+        default=None,
+        ge=0.0,
+        le=1.0,
+        description=(
+            "Diversify the retrieved chunks with maximal marginal relevance: 1.0 ranks by "
+            "relevance only, lower values penalise chunks similar to ones already picked. "
+            "Defaults to RETRIEVAL_MMR_LAMBDA."
+        ),
+    )
+    merge_adjacent: Optional[bool] = Field(
+        default=None,
+        description=(
+            "Merge retrieved chunks that are consecutive in the same document into one "
+            "passage. Defaults to RETRIEVAL_MERGE_ADJACENT."
+        ),
+    )
+
+    @field_validator("pillar", mode="before")
+    @classmethod
+    def _canonical_pillar(cls, value: object) -> object:
+        if isinstance(value, str):
+            return _PILLARS_BY_NAME.get(" ".join(value.split()).lower(), value)
+        return value
 
 
 class ChatResponse(BaseModel):
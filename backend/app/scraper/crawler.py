@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import xml.etree.ElementTree as ET
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Optional
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+from bs4 import BeautifulSoup
+
+CRAWL_STATE_NAME = "crawl_state.json"
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str, base: str | None = None) -> Optional[str]:
+    """Canonical form used for scope checks and deduplication; None for non-HTTP links.
+
+    Resolves `url` against `base`, lowercases scheme and host, drops default ports and
+    fragments, and collapses `.`/`..` path segments.
+    """
+
+    absolute = urljoin(base, url) if base else url
+    parts = urlsplit(absolute.strip())
+    scheme = parts.scheme.lower()
+    if scheme not in _DEFAULT_PORTS or not parts.hostname:
+        return None
+    host = parts.hostname.lower()
+    if parts.port and parts.port != _DEFAULT_PORTS[scheme]:
+        host = f"{host}:{parts.port}"
+
+    segments: list[str] = []
+    for segment in parts.path.split("/")[1:]:
+        if segment == "..":
+            if segments:
+                segments.pop()
+        elif segment != ".":
+            segments.append(segment)
+    path = "/" + "/".join(segments)
+    return urlunsplit((scheme, host, path, parts.query, ""))
+
+
+def extract_links(soup: BeautifulSoup, base_url: str) -> list[str]:
+    """Normalized, de-duplicated `href` targets of a parsed page in document order."""
+
+    links: dict[str, None] = {}
+    for anchor in soup.find_all("a", href=True):
+        link = normalize_url(anchor["href"], base_url)
+        if link is not None:
+            links[link] = None
+    return list(links)
+
+
+def parse_toc(payload: str, base_url: str) -> list[str]:
+    """Page URLs from an AWS docs `toc-contents.json` (nested `contents` with `href`s)."""
+
+    urls: list[str] = []
+    stack = [json.loads(payload)]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(reversed(node))
+        elif isinstance(node, dict):
+            href = node.get("href")
+            if isinstance(href, str) and (url := normalize_url(href, base_url)):
+                urls.append(url)
+            stack.append(node.get("contents", []))
+    return urls
+
+
+def parse_sitemap(payload: str, base_url: str) -> list[str]:
+    """`<loc>` entries of a `sitemap.xml` urlset."""
+
+    urls = []
+    for element in ET.fromstring(payload).iter():
+        if element.tag.rsplit("}", 1)[-1] == "loc" and element.text:
+            url = normalize_url(element.text, base_url)
+            if url:
+                urls.append(url)
+    return urls
+
+
+def is_seed_index(url: str) -> bool:
+    """True for TOC/sitemap URLs, which seed the crawl instead of being saved."""
+
+    path = urlsplit(url).path.lower()
+    return path.endswith(".json") or path.endswith(".xml")
+
+
+def parse_seed_index(url: str, payload: str, base_url: str) -> list[str]:
+    """Dispatch to `parse_toc`/`parse_sitemap`; malformed payloads raise ValueError."""
+
+    try:
+        if urlsplit(url).path.lower().endswith(".json"):
+            return parse_toc(payload, base_url)
+        return parse_sitemap(payload, base_url)
+    except ET.ParseError as exc:
+        raise ValueError(str(exc)) from exc
+
+
+def slug_for_url(url: str) -> str:
+    """File-safe name for a crawled page: its readable path plus a short hash of the URL.
+
+    Folding the path to `[a-z0-9_]` loses the host, the query and punctuation, so the
+    hash of the normalized URL keeps e.g. `a-b.html`, `a_b.html` and `?page=2` apart.
+    """
+
+    parts = urlsplit(url)
+    path = re.sub(r"\.html?$", "", parts.path.strip("/")) or "index"
+    readable = re.sub(r"[^a-z0-9]+", "_", path.lower()).strip("_")
+    digest = hashlib.sha1((normalize_url(url) or url).encode("utf-8")).hexdigest()[:8]
+    return f"{readable}_{digest}"
+
+
+@dataclass(frozen=True)
+class CrawlScope:
+    """URL prefixes a crawl may follow: the directory of each root, HTML pages only."""
+
+    prefixes: tuple[str, ...]
+
+    @classmethod
+    def from_roots(cls, roots: Iterable[str]) -> "CrawlScope":
+        prefixes = {url[: url.rindex("/") + 1] for url in roots}
+        return cls(tuple(sorted(prefixes)))
+
+    def __contains__(self, url: str) -> bool:
+        path = urlsplit(url).path
+        if not (path.endswith("/") or path.lower().endswith((".html", ".htm"))):
+            return False
+        return any(url.startswith(prefix) for prefix in self.prefixes)
+
+
+@dataclass
+class CrawlState:
+    """Frontier and visited set of a crawl, saved after every batch so it can resume.
+
+    `seen` holds every URL ever queued, so a page is fetched at most once per crawl.
+    """
+
+    roots: list[str]
+    max_depth: int
+    frontier: deque = field(default_factory=deque)
+    seen: set[str] = field(default_factory=set)
+    visited: dict[str, Optional[str]] = field(default_factory=dict)
+
+    @classmethod
+    def start(cls, roots: list[str], max_depth: int) -> "CrawlState":
+        state = cls(roots=roots, max_depth=max_depth)
+        for root in roots:
+            state.enqueue(root, 0)
+        return state
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["CrawlState"]:
+        if not path.exists():
+            return None
+        try:
+            raw = json.loads(path.read_text(encoding="utf-8"))
+            return cls(
+                roots=raw["roots"],
+                max_depth=raw["max_depth"],
+                frontier=deque((url, depth) for url, depth in raw["frontier"]),
+                seen=set(raw["seen"]),
+                visited=dict(raw["visited"]),
+            )
+        except (ValueError, KeyError, TypeError):
+            return None
+
+    def enqueue(self, url: str, depth: int) -> bool:
+        if url in self.seen or depth > self.max_depth:
+            return False
+        self.seen.add(url)
+        self.frontier.append((url, depth))
+        return True
+
+    def save(self, path: Path) -> None:
+        payload = {
+            "roots": self.roots,
+            "max_depth": self.max_depth,
+            "frontier": list(self.frontier),
+            "seen": sorted(self.seen),
+            "visited": self.visited,
+        }
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(json.dumps(payload) + "\n", encoding="utf-8")
+        os.replace(tmp_path, path)
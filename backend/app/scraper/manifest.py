@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional
+
+MANIFEST_NAME = "scrape_manifest.json"
+
+
+@dataclass
+class ManifestEntry:
+    """Validators and content hash recorded for one URL on its last successful fetch."""
+
+    path: str
+    sha256: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    # Outgoing links of HTML pages, so a crawl can expand a page that returned 304.
+    links: Optional[list[str]] = None
+
+
+class ScrapeManifest:
+    """`scrape_manifest.json` in the output directory, keyed by URL.
+
+    Entries whose output file has been deleted are treated as missing, so the next
+    run refetches them unconditionally.
+    """
+
+    def __init__(self, output_dir: Path, entries: dict[str, ManifestEntry] | None = None) -> None:
+        self.output_dir = output_dir
+        self.path = output_dir / MANIFEST_NAME
+        self._entries = dict(entries or {})
+
+    @classmethod
+    def load(cls, output_dir: Path) -> "ScrapeManifest":
+        path = output_dir / MANIFEST_NAME
+        if not path.exists():
+            return cls(output_dir)
+        try:
+            raw = json.loads(path.read_text(encoding="utf-8"))
+            entries = {url: ManifestEntry(**entry) for url, entry in raw.items()}
+        except (ValueError, TypeError):
+            return cls(output_dir)
+        return cls(output_dir, entries)
+
+    def get(self, url: str) -> Optional[ManifestEntry]:
+        entry = self._entries.get(url)
+        if entry is None or not (self.output_dir / entry.path).exists():
+            return None
+        return entry
+
+    def put(self, url: str, entry: ManifestEntry) -> None:
+        self._entries[url] = entry
+
+    def save(self) -> None:
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        payload = {url: asdict(entry) for url, entry in sorted(self._entries.items())}
+        tmp_path.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+
+def conditional_headers(entry: Optional[ManifestEntry]) -> dict[str, str]:
+    """`If-None-Match`/`If-Modified-Since` for a previously fetched URL."""
+
+    if entry is None:
+        return {}
+    headers = {}
+    if entry.etag:
+        headers["If-None-Match"] = entry.etag
+    if entry.last_modified:
+        headers["If-Modified-Since"] = entry.last_modified
+    return headers
@@ -1,11 +1,14 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
+import hashlib
 import json
+import os
+import random
 import re
 import sys
-import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Iterable, Sequence
 
@@ -13,6 +16,19 @@ import httpx
 from bs4 import BeautifulSoup
 
 from ..config import get_settings
+from ..http_utils import parse_retry_after
+from .crawler import (
+    CRAWL_STATE_NAME,
+    CrawlScope,
+    CrawlState,
+    extract_links,
+    is_seed_index,
+    normalize_url,
+    parse_seed_index,
+    slug_for_url,
+)
+from .manifest import ManifestEntry, ScrapeManifest, conditional_headers
+from .politeness import HostRateLimiter
 
 
 @dataclass(frozen=True)
@@ -70,11 +86,58 @@ DEFAULT_DOCUMENTS: tuple[DocumentSpec, ...] = (
 )
 
 
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/121.0.0.0 Safari/537.36"
+)
+
+
+@dataclass
+class ScrapeResult:
+    """Outcome of a scrape run; `changed` lists only files whose content was (re)written."""
+
+    changed: list[Path] = field(default_factory=list)
+    unchanged: list[Path] = field(default_factory=list)
+    failed: list[str] = field(default_factory=list)
+
+    @property
+    def paths(self) -> list[Path]:
+        return self.changed + self.unchanged
+
+
 class WAFRScraper:
+    """Fetch document specs concurrently with per-host politeness.
+
+    Up to `concurrency` requests run at once, each host is limited to `host_rate`
+    requests per second (bursts of `host_burst`), and network errors, 429 and 5xx
+    responses are retried with jittered exponential backoff that honours `Retry-After`.
+    Each document is written to disk as soon as its download completes; PDFs are
+    streamed straight to a temporary file.
+
+    With `conditional=True` (the default) each URL's `ETag`, `Last-Modified` and content
+    hash are kept in a `ScrapeManifest`; later runs send `If-None-Match` and
+    `If-Modified-Since`, and a `304` or an identical body leaves the existing file
+    untouched without parsing it again.
+
+    `crawl()` starts from root pages (or TOC/sitemap indexes) instead of a fixed spec
+    list and follows in-scope links breadth-first; see `crawl_async`.
+    """
+
     def __init__(
         self,
         output_dir: Path | None = None,
         request_timeout: float | None = None,
+        *,
+        concurrency: int | None = None,
+        host_rate: float | None = None,
+        host_burst: int | None = None,
+        max_retries: int | None = None,
+        retry_backoff: float | None = None,
+        retry_max_delay: float | None = None,
+        conditional: bool = True,
     ) -> None:
         settings = get_settings()
         if output_dir is not None:
@@ -83,55 +146,276 @@ class WAFRScraper:
             self.output_dir = settings.scraper_output_dir
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.request_timeout = request_timeout or settings.scraper_request_timeout
+        self.concurrency = max(1, concurrency or settings.scraper_concurrency)
+        self.host_rate = settings.scraper_host_rate if host_rate is None else host_rate
+        self.host_burst = host_burst or settings.scraper_host_burst
+        self.max_retries = settings.scraper_max_retries if max_retries is None else max_retries
+        self.retry_backoff = settings.scraper_retry_backoff if retry_backoff is None else retry_backoff
+        self.retry_max_delay = (
+            settings.scraper_retry_max_delay if retry_max_delay is None else retry_max_delay
+        )
+        self.conditional = conditional
+        self.crawl_max_depth = settings.scraper_crawl_max_depth
+        self.crawl_max_pages = settings.scraper_crawl_max_pages
 
-        self._client = httpx.Client(
+    def _client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
             timeout=self.request_timeout,
-            headers={
-                "User-Agent": (
-                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                    "AppleWebKit/537.36 (KHTML, like Gecko) "
-                    "Chrome/121.0.0.0 Safari/537.36"
-                )
-            },
+            headers={"User-Agent": USER_AGENT},
             follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.concurrency),
         )
 
-    def scrape(self, documents: Iterable[DocumentSpec] | None = None) -> list[Path]:
+    def scrape(self, documents: Iterable[DocumentSpec] | None = None) -> ScrapeResult:
+        return asyncio.run(self.scrape_async(documents))
+
+    async def scrape_async(self, documents: Iterable[DocumentSpec] | None = None) -> ScrapeResult:
+        """Fetch every spec; paths in the result keep spec order."""
+
         docs = list(documents or DEFAULT_DOCUMENTS)
-        saved_files: list[Path] = []
-        for spec in docs:
-            result = self._scrape_single(spec)
-            if result:
-                saved_files.append(result)
-            time.sleep(1)  # be kind to origin
-        return saved_files
-
-    def _scrape_single(self, spec: DocumentSpec) -> Path | None:
+        limiter = HostRateLimiter(self.host_rate, self.host_burst)
+        manifest = ScrapeManifest.load(self.output_dir)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._client() as client:
+
+            async def fetch(spec: DocumentSpec) -> tuple[Path, bool] | None:
+                async with semaphore:
+                    return await self._scrape_single(client, limiter, manifest, spec)
+
+            outcomes = await asyncio.gather(*(fetch(spec) for spec in docs))
+        manifest.save()
+
+        result = ScrapeResult()
+        for spec, outcome in zip(docs, outcomes):
+            if outcome is None:
+                result.failed.append(spec.url)
+                continue
+            path, changed = outcome
+            (result.changed if changed else result.unchanged).append(path)
+        return result
+
+    def crawl(self, roots: Iterable[str], **kwargs: object) -> ScrapeResult:
+        return asyncio.run(self.crawl_async(roots, **kwargs))
+
+    async def crawl_async(
+        self,
+        roots: Iterable[str],
+        *,
+        max_depth: int | None = None,
+        max_pages: int | None = None,
+        content_selector: str | None = "main",
+        restart: bool = False,
+        specs: Iterable[DocumentSpec] | None = None,
+    ) -> ScrapeResult:
+        """Breadth-first crawl from `roots`, saving every page like `scrape()` does.
+
+        Links are followed only within the directories of the roots (`CrawlScope`), up to
+        `max_depth` hops and `max_pages` saved pages. Roots ending in `.json` or `.xml`
+        are read as `toc-contents.json` or `sitemap.xml` indexes and seed the frontier.
+        The frontier is written to `crawl_state.json` after every batch, so an
+        interrupted crawl resumes where it stopped; the file is removed once the crawl
+        finishes. The result only covers pages fetched by this call.
+
+        A page whose URL matches one of `specs` (default `DEFAULT_DOCUMENTS`) is saved
+        under that spec's slug and selector, so crawling after a plain scrape does not
+        store the same page twice; other pages are named by `slug_for_url`.
+        """
+
+        max_depth = self.crawl_max_depth if max_depth is None else max_depth
+        max_pages = self.crawl_max_pages if max_pages is None else max_pages
+        root_urls = [url for url in (normalize_url(root) for root in roots) if url]
+        state_path = self.output_dir / CRAWL_STATE_NAME
+        state = None if restart else CrawlState.load(state_path)
+        if state is None or state.roots != root_urls or state.max_depth != max_depth:
+            state = CrawlState.start(root_urls, max_depth)
+        scope = CrawlScope.from_roots(root_urls)
+        limiter = HostRateLimiter(self.host_rate, self.host_burst)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        manifest = ScrapeManifest.load(self.output_dir)
+        result = ScrapeResult()
+        known = {
+            normalize_url(spec.url): spec
+            for spec in (DEFAULT_DOCUMENTS if specs is None else specs)
+        }
+
+        async with self._client() as client:
+
+            async def visit(url: str) -> tuple[tuple[Path, bool] | None, list[str]]:
+                async with semaphore:
+                    if is_seed_index(url):
+                        return None, await self._fetch_index(client, limiter, url)
+                    spec = known.get(url) or DocumentSpec(
+                        slug=slug_for_url(url), url=url, content_selector=content_selector
+                    )
+                    outcome = await self._scrape_single(client, limiter, manifest, spec)
+                    entry = manifest.get(spec.url)
+                    return outcome, (entry.links or []) if outcome and entry else []
+
+            pages = sum(1 for url in state.visited if not is_seed_index(url))
+            while state.frontier and pages < max_pages:
+                batch = []
+                while state.frontier and len(batch) < min(self.concurrency, max_pages - pages):
+                    batch.append(state.frontier.popleft())
+                outcomes = await asyncio.gather(*(visit(url) for url, _ in batch))
+
+                for (url, depth), (outcome, links) in zip(batch, outcomes):
+                    next_depth = depth
+                    if not is_seed_index(url):
+                        pages += 1
+                        next_depth = depth + 1
+                        if outcome is None:
+                            result.failed.append(url)
+                        else:
+                            path, changed = outcome
+                            (result.changed if changed else result.unchanged).append(path)
+                    state.visited[url] = outcome[0].name if outcome else None
+                    for link in links:
+                        if link in scope:
+                            state.enqueue(link, next_depth)
+                state.save(state_path)
+                manifest.save()
+
+        state_path.unlink(missing_ok=True)
+        return result
+
+    async def _fetch_index(
+        self,
+        client: httpx.AsyncClient,
+        limiter: HostRateLimiter,
+        url: str,
+    ) -> list[str]:
+        try:
+            response = await self._send(client, limiter, DocumentSpec(slug="index", url=url), {})
+            try:
+                await response.aread()
+            finally:
+                await response.aclose()
+            return parse_seed_index(url, response.text, str(response.url))
+        except (httpx.HTTPError, ValueError) as exc:
+            print(f"[warn] Failed to read crawl index {url}: {exc}", file=sys.stderr)
+            return []
+
+    def _retry_delay(self, attempt: int, response: httpx.Response | None) -> float:
+        """Backoff before retry `attempt`; a `Retry-After` wins but is capped like the rest."""
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                return min(retry_after, self.retry_max_delay)
+        return min(self.retry_backoff * 2**attempt * random.uniform(0.5, 1.0), self.retry_max_delay)
+
+    async def _send(
+        self,
+        client: httpx.AsyncClient,
+        limiter: HostRateLimiter,
+        spec: DocumentSpec,
+        headers: dict[str, str],
+    ) -> httpx.Response:
+        """Open a streamed GET for `spec`, retrying transient failures; caller closes it."""
+
+        attempt = 0
+        while True:
+            await limiter.acquire(spec.url)
+            response = None
+            try:
+                request = client.build_request("GET", spec.url, headers=headers)
+                response = await client.send(request, stream=True)
+            except httpx.TransportError:
+                if attempt >= self.max_retries:
+                    raise
+            else:
+                if response.status_code not in RETRYABLE_STATUSES or attempt >= self.max_retries:
+                    if response.is_error:
+                        await response.aclose()
+                        response.raise_for_status()
+                    return response
+                await response.aclose()
+            await asyncio.sleep(self._retry_delay(attempt, response))
+            attempt += 1
+
+    async def _scrape_single(
+        self,
+        client: httpx.AsyncClient,
+        limiter: HostRateLimiter,
+        manifest: ScrapeManifest,
+        spec: DocumentSpec,
+    ) -> tuple[Path, bool] | None:
+        """Fetch one spec; returns its path and whether the file was (re)written."""
+
+        is_pdf = self._is_pdf(spec.url)
+        path = self.output_dir / (
+            (spec.file_name or f"{spec.slug}.pdf") if is_pdf else f"{spec.slug}.jsonl"
+        )
+        previous = manifest.get(spec.url) if self.conditional else None
+        if previous is not None and previous.path != path.name:
+            previous = None
+        if previous is not None and not is_pdf and previous.links is None:
+            # Recorded before links were kept; fetch once more to learn them.
+            previous = None
+
         try:
-            response = self._client.get(spec.url)
-            response.raise_for_status()
+            response = await self._send(client, limiter, spec, conditional_headers(previous))
+            try:
+                if response.status_code == 304 and previous is not None:
+                    return path, False
+                validators = {
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                }
+                if is_pdf:
+                    digest = hashlib.sha256()
+                    tmp_path = path.with_name(path.name + ".tmp")
+                    with tmp_path.open("wb") as stream:
+                        async for block in response.aiter_bytes():
+                            digest.update(block)
+                            stream.write(block)
+                    entry = ManifestEntry(path=path.name, sha256=digest.hexdigest(), **validators)
+                    manifest.put(spec.url, entry)
+                    if previous is not None and previous.sha256 == entry.sha256:
+                        tmp_path.unlink()
+                        return path, False
+                    os.replace(tmp_path, path)
+                    return path, True
+                body = await response.aread()
+                html_text = response.text
+                base_url = str(response.url)
+            finally:
+                await response.aclose()
         except httpx.HTTPError as exc:
             print(f"[warn] Failed to fetch {spec.url}: {exc}", file=sys.stderr)
             return None
 
-        if self._is_pdf(spec.url):
-            file_name = spec.file_name or f"{spec.slug}.pdf"
-            path = self.output_dir / file_name
-            path.write_bytes(response.content)
-            return path
+        # The selector decides what is extracted, so it is part of the content identity.
+        digest = hashlib.sha256(f"{spec.content_selector}\x00".encode("utf-8") + body)
+        if previous is not None and previous.sha256 == digest.hexdigest():
+            manifest.put(
+                spec.url,
+                ManifestEntry(
+                    path=path.name, sha256=previous.sha256, links=previous.links, **validators
+                ),
+            )
+            return path, False
 
-        html_text = response.text
-        cleaned = self._extract_text(html_text, spec.content_selector)
+        # Parsing is CPU-bound; keep it off the event loop so downloads continue.
+        cleaned, links = await asyncio.to_thread(
+            self._parse_html, html_text, spec.content_selector, base_url
+        )
         self._write_jsonl(spec.slug, spec.url, cleaned)
-        return self.output_dir / f"{spec.slug}.jsonl"
+        manifest.put(
+            spec.url,
+            ManifestEntry(path=path.name, sha256=digest.hexdigest(), links=links, **validators),
+        )
+        return path, True
 
     @staticmethod
     def _is_pdf(url: str) -> bool:
         return url.lower().endswith(".pdf")
 
     @staticmethod
-    def _extract_text(html: str, selector: str | None) -> str:
+    def _parse_html(html: str, selector: str | None, base_url: str) -> tuple[str, list[str]]:
+        """Cleaned text of the `selector` node and every link on the page."""
+
         soup = BeautifulSoup(html, "lxml")
+        links = extract_links(soup, base_url)
         node = soup.select_one(selector) if selector else soup.body
         if not node:
             node = soup.body
@@ -143,7 +427,7 @@ class WAFRScraper:
                 continue
             text = re.sub(r"\s+", " ", text)
             paragraphs.append(text)
-        return "\n".join(paragraphs)
+        return "\n".join(paragraphs), links
 
     def _write_jsonl(self, slug: str, source_url: str, content: str) -> None:
         payload = {
@@ -152,10 +436,12 @@ class WAFRScraper:
             "content": content,
         }
         path = self.output_dir / f"{slug}.jsonl"
-        path.write_text(
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(
             json.dumps(payload, ensure_ascii=False) + "\n",
             encoding="utf-8",
         )
+        os.replace(tmp_path, path)
 
 
 def _load_specs_from_file(path: Path) -> Sequence[DocumentSpec]:
@@ -185,6 +471,48 @@ def _parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
         default=None,
         help="Directory where scraped documents should be stored (defaults to data/raw).",
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=None,
+        help="Concurrent requests (defaults to SCRAPER_CONCURRENCY).",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Refetch and rewrite every document, ignoring the scrape manifest.",
+    )
+    parser.add_argument(
+        "--crawl",
+        action="store_true",
+        help="Follow in-scope links from the roots instead of fetching only the listed specs.",
+    )
+    parser.add_argument(
+        "--root",
+        action="append",
+        default=None,
+        help=(
+            "Crawl root page, toc-contents.json or sitemap.xml; repeatable "
+            "(defaults to the HTML document specs)."
+        ),
+    )
+    parser.add_argument(
+        "--max-depth",
+        type=int,
+        default=None,
+        help="Link hops to follow from the roots (defaults to SCRAPER_CRAWL_MAX_DEPTH).",
+    )
+    parser.add_argument(
+        "--max-pages",
+        type=int,
+        default=None,
+        help="Pages to save per crawl (defaults to SCRAPER_CRAWL_MAX_PAGES).",
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Discard the saved state of an interrupted crawl and start over.",
+    )
     parser.add_argument(
         "--specs-file",
         type=Path,
@@ -197,15 +525,34 @@ def _parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
 def main(argv: Sequence[str] | None = None) -> None:
     args = _parse_args(argv)
 
-    scraper = WAFRScraper(output_dir=args.output)
+    scraper = WAFRScraper(
+        output_dir=args.output,
+        concurrency=args.concurrency,
+        conditional=not args.force,
+    )
 
     documents: Iterable[DocumentSpec] = DEFAULT_DOCUMENTS
     if args.specs_file and args.specs_file.exists():
         documents = _load_specs_from_file(args.specs_file)
 
-    saved = scraper.scrape(documents)
-    for path in saved:
+    if args.crawl:
+        roots = args.root or [spec.url for spec in documents if not scraper._is_pdf(spec.url)]
+        result = scraper.crawl(
+            roots,
+            max_depth=args.max_depth,
+            max_pages=args.max_pages,
+            restart=args.restart,
+            specs=documents,
+        )
+    else:
+        result = scraper.scrape(documents)
+    for path in result.changed:
         print(path)  # noqa: T201
+    print(
+        f"{len(result.changed)} changed, {len(result.unchanged)} unchanged, "
+        f"{len(result.failed)} failed",
+        file=sys.stderr,
+    )
 
 
 if __name__ == "__main__":
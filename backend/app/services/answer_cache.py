@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+
+from .cache import normalise_query
+
+# Hits only bump `last_used`; they are written in batches of this many rows (and on every
+# `put` and `close`) instead of one SQLite commit per hit under the cache lock.
+TOUCH_FLUSH_SIZE = 64
+
+
+@dataclass
+class _Entry:
+    signature: str
+    vector: Optional[np.ndarray]
+    answer: str
+
+
+class AnswerCache:
+    """LRU cache of LLM answers keyed on the query and the context it was answered from.
+
+    An entry matches when the normalised query, the retrieved chunk IDs, the history and
+    the model signature are identical. With `similarity_threshold` set, a miss falls back
+    to any cached answer with the same chunk IDs, history and model whose query embedding
+    has at least that cosine similarity.
+
+    `generation` returns a marker of the underlying corpus (e.g. the embeddings file
+    fingerprint); whenever it changes, every entry is dropped. When `path` is given,
+    entries are written through to SQLite so a restarted process starts warm; recency
+    updates from hits are batched, so a crash may lose the LRU order of recent hits.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        *,
+        generation: Callable[[], str],
+        similarity_threshold: Optional[float] = None,
+        path: Optional[Path] = None,
+    ) -> None:
+        if max_size < 0:
+            raise ValueError("max_size must be >= 0")
+        self._max_size = max_size
+        self._generation = generation
+        self._similarity_threshold = similarity_threshold
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._by_signature: dict[str, set[str]] = {}
+        self._touched: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._current_generation = generation()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+        self._db: Optional[sqlite3.Connection] = None
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                "key TEXT PRIMARY KEY, generation TEXT, signature TEXT, "
+                "vector BLOB, answer TEXT, last_used REAL)"
+            )
+            self._load_persisted()
+
+    @staticmethod
+    def _signature(chunk_ids: Sequence[str], history: str, model: str) -> str:
+        payload = json.dumps([list(chunk_ids), history, model], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _key(query: str, signature: str) -> str:
+        payload = normalise_query(query) + "\x00" + signature
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _unit(vector: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        if vector is None:
+            return None
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm > 0 else None
+
+    def get(
+        self,
+        query: str,
+        chunk_ids: Sequence[str],
+        *,
+        history: str = "",
+        model: str = "",
+        query_vector: Optional[np.ndarray] = None,
+    ) -> Optional[str]:
+        signature = self._signature(chunk_ids, history, model)
+        key = self._key(query, signature)
+        with self._lock:
+            self._check_generation()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._touch(key)
+                self.hits += 1
+                return entry.answer
+
+            unit = self._unit(query_vector)
+            if self._similarity_threshold is not None and unit is not None:
+                best_key, best_score = None, self._similarity_threshold
+                for candidate_key in self._by_signature.get(signature, ()):
+                    candidate = self._entries[candidate_key]
+                    if candidate.vector is None:
+                        continue
+                    score = float(candidate.vector @ unit)
+                    if score >= best_score:
+                        best_key, best_score = candidate_key, score
+                if best_key is not None:
+                    self._touch(best_key)
+                    self.near_hits += 1
+                    return self._entries[best_key].answer
+
+            self.misses += 1
+            return None
+
+    def put(
+        self,
+        query: str,
+        chunk_ids: Sequence[str],
+        answer: str,
+        *,
+        history: str = "",
+        model: str = "",
+        query_vector: Optional[np.ndarray] = None,
+    ) -> None:
+        if self._max_size == 0:
+            return
+        signature = self._signature(chunk_ids, history, model)
+        key = self._key(query, signature)
+        entry = _Entry(signature=signature, vector=self._unit(query_vector), answer=answer)
+        with self._lock:
+            self._check_generation()
+            self._insert(key, entry)
+            if self._db is not None:
+                vector = entry.vector.tobytes() if entry.vector is not None else None
+                self._db.execute(
+                    "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, self._current_generation, signature, vector, answer, time.time()),
+                )
+            self._evict()
+            if self._db is not None:
+                self._flush_touches()
+                self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_signature.clear()
+            self._touched.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM answers")
+                self._db.commit()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self._max_size,
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._flush_touches()
+                self._db.commit()
+                self._db.close()
+                self._db = None
+
+    def _check_generation(self) -> None:
+        generation = self._generation()
+        if generation == self._current_generation:
+            return
+        self._current_generation = generation
+        self._entries.clear()
+        self._by_signature.clear()
+        self._touched.clear()
+        self.invalidations += 1
+        if self._db is not None:
+            self._db.execute("DELETE FROM answers WHERE generation != ?", (generation,))
+            self._db.commit()
+
+    def _insert(self, key: str, entry: _Entry) -> None:
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._by_signature[previous.signature].discard(key)
+        self._entries[key] = entry
+        self._by_signature.setdefault(entry.signature, set()).add(key)
+
+    def _touch(self, key: str) -> None:
+        self._entries.move_to_end(key)
+        if self._db is not None:
+            self._touched[key] = time.time()
+            if len(self._touched) >= TOUCH_FLUSH_SIZE:
+                self._flush_touches()
+                self._db.commit()
+
+    def _flush_touches(self) -> None:
+        """Write pending `last_used` updates; the caller commits."""
+        if not self._touched:
+            return
+        assert self._db is not None
+        self._db.executemany(
+            "UPDATE answers SET last_used = ? WHERE key = ?",
+            [(last_used, key) for key, last_used in self._touched.items()],
+        )
+        self._touched.clear()
+
+    def _evict(self) -> None:
+        while len(self._entries) > self._max_size:
+            key, entry = self._entries.popitem(last=False)
+            keys = self._by_signature[entry.signature]
+            keys.discard(key)
+            if not keys:
+                del self._by_signature[entry.signature]
+            self._touched.pop(key, None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM answers WHERE key = ?", (key,))
+
+    def _load_persisted(self) -> None:
+        assert self._db is not None
+        self._db.execute(
+            "DELETE FROM answers WHERE generation != ?", (self._current_generation,)
+        )
+        rows = self._db.execute(
+            "SELECT key, signature, vector, answer FROM answers ORDER BY last_used DESC LIMIT ?",
+            (self._max_size,),
+        ).fetchall()
+        for key, signature, vector, answer in reversed(rows):
+            array = np.frombuffer(vector, dtype=np.float32) if vector is not None else None
+            self._insert(key, _Entry(signature=signature, vector=array, answer=answer))
+        self._db.execute(
+            "DELETE FROM answers WHERE key NOT IN (SELECT key FROM answers ORDER BY last_used DESC LIMIT ?)",
+            (self._max_size,),
+        )
+        self._db.commit()
@@ -1,12 +1,30 @@
 from __future__ import annotations
 
-from typing import Iterable, Optional, Protocol
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Iterable, Optional, Protocol
 
-from sentence_transformers import SentenceTransformer
+import numpy as np
 
 from ..config import Settings
+from ..fingerprint import file_fingerprint
+from ..ingest.model_loader import EmbeddingModel
+from ..ingest.tokenizer import count_tokens
 from ..schemas import ChatMessage, ChatRequest, ChatResponse
-from ..retrieval.in_memory_store import InMemoryVectorStore, RetrievedChunk
+from ..retrieval.bm25 import BM25Index
+from ..retrieval.diversity import merge_adjacent, mmr_select
+from ..retrieval.fusion import reciprocal_rank_fusion
+from ..retrieval.in_memory_store import RetrievedChunk
+from ..retrieval.store import VectorStore
+from .answer_cache import AnswerCache
+from .cache import LRUCache, normalise_query
+from .embedding_batcher import EmbeddingMicroBatcher
+from .llm.resilience import LLMUnavailableError
+from .prompt_packing import chunk_label, fit_history, pack_context
+
+
+SYSTEM_PROMPT = "You are an AWS Well-Architected Framework assistant."
 
 
 class LLMClient(Protocol):
@@ -14,98 +32,463 @@ class LLMClient(Protocol):
         ...
 
 
+class AsyncLLMClient(Protocol):
+    async def generate(self, prompt: str, *, system_prompt: Optional[str] = None) -> str:
+        ...
+
+    async def aclose(self) -> None:
+        ...
+
+
+class StreamingLLMClient(AsyncLLMClient, Protocol):
+    def stream(self, prompt: str, *, system_prompt: Optional[str] = None) -> AsyncIterator[str]:
+        ...
+
+
+@dataclass(frozen=True)
+class StreamEvent:
+    """One server-sent event of a streamed answer: `sources`, `token` or `done`."""
+
+    event: str
+    data: object
+
+
+@dataclass(frozen=True)
+class RetrievalIndex:
+    """Vector store and lexical index that are searched together.
+
+    The chat service holds one immutable snapshot and replaces it wholesale, so a request
+    reads both from the same generation and keeps using it even if a reload swaps in a
+    new one mid-request. `generation` marks the corpus for the answer cache.
+    """
+
+    store: Optional[VectorStore]
+    lexical_index: Optional[BM25Index] = None
+    generation: Optional[str] = None
+
+
+@dataclass
+class PreparedAnswer:
+    """Retrieval outcome for one request: a final `response`, or a `prompt` for the LLM."""
+
+    query: str
+    query_vector: np.ndarray
+    response: Optional[ChatResponse] = None
+    prompt: str = ""
+    sources: list[str] = field(default_factory=list)
+    chunks: list[RetrievedChunk] = field(default_factory=list)
+    chunk_ids: list[str] = field(default_factory=list)
+    history_text: str = ""
+
+
 class RetrievalAugmentedChatService:
-    """Retrieval-Augmented Generation pipeline using an in-memory vector store."""
+    """Retrieval-Augmented Generation pipeline over an in-memory or Elasticsearch store."""
 
     def __init__(
         self,
         *,
         settings: Settings,
-        embedder: SentenceTransformer,
-        store: Optional[InMemoryVectorStore],
+        embedder: EmbeddingModel,
+        store: Optional[VectorStore],
         llm_client: Optional[LLMClient],
+        lexical_index: Optional[BM25Index] = None,
+        async_llm_client: Optional[AsyncLLMClient] = None,
     ) -> None:
         self._settings = settings
         self._embedder = embedder
-        self._store = store
+        self._index = RetrievalIndex(store, lexical_index)
         self._llm_client = llm_client
+        self._async_llm_client = async_llm_client
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.embedding_executor_workers,
+            thread_name_prefix="wafr-embedding",
+        )
+        self._query_cache: LRUCache[str, np.ndarray] = LRUCache(
+            settings.query_cache_size,
+            settings.query_cache_ttl_seconds,
+        )
+        self._answer_cache: Optional[AnswerCache] = None
+        # Elasticsearch can be re-indexed behind the service's back, and nothing here
+        # tells the corpus version apart, so cached answers could go stale: no cache.
+        if settings.answer_cache_size > 0 and settings.vector_store == "memory":
+            self._answer_cache = AnswerCache(
+                settings.answer_cache_size,
+                generation=lambda: self._index.generation
+                or file_fingerprint(settings.embeddings_file),
+                similarity_threshold=settings.answer_cache_similarity_threshold,
+                path=settings.answer_cache_path,
+            )
+        self._model_signature = "|".join(
+            [
+                settings.deepseek_model_name,
+                str(settings.deepseek_temperature),
+                str(settings.deepseek_max_output_tokens),
+                str(settings.max_prompt_tokens),
+            ]
+        )
 
-    def _format_history(self, history: Iterable[ChatMessage] | None) -> str:
+    @property
+    def index(self) -> RetrievalIndex:
+        return self._index
+
+    def swap_index(self, index: RetrievalIndex) -> RetrievalIndex:
+        """Make `index` current and return the previous one.
+
+        A single reference assignment: requests already retrieving finish on the old
+        snapshot, later ones see the new one.
+        """
+        previous, self._index = self._index, index
+        return previous
+
+    def stats(self) -> dict[str, dict[str, object]]:
+        """Runtime counters exposed through the `/stats` endpoint."""
+        stats: dict[str, dict[str, object]] = {"query_cache": self._query_cache.stats()}
+        if self._answer_cache is not None:
+            stats["answer_cache"] = self._answer_cache.stats()
+        if isinstance(self._embedder, EmbeddingMicroBatcher):
+            stats["embedding_batcher"] = self._embedder.stats()
+        llm_client = self._async_llm_client or self._llm_client
+        if hasattr(llm_client, "stats"):
+            stats["llm"] = llm_client.stats()
+        return stats
+
+    def _cache_query_vector(self, key: str, vector: object) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        array.flags.writeable = False
+        self._query_cache.put(key, array)
+        return array
+
+    def _encode_query(self, query: str) -> np.ndarray:
+        key = normalise_query(query)
+        cached = self._query_cache.get(key)
+        if cached is not None:
+            return cached
+        return self._cache_query_vector(key, self._embedder.encode([query], convert_to_numpy=True)[0])
+
+    async def _encode_query_async(self, query: str) -> np.ndarray:
+        key = normalise_query(query)
+        cached = self._query_cache.get(key)
+        if cached is not None:
+            return cached
+        if isinstance(self._embedder, EmbeddingMicroBatcher):
+            # Await the shared batch without parking an executor thread on it.
+            vector = await asyncio.wrap_future(self._embedder.submit(query))
+        else:
+            loop = asyncio.get_running_loop()
+            vector = (
+                await loop.run_in_executor(
+                    self._executor,
+                    lambda: self._embedder.encode([query], convert_to_numpy=True),
+                )
+            )[0]
+        return self._cache_query_vector(key, vector)
+
+    @staticmethod
+    def _history_turns(history: Iterable[ChatMessage] | None) -> list[str]:
         if not history:
-            return ""
-        snippets = []
-        for message in history:
-            role = message.role
-            snippets.append(f"{role.capitalize()}: {message.content}")
-        return "\n".join(snippets)
-
-    def _build_prompt(self, query: str, context_chunks: list[RetrievedChunk], history: str) -> str:
-        context_lines = []
-        for idx, chunk in enumerate(context_chunks, start=1):
-            label = chunk.source or chunk.chunk_id
-            context_lines.append(f"[{idx}] Source: {label}\n{chunk.text}")
-        context_block = "\n\n".join(context_lines)
+            return []
+        return [f"{message.role.capitalize()}: {message.content}" for message in history]
+
+    def _format_history(self, history: Iterable[ChatMessage] | None) -> str:
+        return "\n".join(self._history_turns(history))
+
+    def _retrieve(
+        self,
+        index: RetrievalIndex,
+        query: str,
+        query_vector: np.ndarray,
+        filters: Optional[dict[str, str]],
+        payload: ChatRequest,
+    ) -> list[RetrievedChunk]:
+        """Search, then apply the request's (or the configured) diversity options."""
+
+        settings = self._settings
+        top_k = settings.retrieval_top_k
+        mmr_lambda = payload.mmr_lambda
+        if mmr_lambda is None:
+            mmr_lambda = settings.retrieval_mmr_lambda
+        store = index.store
+        # MMR needs candidate embeddings, which only the in-memory store can hand back.
+        diversify = mmr_lambda < 1.0 and hasattr(store, "embeddings_for")
+        fetch = max(top_k, settings.retrieval_mmr_candidates) if diversify else top_k
+
+        retrieved = self._search(index, query, query_vector, filters, fetch)
+        if diversify and len(retrieved) > top_k:
+            query_unit = np.asarray(query_vector, dtype=np.float32)
+            query_unit = query_unit / np.linalg.norm(query_unit)
+            picked = mmr_select(query_unit, store.embeddings_for(retrieved), top_k, mmr_lambda)
+            retrieved = [retrieved[row] for row in picked]
+
+        merge = payload.merge_adjacent
+        if merge is None:
+            merge = settings.retrieval_merge_adjacent
+        return merge_adjacent(retrieved) if merge else retrieved
+
+    def _search(
+        self,
+        index: RetrievalIndex,
+        query: str,
+        query_vector: np.ndarray,
+        filters: Optional[dict[str, str]],
+        top_k: int,
+    ) -> list[RetrievedChunk]:
+        store = index.store
+        if index.lexical_index is None:
+            return store.search(
+                query_vector, top_k=top_k, filters=filters, query_text=query
+            )
+
+        # Hybrid retrieval: fuse dense and BM25 rankings so exact identifiers such as
+        # "REL10-BP02" surface even when the embedding similarity is weak.
+        candidates = max(top_k, self._settings.retrieval_hybrid_candidates)
+        dense = store.search(query_vector, top_k=candidates, filters=filters)
+        rows, scores = index.lexical_index.search(
+            query, candidates, subset=store.filter_rows(filters)
+        )
+        lexical = store.chunks_for_rows(rows, scores)
+        return reciprocal_rank_fusion(
+            [dense, lexical], top_k=top_k, k=self._settings.retrieval_rrf_k
+        )
+
+    def _build_prompt(
+        self,
+        query: str,
+        context_chunks: list[RetrievedChunk],
+        history_turns: list[str],
+    ) -> str:
+        """Assemble the prompt, packing context and history into `max_prompt_tokens`.
+
+        The instructions and question are always included; the remaining budget goes to
+        history (up to `prompt_history_max_share` of it, newest turns first) and then to
+        context chunks by score.
+        """
 
-        prompt_parts = [
+        instructions = [
             "You are an assistant that answers questions about the AWS Well-Architected Framework.",
             "Use the provided context strictly. Cite the source labels (e.g., [1]) when referencing information.",
             "If the answer is not contained in the context, state that explicitly.",
         ]
-        if history:
-            prompt_parts.append("Conversation so far:\n" + history)
+        question = "Question:\n" + query
+
+        max_tokens = self._settings.max_prompt_tokens
+        if max_tokens is not None:
+            fixed = count_tokens("\n\n".join([*instructions, "Conversation so far:", "Context:", question]))
+            available = max(0, max_tokens - fixed)
+            history_budget = int(available * self._settings.prompt_history_max_share)
+            history_turns, history_used = fit_history(history_turns, history_budget)
+            context_chunks, _ = pack_context(context_chunks, available - history_used)
+
+        context_lines = []
+        for idx, chunk in enumerate(context_chunks, start=1):
+            context_lines.append(f"{chunk_label(idx, chunk)}\n{chunk.text}")
+        context_block = "\n\n".join(context_lines)
+
+        prompt_parts = list(instructions)
+        if history_turns:
+            prompt_parts.append("Conversation so far:\n" + "\n".join(history_turns))
         prompt_parts.append("Context:\n" + context_block)
-        prompt_parts.append("Question:\n" + query)
+        prompt_parts.append(question)
         return "\n\n".join(prompt_parts)
 
-    def answer(self, payload: ChatRequest) -> ChatResponse:
-        query = payload.query.strip()
-        if not query:
-            raise ValueError("Query must not be empty.")
-
-        query_vector = self._embedder.encode(
-            [query],
-            convert_to_numpy=True,
-        )[0]
+    def _prepare(self, payload: ChatRequest, query: str, query_vector: np.ndarray) -> PreparedAnswer:
+        """Retrieve for `query`; CPU-bound, so the async path runs it off-loop."""
 
-        if not self._store:
-            return ChatResponse(
-                answer=(
-                    "Embeddings store is not initialised. Generate embeddings first "
-                    "using the ingestion pipeline, then restart the backend."
+        index = self._index
+        if index.store is None:
+            if self._settings.store_watch_interval_seconds > 0:
+                next_step = "the backend loads the file as soon as it appears."
+            else:
+                next_step = "then reload the index with POST /admin/reload."
+            return PreparedAnswer(
+                query=query,
+                query_vector=query_vector,
+                response=ChatResponse(
+                    answer=(
+                        "Embeddings store is not initialised. Generate embeddings first "
+                        f"using the ingestion pipeline; {next_step}"
+                    ),
+                    sources=[],
                 ),
-                sources=[],
             )
 
-        retrieved = self._store.search(query_vector, top_k=self._settings.retrieval_top_k)
+        filters = {"pillar": payload.pillar} if payload.pillar else None
+        retrieved = self._retrieve(index, query, query_vector, filters, payload)
         sources = []
         for chunk in retrieved:
             if chunk.source and chunk.source not in sources:
                 sources.append(chunk.source)
 
         history_text = self._format_history(payload.history)
+        prepared = PreparedAnswer(
+            query=query,
+            query_vector=query_vector,
+            sources=sources,
+            chunks=retrieved,
+            chunk_ids=[chunk.chunk_id for chunk in retrieved],
+            history_text=history_text,
+        )
 
         if not retrieved:
-            return ChatResponse(
+            prepared.response = ChatResponse(
                 answer="I could not retrieve any relevant context for that query yet. "
                 "Please ensure the ingestion pipeline has populated the embeddings file.",
                 sources=[],
             )
+            return prepared
 
-        if not self._llm_client:
-            preview_lines = [
-                "DeepSeek API key not configured. Showing top matches instead:",
-            ]
-            for idx, chunk in enumerate(retrieved, start=1):
-                preview_lines.append(
-                    f"{idx}. {chunk.summary or chunk.text[:120]} "
-                    f"(source: {chunk.source or chunk.chunk_id})"
-                )
-            return ChatResponse(answer="\n".join(preview_lines), sources=sources)
+        if not self._llm_client and not self._async_llm_client:
+            prepared.response = self._preview(
+                prepared, "DeepSeek API key not configured. Showing top matches instead:"
+            )
+            return prepared
+
+        if self._answer_cache is not None:
+            cached = self._answer_cache.get(
+                query,
+                prepared.chunk_ids,
+                history=history_text,
+                model=self._model_signature,
+                query_vector=query_vector,
+            )
+            if cached is not None:
+                prepared.response = ChatResponse(answer=cached, sources=sources)
+                return prepared
 
-        prompt = self._build_prompt(query, retrieved, history_text)
-        answer = self._llm_client.generate(
-            prompt,
-            system_prompt="You are an AWS Well-Architected Framework assistant.",
+        prepared.prompt = self._build_prompt(
+            query, retrieved, self._history_turns(payload.history)
         )
+        return prepared
+
+    @staticmethod
+    def _preview(prepared: PreparedAnswer, heading: str) -> ChatResponse:
+        preview_lines = [heading]
+        for idx, chunk in enumerate(prepared.chunks, start=1):
+            preview_lines.append(
+                f"{idx}. {chunk.summary or chunk.text[:120]} "
+                f"(source: {chunk.source or chunk.chunk_id})"
+            )
+        return ChatResponse(answer="\n".join(preview_lines), sources=prepared.sources)
+
+    def _unavailable(self, prepared: PreparedAnswer) -> ChatResponse:
+        """Degraded answer when the LLM is failing or its circuit breaker is open."""
+        return self._preview(
+            prepared, "The language model is temporarily unavailable. Showing top matches instead:"
+        )
+
+    def _finish(self, prepared: PreparedAnswer, answer: str) -> ChatResponse:
+        if self._answer_cache is not None:
+            self._answer_cache.put(
+                prepared.query,
+                prepared.chunk_ids,
+                answer,
+                history=prepared.history_text,
+                model=self._model_signature,
+                query_vector=prepared.query_vector,
+            )
+        return ChatResponse(answer=answer, sources=prepared.sources)
+
+    @staticmethod
+    def _validated_query(payload: ChatRequest) -> str:
+        query = payload.query.strip()
+        if not query:
+            raise ValueError("Query must not be empty.")
+        return query
+
+    def answer(self, payload: ChatRequest) -> ChatResponse:
+        query = self._validated_query(payload)
+        prepared = self._prepare(payload, query, self._encode_query(query))
+        if prepared.response is not None:
+            return prepared.response
+
+        if self._llm_client is None:
+            raise RuntimeError("Only an async LLM client is configured; use answer_async().")
+        try:
+            answer = self._llm_client.generate(prepared.prompt, system_prompt=SYSTEM_PROMPT)
+        except LLMUnavailableError:
+            return self._unavailable(prepared)
+        return self._finish(prepared, answer)
+
+    async def answer_async(self, payload: ChatRequest) -> ChatResponse:
+        """Non-blocking `answer`: encoding (or the micro-batcher) and retrieval run off the
+        event loop on the bounded embedding executor, and the LLM call is awaited."""
+
+        query = self._validated_query(payload)
+        loop = asyncio.get_running_loop()
+        query_vector = await self._encode_query_async(query)
+        prepared = await loop.run_in_executor(
+            self._executor, self._prepare, payload, query, query_vector
+        )
+        if prepared.response is not None:
+            return prepared.response
+
+        try:
+            answer = await self._generate_async(prepared.prompt)
+        except LLMUnavailableError:
+            return self._unavailable(prepared)
+        return self._finish(prepared, answer)
+
+    async def _generate_async(self, prompt: str) -> str:
+        if self._async_llm_client is not None:
+            return await self._async_llm_client.generate(prompt, system_prompt=SYSTEM_PROMPT)
+        return await asyncio.to_thread(
+            self._llm_client.generate, prompt, system_prompt=SYSTEM_PROMPT
+        )
+
+    async def stream_answer(self, payload: ChatRequest) -> AsyncIterator[StreamEvent]:
+        """Stream an answer: `sources` once retrieval finishes, then `token` deltas, then `done`.
+
+        Cached, preview and error-free fallback answers are sent as a single token. If the
+        LLM is unavailable before the first delta, the top-matches preview is sent instead.
+        """
+
+        query = self._validated_query(payload)
+        loop = asyncio.get_running_loop()
+        query_vector = await self._encode_query_async(query)
+        prepared = await loop.run_in_executor(
+            self._executor, self._prepare, payload, query, query_vector
+        )
+        if prepared.response is not None:
+            yield StreamEvent("sources", prepared.response.sources)
+            yield StreamEvent("token", prepared.response.answer)
+            yield StreamEvent("done", {"created_at": prepared.response.created_at.isoformat()})
+            return
+
+        yield StreamEvent("sources", prepared.sources)
+
+        parts: list[str] = []
+        try:
+            if self._async_llm_client is not None and hasattr(self._async_llm_client, "stream"):
+                async for delta in self._async_llm_client.stream(
+                    prepared.prompt, system_prompt=SYSTEM_PROMPT
+                ):
+                    parts.append(delta)
+                    yield StreamEvent("token", delta)
+            else:
+                answer = await self._generate_async(prepared.prompt)
+                parts.append(answer)
+                yield StreamEvent("token", answer)
+        except LLMUnavailableError:
+            if parts:
+                raise
+            fallback = self._unavailable(prepared)
+            yield StreamEvent("token", fallback.answer)
+            yield StreamEvent("done", {"created_at": fallback.created_at.isoformat()})
+            return
+
+        response = self._finish(prepared, "".join(parts).strip())
+        yield StreamEvent("done", {"created_at": response.created_at.isoformat()})
+
+    def warm_up(self, query: str = "AWS Well-Architected Framework pillars") -> None:
+        """Run one query through the embedder and store, bypassing the caches, so the
+        first real request does not pay for lazy model setup or cold index pages."""
+        vector = self._embedder.encode([query], convert_to_numpy=True)[0]
+        store = self._index.store
+        if store is not None:
+            store.search(vector, top_k=self._settings.retrieval_top_k)
 
-        return ChatResponse(answer=answer, sources=sources)
+    async def aclose(self) -> None:
+        if self._async_llm_client is not None:
+            await self._async_llm_client.aclose()
+        if self._answer_cache is not None:
+            self._answer_cache.close()
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Optional, Sequence
+
+import numpy as np
+
+from ..ingest.model_loader import EmbeddingModel
+
+_STOP = object()
+
+
+class EmbeddingMicroBatcher:
+    """Coalesce concurrent single-query `encode` calls into batched model calls.
+
+    Callers `submit()` one text and receive a future. A background thread waits up to
+    `max_wait_ms` after the first queued text (or until `max_batch_size` texts are
+    queued), encodes the batch in one call and resolves every future. `encode()` keeps
+    the `EmbeddingModel` interface so the batcher can stand in for the model.
+    """
+
+    def __init__(
+        self,
+        model: EmbeddingModel,
+        *,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+    ) -> None:
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self._model = model
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait_ms / 1000.0
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes: dict[int, int] = {}
+        self._thread = threading.Thread(target=self._run, name="wafr-embedding-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def encode(self, sentences: Sequence[str], convert_to_numpy: bool = True) -> np.ndarray:
+        futures = [self.submit(sentence) for sentence in sentences]
+        return np.stack([future.result() for future in futures])
+
+    def stats(self) -> dict[str, object]:
+        with self._lock:
+            histogram = dict(sorted(self._batch_sizes.items()))
+        batches = sum(histogram.values())
+        items = sum(size * count for size, count in histogram.items())
+        return {
+            "batches": batches,
+            "items": items,
+            "mean_batch_size": round(items / batches, 2) if batches else 0.0,
+            "batch_size_histogram": {str(size): count for size, count in histogram.items()},
+        }
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self._max_wait
+            while len(batch) < self._max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._encode_batch(batch)
+            if stop:
+                return
+
+    def _encode_batch(self, batch: list[tuple[str, Future]]) -> None:
+        live = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+        if not live:
+            return
+        with self._lock:
+            self._batch_sizes[len(live)] = self._batch_sizes.get(len(live), 0) + 1
+        try:
+            vectors = self._model.encode([text for text, _ in live], convert_to_numpy=True)
+        except Exception as exc:  # noqa: BLE001 - surfaced to every waiting caller
+            for _, future in live:
+                future.set_exception(exc)
+            return
+        for (_, future), vector in zip(live, vectors):
+            future.set_result(np.asarray(vector, dtype=np.float32))
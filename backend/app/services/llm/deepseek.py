@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from .together import AsyncTogetherClient, TogetherClient
+
+DEEPSEEK_BASE_URL = "https://api.deepseek.com/v1"
+
+
+class DeepSeekClient(TogetherClient):
+    """DeepSeek chat completions; the API is OpenAI-compatible, like Together's."""
+
+    provider = "DeepSeek"
+
+    def __init__(
+        self,
+        api_key: str,
+        *,
+        base_url: str = DEEPSEEK_BASE_URL,
+        model: str = "deepseek-chat",
+        **kwargs: object,
+    ) -> None:
+        super().__init__(api_key, base_url=base_url, model=model, **kwargs)
+
+
+class AsyncDeepSeekClient(AsyncTogetherClient):
+    """Non-blocking DeepSeek client (see `AsyncTogetherClient`)."""
+
+    provider = "DeepSeek"
+
+    def __init__(
+        self,
+        api_key: str,
+        *,
+        base_url: str = DEEPSEEK_BASE_URL,
+        model: str = "deepseek-chat",
+        **kwargs: object,
+    ) -> None:
+        super().__init__(api_key, base_url=base_url, model=model, **kwargs)
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from ...http_utils import parse_retry_after
+
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class LLMUnavailableError(RuntimeError):
+    """The LLM could not produce an answer (retries exhausted or circuit open)."""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """Calls are short-circuited because the upstream has been failing."""
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Exponential backoff with full jitter; `Retry-After` takes precedence when present."""
+
+    max_retries: int = 2
+    base_delay: float = 0.25
+    max_delay: float = 8.0
+    retry_statuses: frozenset[int] = RETRYABLE_STATUSES
+
+    def delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        requested = parse_retry_after(retry_after)
+        if requested is not None:
+            return min(requested, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures and rejects calls until
+    `reset_timeout` has passed; then lets one trial call through (half-open)."""
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._clock() - self._opened_at >= self._reset_timeout:
+                return "half-open"
+            return "open"
+
+    def before_call(self) -> bool:
+        """Raise `CircuitOpenError` if the call must be skipped; True for the half-open trial."""
+
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            if self._clock() - self._opened_at < self._reset_timeout or self._trial_in_flight:
+                raise CircuitOpenError("LLM circuit breaker is open; skipping upstream call.")
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self._failure_threshold:
+                self._opened_at = self._clock()
+            self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """Give up the half-open trial without an outcome (cancelled or abandoned call), so
+        the next call may try again instead of the circuit staying open for good."""
+
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class LatencyTracker:
+    """Sliding window of recent call latencies used to pick the hedging delay."""
+
+    def __init__(self, window: int = 200) -> None:
+        self._samples: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+@dataclass
+class ClientMetrics:
+    """Counters for one LLM client; connection counts come from httpcore trace events."""
+
+    requests: int = 0
+    retries: int = 0
+    failures: int = 0
+    hedges: int = 0
+    hedge_wins: int = 0
+    connections_opened: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def trace(self, event_name: str, info: dict) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self.increment("connections_opened")
+
+    async def atrace(self, event_name: str, info: dict) -> None:
+        self.trace(event_name, info)
+
+    def snapshot(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "failures": self.failures,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "connections_opened": self.connections_opened,
+                "connections_reused": max(0, self.requests - self.connections_opened),
+            }
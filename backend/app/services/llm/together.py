@@ -1,12 +1,147 @@
 from __future__ import annotations
 
-from typing import Optional
+import asyncio
+import importlib.util
+import json
+import time
+from typing import AsyncIterator, Optional
 
 import httpx
 
+from .resilience import (
+    CircuitBreaker,
+    ClientMetrics,
+    LatencyTracker,
+    LLMUnavailableError,
+    RetryPolicy,
+)
 
-class TogetherClient:
-    """Minimal wrapper around Together.ai chat completions API."""
+
+def build_messages(prompt: str, system_prompt: Optional[str]) -> list[dict[str, str]]:
+    messages = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+
+def parse_completion(payload: dict, provider: str) -> str:
+    choices = payload.get("choices") or []
+    if not choices:
+        raise RuntimeError(f"{provider} API returned no choices.")
+    return choices[0]["message"]["content"].strip()
+
+
+def parse_stream_line(line: str) -> Optional[str]:
+    """Extract the content delta from one server-sent event line of a streamed completion.
+
+    Returns None for keep-alives, non-data lines and the terminal `[DONE]` marker.
+    """
+
+    if not line.startswith("data:"):
+        return None
+    data = line[len("data:") :].strip()
+    if not data or data == "[DONE]":
+        return None
+    choices = json.loads(data).get("choices") or []
+    if not choices:
+        return None
+    return (choices[0].get("delta") or {}).get("content") or None
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package (`httpx[http2]`)."""
+    return importlib.util.find_spec("h2") is not None
+
+
+class _ChatCompletionsClient:
+    """Settings, pool options and resilience state shared by the sync and async clients."""
+
+    provider = "Together"
+
+    def __init__(
+        self,
+        api_key: str,
+        *,
+        base_url: str,
+        model: str,
+        temperature: float,
+        max_output_tokens: int,
+        timeout: float,
+        max_connections: int,
+        max_keepalive_connections: Optional[int],
+        keepalive_expiry: float,
+        http2: bool,
+        retry_policy: Optional[RetryPolicy],
+        circuit_breaker: Optional[CircuitBreaker],
+    ) -> None:
+        if not api_key:
+            raise ValueError(f"{self.provider} API key must be provided.")
+
+        self._model = model
+        self._temperature = temperature
+        self._max_output_tokens = max_output_tokens
+        self._http2 = http2 and http2_available()
+        self._retry_policy = retry_policy or RetryPolicy()
+        self._breaker = circuit_breaker or CircuitBreaker()
+        self.metrics = ClientMetrics()
+        self._client_options = {
+            "base_url": base_url,
+            "timeout": timeout,
+            "headers": {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
+            "limits": httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=(
+                    max_connections if max_keepalive_connections is None else max_keepalive_connections
+                ),
+                keepalive_expiry=keepalive_expiry,
+            ),
+            "http2": self._http2,
+        }
+
+    def _payload(self, prompt: str, system_prompt: Optional[str], *, stream: bool = False) -> dict:
+        payload = {
+            "model": self._model,
+            "temperature": self._temperature,
+            "max_output_tokens": self._max_output_tokens,
+            "messages": build_messages(prompt, system_prompt),
+        }
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response]) -> Optional[float]:
+        """Seconds to back off before the next attempt, or None when `response` is final."""
+
+        if attempt >= self._retry_policy.max_retries:
+            return None
+        if response is not None:
+            if response.status_code not in self._retry_policy.retry_statuses:
+                return None
+            return self._retry_policy.delay(attempt, response.headers.get("Retry-After"))
+        return self._retry_policy.delay(attempt)
+
+    def _abandoned(self, trial: bool) -> None:
+        """A call ended without an upstream outcome (cancelled, closed, unexpected error)."""
+        if trial:
+            self._breaker.release_trial()
+
+    def _failed(self, exc: Exception) -> LLMUnavailableError:
+        self._breaker.record_failure()
+        self.metrics.increment("failures")
+        return LLMUnavailableError(f"{self.provider} API request failed: {exc}")
+
+    def stats(self) -> dict[str, object]:
+        return {**self.metrics.snapshot(), "circuit": self._breaker.state, "http2": self._http2}
+
+
+class TogetherClient(_ChatCompletionsClient):
+    """Wrapper around Together.ai chat completions API with a pooled keep-alive client,
+    jittered retries on 429/5xx and a circuit breaker.
+
+    Failures surface as `LLMUnavailableError` (`CircuitOpenError` while the circuit is
+    open) so callers can degrade gracefully.
+    """
 
     def __init__(
         self,
@@ -17,18 +152,29 @@ class TogetherClient:
         temperature: float = 0.2,
         max_output_tokens: int = 600,
         timeout: float = 30.0,
+        max_connections: int = 20,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: float = 60.0,
+        http2: bool = True,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        transport: Optional[httpx.BaseTransport] = None,
     ) -> None:
-        if not api_key:
-            raise ValueError("Together API key must be provided.")
-
-        self._client = httpx.Client(
+        super().__init__(
+            api_key,
             base_url=base_url,
+            model=model,
+            temperature=temperature,
+            max_output_tokens=max_output_tokens,
             timeout=timeout,
-            headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+            http2=http2,
+            retry_policy=retry_policy,
+            circuit_breaker=circuit_breaker,
         )
-        self._model = model
-        self._temperature = temperature
-        self._max_output_tokens = max_output_tokens
+        self._client = httpx.Client(**self._client_options, transport=transport)
 
     def generate(
         self,
@@ -36,32 +182,225 @@ class TogetherClient:
         *,
         system_prompt: Optional[str] = None,
     ) -> str:
-        messages = []
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        messages.append({"role": "user", "content": prompt})
-
-        response = self._client.post(
-            "/chat/completions",
-            json={
-                "model": self._model,
-                "temperature": self._temperature,
-                "max_output_tokens": self._max_output_tokens,
-                "messages": messages,
-            },
-        )
-        response.raise_for_status()
-        payload = response.json()
-        choices = payload.get("choices") or []
-        if not choices:
-            raise RuntimeError("Together API returned no choices.")
-        return choices[0]["message"]["content"].strip()
+        trial = self._breaker.before_call()
+        try:
+            response = self._post(self._payload(prompt, system_prompt))
+        except httpx.HTTPError as exc:
+            raise self._failed(exc) from exc
+        except BaseException:
+            self._abandoned(trial)
+            raise
+        self._breaker.record_success()
+        return parse_completion(response.json(), self.provider)
+
+    def _post(self, payload: dict) -> httpx.Response:
+        attempt = 0
+        while True:
+            self.metrics.increment("requests")
+            try:
+                response = self._client.post(
+                    "/chat/completions",
+                    json=payload,
+                    extensions={"trace": self.metrics.trace},
+                )
+            except httpx.TransportError:
+                delay = self._retry_delay(attempt, None)
+                if delay is None:
+                    raise
+            else:
+                delay = self._retry_delay(attempt, response)
+                if delay is None:
+                    response.raise_for_status()
+                    return response
+            self.metrics.increment("retries")
+            time.sleep(delay)
+            attempt += 1
 
     def close(self) -> None:
         self._client.close()
 
-    def __del__(self) -> None:  # pragma: no cover - best effort cleanup
+
+class AsyncTogetherClient(_ChatCompletionsClient):
+    """Non-blocking variant of `TogetherClient` built on `httpx.AsyncClient`.
+
+    Awaiting a completion does not hold a thread, so one worker can keep many requests
+    in flight; `max_connections` caps the concurrent upstream connections. With
+    `hedge_percentile` set, a request still running after that percentile of recent
+    latencies gets a duplicate; whichever answers first wins and the other is cancelled.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        *,
+        base_url: str = "https://api.together.xyz/v1",
+        model: str = "openai/gpt-oss-20b",
+        temperature: float = 0.2,
+        max_output_tokens: int = 600,
+        timeout: float = 30.0,
+        max_connections: int = 200,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: float = 60.0,
+        http2: bool = True,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        hedge_percentile: Optional[float] = None,
+        hedge_min_samples: int = 20,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        super().__init__(
+            api_key,
+            base_url=base_url,
+            model=model,
+            temperature=temperature,
+            max_output_tokens=max_output_tokens,
+            timeout=timeout,
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+            http2=http2,
+            retry_policy=retry_policy,
+            circuit_breaker=circuit_breaker,
+        )
+        self._client = httpx.AsyncClient(**self._client_options, transport=transport)
+        self._hedge_percentile = hedge_percentile
+        self._hedge_min_samples = hedge_min_samples
+        self._latency = LatencyTracker()
+
+    async def generate(
+        self,
+        prompt: str,
+        *,
+        system_prompt: Optional[str] = None,
+    ) -> str:
+        trial = self._breaker.before_call()
+        started = time.monotonic()
+        try:
+            response = await self._hedged_post(self._payload(prompt, system_prompt))
+        except httpx.HTTPError as exc:
+            raise self._failed(exc) from exc
+        except BaseException:
+            self._abandoned(trial)
+            raise
+        self._breaker.record_success()
+        self._latency.record(time.monotonic() - started)
+        return parse_completion(response.json(), self.provider)
+
+    def _hedge_delay(self) -> Optional[float]:
+        if self._hedge_percentile is None or len(self._latency) < self._hedge_min_samples:
+            return None
+        return self._latency.percentile(self._hedge_percentile)
+
+    async def _hedged_post(self, payload: dict) -> httpx.Response:
+        delay = self._hedge_delay()
+        if delay is None:
+            return await self._post(payload)
+
+        primary = asyncio.create_task(self._post(payload))
+        tasks = {primary}
         try:
-            self.close()
-        except Exception:  # noqa: BLE001
-            pass
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                self.metrics.increment("hedges")
+                tasks.add(asyncio.create_task(self._post(payload)))
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.metrics.increment("hedge_wins")
+                        return task.result()
+            # Every attempt failed: surface the primary's error.
+            return primary.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _post(self, payload: dict) -> httpx.Response:
+        attempt = 0
+        while True:
+            self.metrics.increment("requests")
+            try:
+                response = await self._client.post(
+                    "/chat/completions",
+                    json=payload,
+                    extensions={"trace": self.metrics.atrace},
+                )
+            except httpx.TransportError:
+                delay = self._retry_delay(attempt, None)
+                if delay is None:
+                    raise
+            else:
+                delay = self._retry_delay(attempt, response)
+                if delay is None:
+                    response.raise_for_status()
+                    return response
+            self.metrics.increment("retries")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _open_stream(self, payload: dict) -> httpx.Response:
+        """Send a streaming request, retrying until response headers arrive successfully."""
+
+        attempt = 0
+        while True:
+            self.metrics.increment("requests")
+            request = self._client.build_request(
+                "POST",
+                "/chat/completions",
+                json=payload,
+                extensions={"trace": self.metrics.atrace},
+            )
+            try:
+                response = await self._client.send(request, stream=True)
+            except httpx.TransportError:
+                delay = self._retry_delay(attempt, None)
+                if delay is None:
+                    raise
+            else:
+                delay = self._retry_delay(attempt, response)
+                if delay is None:
+                    if response.is_error:
+                        await response.aread()
+                        await response.aclose()
+                        response.raise_for_status()
+                    return response
+                await response.aclose()
+            self.metrics.increment("retries")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def stream(
+        self,
+        prompt: str,
+        *,
+        system_prompt: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """Yield completion text deltas as the provider emits them (`stream: true`).
+
+        Retries only happen before the first delta; a failure mid-stream is raised.
+        """
+
+        trial = self._breaker.before_call()
+        response: Optional[httpx.Response] = None
+        try:
+            response = await self._open_stream(self._payload(prompt, system_prompt, stream=True))
+            async for line in response.aiter_lines():
+                delta = parse_stream_line(line)
+                if delta:
+                    yield delta
+        except httpx.HTTPError as exc:
+            raise self._failed(exc) from exc
+        except BaseException:
+            # Cancelled, or the consumer stopped iterating before the stream ended.
+            self._abandoned(trial)
+            raise
+        finally:
+            if response is not None:
+                await response.aclose()
+        self._breaker.record_success()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
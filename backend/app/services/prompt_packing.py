@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from dataclasses import replace
+from typing import Sequence
+
+from ..ingest.tokenizer import count_tokens, truncate_to_tokens
+from ..retrieval.in_memory_store import RetrievedChunk
+
+# Below this many tokens a truncated history turn carries too little to be worth keeping.
+MIN_TRUNCATED_TURN_TOKENS = 16
+
+
+def chunk_label(index: int, chunk: RetrievedChunk) -> str:
+    return f"[{index}] Source: {chunk.source or chunk.chunk_id}"
+
+
+def chunk_tokens(chunk: RetrievedChunk) -> int:
+    """Token count stored at ingest time, or counted now for older embeddings files."""
+    return chunk.token_count if chunk.token_count is not None else count_tokens(chunk.text)
+
+
+def pack_context(chunks: Sequence[RetrievedChunk], budget: int) -> tuple[list[RetrievedChunk], int]:
+    """Greedily fill `budget` tokens with the highest-scoring chunks.
+
+    A chunk that does not fit is skipped rather than ending the scan, so a smaller,
+    lower-ranked chunk can still use the remaining space. If not even the best chunk
+    fits, it is truncated to the budget so the prompt never goes out without context.
+
+    Returns the selected chunks (best first) and the tokens they use.
+    """
+
+    selected: list[RetrievedChunk] = []
+    used = 0
+    for chunk in sorted(chunks, key=lambda item: item.score, reverse=True):
+        cost = count_tokens(chunk_label(len(selected) + 1, chunk)) + chunk_tokens(chunk)
+        if used + cost <= budget:
+            selected.append(chunk)
+            used += cost
+
+    if not selected and chunks:
+        best = max(chunks, key=lambda item: item.score)
+        remaining = max(0, budget - count_tokens(chunk_label(1, best)))
+        text = truncate_to_tokens(best.text, remaining)
+        if text:
+            selected.append(replace(best, text=text, token_count=count_tokens(text)))
+            used = count_tokens(chunk_label(1, best)) + count_tokens(text)
+    return selected, used
+
+
+def fit_history(turns: Sequence[str], budget: int) -> tuple[list[str], int]:
+    """Keep the newest conversation turns that fit in `budget` tokens.
+
+    The oldest turn that only partly fits is truncated; anything older is replaced by a
+    single marker line saying how many messages were omitted.
+
+    Returns the kept lines (oldest first) and the tokens they use.
+    """
+
+    costs = [count_tokens(turn) for turn in turns]
+    if sum(costs) <= budget:
+        return list(turns), sum(costs)
+
+    # Room for the omission marker is reserved up front so it never pushes past budget.
+    turn_budget = budget - count_tokens(f"[{len(turns)} earlier messages omitted]")
+    kept: list[str] = []
+    used = 0
+    for turn, cost in zip(reversed(turns), reversed(costs)):
+        if used + cost <= turn_budget:
+            kept.append(turn)
+            used += cost
+            continue
+        remaining = turn_budget - used
+        if remaining >= MIN_TRUNCATED_TURN_TOKENS:
+            truncated = truncate_to_tokens(turn, remaining - 1) + " …"
+            kept.append(truncated)
+            used += count_tokens(truncated)
+        break
+
+    kept.reverse()
+    marker = f"[{len(turns) - len(kept)} earlier messages omitted]"
+    if used + count_tokens(marker) > budget:
+        return [], 0
+    return [marker, *kept], used + count_tokens(marker)
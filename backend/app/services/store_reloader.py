@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Generic, Optional, Sequence, TypeVar
+
+from ..fingerprint import file_fingerprint
+
+T = TypeVar("T")
+
+
+class StoreReloader(Generic[T]):
+    """Rebuilds an index from `path` off the request path and hands it to `swap`.
+
+    `build` runs on a single background thread, so at most one rebuild is in flight and
+    concurrent `reload()` calls share it. The new index is only published (via `swap`)
+    once it is fully built; a failed build leaves the current one in place and is
+    reported in `status()`. With `watch_interval` > 0 a thread polls the file's
+    fingerprint and reloads after it has changed and then stayed the same for one
+    interval, so a file that is still being written is not picked up half-way.
+
+    `sidecars` are files derived from `path` that `build` also reads (BM25, IVF, int8
+    codes, ...). They are part of the watched fingerprint, so a sidecar that lands after
+    the main file triggers another reload instead of leaving the stale one in place.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        build: Callable[[], T],
+        *,
+        watch_interval: float = 0.0,
+        sidecars: Sequence[Path] = (),
+    ) -> None:
+        self.path = path
+        self.sidecars = tuple(sidecars)
+        self._build = build
+        self._watch_interval = watch_interval
+        self._swap: Optional[Callable[[T], object]] = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="wafr-reload")
+        self._pending: Optional[Future] = None
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self._failed_fingerprint: Optional[str] = None
+        self.version = 0
+        self.fingerprint: Optional[str] = None
+        self.loaded_at: Optional[datetime] = None
+        self.load_seconds: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def load(self) -> T:
+        """Build the first index synchronously; errors propagate to the caller."""
+        fingerprint = self._fingerprint()
+        started = time.perf_counter()
+        try:
+            built = self._build()
+        except Exception as exc:
+            self._failed(fingerprint, exc)
+            raise
+        self._loaded(fingerprint, started)
+        return built
+
+    def start(self, swap: Callable[[T], object]) -> None:
+        """Enable `reload()` and, if configured, start watching the file."""
+        self._swap = swap
+        if self._watch_interval > 0 and self._watcher is None:
+            self._watcher = threading.Thread(
+                target=self._watch, name="wafr-reload-watcher", daemon=True
+            )
+            self._watcher.start()
+
+    @property
+    def reloading(self) -> bool:
+        pending = self._pending
+        return pending is not None and not pending.done()
+
+    def reload(self) -> Future:
+        """Schedule a rebuild (or join the one in flight); resolves to the new version."""
+        if self._swap is None:
+            raise RuntimeError("StoreReloader.start() must be called before reload().")
+        with self._lock:
+            if self._pending is None or self._pending.done():
+                self._pending = self._executor.submit(self._rebuild)
+            return self._pending
+
+    def _rebuild(self) -> int:
+        # Fingerprint before reading, so a write that lands mid-build triggers another reload.
+        fingerprint = self._fingerprint()
+        started = time.perf_counter()
+        try:
+            built = self._build()
+        except Exception as exc:
+            self._failed(fingerprint, exc)
+            raise
+        self._swap(built)
+        self._loaded(fingerprint, started)
+        return self.version
+
+    def _fingerprint(self) -> str:
+        main = file_fingerprint(self.path)
+        if main == "missing" or not self.sidecars:
+            return main
+        return ";".join([main, *(file_fingerprint(path) for path in self.sidecars)])
+
+    def _loaded(self, fingerprint: str, started: float) -> None:
+        self.load_seconds = time.perf_counter() - started
+        self.loaded_at = datetime.now(timezone.utc)
+        self.fingerprint = fingerprint
+        self.version += 1
+        self.last_error = None
+        self._failed_fingerprint = None
+
+    def _failed(self, fingerprint: str, exc: Exception) -> None:
+        self.last_error = f"{type(exc).__name__}: {exc}"
+        self._failed_fingerprint = fingerprint
+
+    def _watch(self) -> None:
+        previous = self._fingerprint()
+        while not self._stop.wait(self._watch_interval):
+            current = self._fingerprint()
+            settled = current == previous
+            previous = current
+            if (
+                settled
+                and current != "missing"
+                and current != self.fingerprint
+                and current != self._failed_fingerprint
+                and not self.reloading
+            ):
+                self.reload()
+
+    def status(self) -> dict[str, object]:
+        return {
+            "version": self.version,
+            "source": str(self.path),
+            "fingerprint": self.fingerprint,
+            "loaded_at": self.loaded_at.isoformat() if self.loaded_at else None,
+            "load_seconds": self.load_seconds,
+            "reloading": self.reloading,
+            "watching": self._watcher is not None,
+            "last_error": self.last_error,
+        }
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+        self._executor.shutdown(wait=True)
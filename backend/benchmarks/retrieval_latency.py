@@ -0,0 +1,80 @@
+"""Measure the latency MMR reranking and adjacent-chunk merging add to a search.
+
+Builds a synthetic corpus and times the same queries with the plain top-k search and
+with each diversity stage, mirroring `RetrievalAugmentedChatService._retrieve`. The
+`int8` rows time the same search with `RETRIEVAL_QUANTIZATION=int8` (int8 shortlist
+plus float32 rescoring), and the `scan` rows compare the raw float32 and int8 scoring
+pass over the whole matrix.
+
+    python benchmarks/retrieval_latency.py --rows 20000 --dims 384
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.retrieval.diversity import merge_adjacent, mmr_select  # noqa: E402
+from app.retrieval.in_memory_store import InMemoryVectorStore  # noqa: E402
+from app.retrieval.quantization import ScalarQuantizedMatrix  # noqa: E402
+from worker_rss import write_corpus  # noqa: E402
+
+
+def retrieve(store, query, top_k: int, candidates: int, mmr: bool, merge: bool):
+    retrieved = store.search(query, top_k=candidates if mmr else top_k)
+    if mmr:
+        unit = query / np.linalg.norm(query)
+        picked = mmr_select(unit, store.embeddings_for(retrieved), top_k, 0.5)
+        retrieved = [retrieved[row] for row in picked]
+    return merge_adjacent(retrieved) if merge else retrieved
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--dims", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        chunks_file = Path(tmp) / "chunks.jsonl"
+        write_corpus(chunks_file, args.rows, args.dims, text_words=120)
+        store = InMemoryVectorStore(chunks_file)
+        quantized_store = InMemoryVectorStore(chunks_file, quantization="int8")
+
+    queries = np.random.default_rng(2).normal(size=(args.queries, args.dims)).astype(np.float32)
+    matrix = np.array(store.embeddings)
+    quantized = ScalarQuantizedMatrix.quantize(matrix)
+    modes = [
+        ("search", lambda query: retrieve(store, query, args.top_k, 0, False, False)),
+        ("mmr/20", lambda query: retrieve(store, query, args.top_k, 20, True, False)),
+        ("mmr/50", lambda query: retrieve(store, query, args.top_k, 50, True, False)),
+        ("merge", lambda query: retrieve(store, query, args.top_k, 0, False, True)),
+        ("mmr/20+merge", lambda query: retrieve(store, query, args.top_k, 20, True, True)),
+        ("search/int8", lambda query: retrieve(quantized_store, query, args.top_k, 0, False, False)),
+        ("scan/float32", lambda query: matrix @ query),
+        ("scan/int8", lambda query: quantized @ query),
+    ]
+    print(f"{args.rows} chunks x {args.dims} dims, top_k={args.top_k}, {args.queries} queries")
+    print(f"float32 matrix {matrix.nbytes / 2**20:.1f} MiB, int8 codes {quantized.nbytes / 2**20:.1f} MiB")
+    print(f"{'mode':<14}{'p50 ms':>9}{'p95 ms':>9}")
+    for name, run in modes:
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            run(query)
+            timings.append((time.perf_counter() - started) * 1000)
+        p50, p95 = np.percentile(timings, [50, 95])
+        print(f"{name:<14}{p50:>9.3f}{p95:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Compare per-worker memory of a JSONL-loaded store against a shared segment.
+
+Builds a synthetic corpus, then starts `--workers` spawned processes per mode. Each one
+loads an `InMemoryVectorStore`, reads every text and runs a few searches, then reports
+its memory from `/proc/self/smaps_rollup` while all its siblings are still alive. `Pss`
+divides shared pages between the processes mapping them, so it is the figure that
+shows what each extra worker really costs.
+
+    python benchmarks/worker_rss.py --rows 50000 --dims 384 --workers 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing as mp
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.retrieval.in_memory_store import InMemoryVectorStore  # noqa: E402
+from app.retrieval.shared_segment import prepare_shared_index, segment_path_for  # noqa: E402
+
+FIELDS = ("Rss", "Pss", "Private_Clean", "Private_Dirty")
+
+
+def memory_kib() -> dict[str, int]:
+    usage: dict[str, int] = {}
+    with open("/proc/self/smaps_rollup", encoding="utf-8") as stream:
+        for line in stream:
+            name, _, value = line.partition(":")
+            if name in FIELDS:
+                usage[name] = int(value.split()[0])
+    return usage
+
+
+def write_corpus(path: Path, rows: int, dims: int, text_words: int) -> None:
+    rng = np.random.default_rng(0)
+    with path.open("w", encoding="utf-8") as stream:
+        for idx in range(rows):
+            record = {
+                "chunk_id": f"chunk-{idx}",
+                "document_id": f"doc-{idx // 20}",
+                "source": f"https://docs.example.com/wellarchitected/page-{idx // 20}.html",
+                "pillar": ("Security", "Reliability", "Cost Optimization")[idx % 3],
+                "doc_type": "html",
+                "chunk_index": idx % 20,
+                "text": " ".join(f"word{word}" for word in rng.integers(0, 5000, text_words)),
+                "embedding": rng.normal(size=dims).astype(np.float32).round(6).tolist(),
+            }
+            stream.write(json.dumps(record) + "\n")
+
+
+def worker(path: str | None, dims: int, barrier, results) -> None:
+    if path is not None:
+        store = InMemoryVectorStore(Path(path))
+        sum(len(text) for text in store.texts())
+        for query in np.random.default_rng(1).normal(size=(8, dims)):
+            store.search(query, top_k=5)
+    barrier.wait()
+    results.put(memory_kib())
+    barrier.wait()
+
+
+def measure(path: Path | None, dims: int, workers: int) -> dict[str, float]:
+    context = mp.get_context("spawn")
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    target = str(path) if path else None
+    processes = [
+        context.Process(target=worker, args=(target, dims, barrier, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    samples = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return {
+        "Rss": np.mean([sample["Rss"] for sample in samples]) / 1024,
+        "Pss": np.mean([sample["Pss"] for sample in samples]) / 1024,
+        "Private": np.mean(
+            [sample["Private_Clean"] + sample["Private_Dirty"] for sample in samples]
+        )
+        / 1024,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--dims", type=int, default=384)
+    parser.add_argument("--text-words", type=int, default=120)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        chunks_file = Path(tmp) / "chunks.jsonl"
+        write_corpus(chunks_file, args.rows, args.dims, args.text_words)
+        segment = segment_path_for(chunks_file)
+        prepare_shared_index(chunks_file, segment)
+
+        print(f"{args.rows} chunks x {args.dims} dims, {args.workers} workers per mode")
+        print(f"{'mode':<10}{'rss MiB':>10}{'pss MiB':>10}{'private MiB':>14}")
+        for mode, path in (("baseline", None), ("jsonl", chunks_file), ("segment", segment)):
+            usage = measure(path, args.dims, args.workers)
+            print(f"{mode:<10}{usage['Rss']:>10.1f}{usage['Pss']:>10.1f}{usage['Private']:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Stubs and chunk-file writers shared by the test modules."""
+
+import json
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+
+PILLARS = ["Security", "Reliability", "Cost Optimization"]
+
+# Two hand-written chunks: "operational" queries embed onto the first, anything else
+# onto the second (see `DummyEmbedder`).
+SAMPLE_CHUNKS = [
+    {
+        "chunk_id": "chunk-1",
+        "document_id": "doc-1",
+        "source": "https://example.com/1",
+        "pillar": "Operational Excellence",
+        "chunk_index": 1,
+        "text": "Operational excellence focuses on continuous improvement.",
+        "word_count": 8,
+        "summary": "Operational excellence focuses on continuous improvement.",
+        "doc_type": "html",
+        "embedding": [1.0, 0.0],
+    },
+    {
+        "chunk_id": "chunk-2",
+        "document_id": "doc-2",
+        "source": "https://example.com/2",
+        "pillar": "Security",
+        "chunk_index": 1,
+        "text": "Security pillar enforces least privilege.",
+        "word_count": 6,
+        "summary": "Security pillar guidance.",
+        "doc_type": "html",
+        "embedding": [0.0, 1.0],
+    },
+]
+
+
+class DummyEmbedder:
+    def encode(self, sentences, convert_to_numpy=True):
+        vectors = []
+        for text in sentences:
+            if "operational" in text.lower():
+                vectors.append(np.array([1.0, 0.0], dtype=np.float32))
+            else:
+                vectors.append(np.array([0.0, 1.0], dtype=np.float32))
+        return vectors
+
+
+class StubLLM:
+    def __init__(self) -> None:
+        self.calls: list[tuple[str, str | None]] = []
+
+    def generate(self, prompt: str, *, system_prompt: str | None = None) -> str:
+        self.calls.append((prompt, system_prompt))
+        return "final answer"
+
+
+def random_matrix(rows: int = 300, dims: int = 8) -> np.ndarray:
+    return np.random.default_rng(3).normal(size=(rows, dims)).astype(np.float32)
+
+
+def chunk_records(matrix: np.ndarray) -> list[dict]:
+    """One chunk per row: ten per document, pillars cycling through `PILLARS`."""
+    return [
+        {
+            "chunk_id": f"chunk-{idx}",
+            "document_id": f"doc-{idx // 10}",
+            "pillar": PILLARS[idx % len(PILLARS)],
+            "doc_type": "html",
+            "text": f"text {idx}",
+            "embedding": vector.tolist(),
+        }
+        for idx, vector in enumerate(matrix)
+    ]
+
+
+def write_chunks_file(path: Path, records: Iterable[dict] = SAMPLE_CHUNKS) -> Path:
+    with path.open("w", encoding="utf-8") as stream:
+        for record in records:
+            stream.write(json.dumps(record) + "\n")
+    return path
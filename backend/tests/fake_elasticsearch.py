@@ -0,0 +1,190 @@
+"""Minimal in-process stand-in for the Elasticsearch REST endpoints the app uses."""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+import numpy as np
+
+
+class FakeElasticsearch:
+    """Serves the REST calls the app makes, with the headers the official client requires.
+
+    Supported: `_bulk`, index exists/create, and `_search`, `_msearch` and `_count` with
+    brute-force `knn` (cosine, with filters) and `bool`/`match` queries scored by term
+    overlap. `bulk_status` decides each item's status from `(doc_id, attempt)`;
+    `request_status` can fail whole bulk requests. Indexed documents are kept in
+    `documents` and created index mappings in `mappings`.
+    """
+
+    def __init__(self, *, bulk_delay: float = 0.0) -> None:
+        self.documents: dict[str, dict[str, dict]] = {}
+        self.mappings: dict[str, dict] = {}
+        self.searches: list[dict] = []
+        self.bulk_requests: list[list[str]] = []
+        self.bulk_status: Callable[[str, int], int] = lambda doc_id, attempt: 201
+        self.request_status: Callable[[int], int] = lambda request_number: 200
+        self.bulk_delay = bulk_delay
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._attempts: dict[str, int] = {}
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self) -> None:  # noqa: N802 - http.server API
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                status, payload = fake.handle("POST", self.path, body)
+                self._reply(status, payload)
+
+            def do_PUT(self) -> None:  # noqa: N802
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                status, payload = fake.handle("PUT", self.path, body)
+                self._reply(status, payload)
+
+            def do_HEAD(self) -> None:  # noqa: N802
+                status, _ = fake.handle("HEAD", self.path, b"")
+                self.send_response(status)
+                self.send_header("X-Elastic-Product", "Elasticsearch")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def do_GET(self) -> None:  # noqa: N802
+                status, payload = fake.handle("GET", self.path, b"")
+                self._reply(status, payload)
+
+            def _reply(self, status: int, payload: object) -> None:
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("X-Elastic-Product", "Elasticsearch")
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def handle(self, method: str, path: str, body: bytes) -> tuple[int, object]:
+        route = path.split("?", 1)[0]
+        if method in {"POST", "PUT"} and route == "/_bulk":
+            return self._bulk(body)
+        parts = [part for part in route.split("/") if part]
+        if len(parts) == 1:
+            index = parts[0]
+            if method == "HEAD":
+                return (200 if index in self.mappings else 404), {}
+            if method == "PUT":
+                if index in self.mappings:
+                    return 400, {"error": {"type": "resource_already_exists_exception"}}
+                self.mappings[index] = json.loads(body or b"{}").get("mappings", {})
+                return 200, {"acknowledged": True, "index": index}
+        if len(parts) == 2 and method in {"GET", "POST"}:
+            index, action = parts
+            if action == "_search":
+                return 200, self._search(index, json.loads(body or b"{}"))
+            if action == "_msearch":
+                lines = [json.loads(line) for line in body.decode("utf-8").splitlines() if line.strip()]
+                bodies = lines[1::2]
+                return 200, {"responses": [self._search(index, search) for search in bodies]}
+            if action == "_count":
+                return 200, {"count": len(self.documents.get(index, {}))}
+        return 404, {"error": f"unsupported route {method} {route}"}
+
+    @staticmethod
+    def _matches(source: dict, clauses: list[dict]) -> bool:
+        for clause in clauses:
+            ((field, value),) = clause["term"].items()
+            if str(source.get(field)) != str(value):
+                return False
+        return True
+
+    def _search(self, index: str, body: dict) -> dict:
+        self.searches.append(body)
+        documents = self.documents.get(index, {})
+        scored: list[tuple[float, str]] = []
+        if "knn" in body:
+            knn = body["knn"]
+            query = np.asarray(knn["query_vector"], dtype=np.float32)
+            for doc_id, source in documents.items():
+                if not self._matches(source, knn.get("filter", [])):
+                    continue
+                vector = np.asarray(source[knn["field"]], dtype=np.float32)
+                cosine = float(vector @ query / (np.linalg.norm(vector) * np.linalg.norm(query)))
+                scored.append(((1 + cosine) / 2, doc_id))
+            size = min(body.get("size", 10), knn["k"])
+        else:
+            boolean = body["query"]["bool"]
+            terms = set(boolean["must"]["match"]["text"].lower().split())
+            for doc_id, source in documents.items():
+                if not self._matches(source, boolean.get("filter", [])):
+                    continue
+                overlap = len(terms & set(source["text"].lower().split()))
+                if overlap:
+                    scored.append((float(overlap), doc_id))
+            size = body.get("size", 10)
+
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        excludes = set(body.get("_source", {}).get("excludes", []))
+        hits = [
+            {
+                "_index": index,
+                "_id": doc_id,
+                "_score": score,
+                "_source": {key: value for key, value in documents[doc_id].items() if key not in excludes},
+            }
+            for score, doc_id in scored[:size]
+        ]
+        return {"took": 1, "timed_out": False, "hits": {"total": {"value": len(scored)}, "hits": hits}}
+
+    def _bulk(self, body: bytes) -> tuple[int, object]:
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            request_number = len(self.bulk_requests)
+        try:
+            time.sleep(self.bulk_delay)
+            lines = [json.loads(line) for line in body.decode("utf-8").splitlines() if line.strip()]
+            pairs = list(zip(lines[0::2], lines[1::2]))
+            with self._lock:
+                self.bulk_requests.append([action["index"]["_id"] for action, _ in pairs])
+            status = self.request_status(request_number)
+            if status != 200:
+                return status, {"error": {"type": "es_rejected_execution_exception"}, "status": status}
+
+            items = []
+            for action, source in pairs:
+                meta = action["index"]
+                with self._lock:
+                    attempt = self._attempts.get(meta["_id"], 0)
+                    self._attempts[meta["_id"]] = attempt + 1
+                item_status = self.bulk_status(meta["_id"], attempt)
+                item: dict[str, object] = {"_index": meta["_index"], "_id": meta["_id"], "status": item_status}
+                if item_status < 300:
+                    with self._lock:
+                        self.documents.setdefault(meta["_index"], {})[meta["_id"]] = source
+                else:
+                    item["error"] = {"type": "rejected" if item_status == 429 else "mapper_parsing_exception"}
+                items.append({"index": item})
+            errors = any(item["index"]["status"] >= 300 for item in items)
+            return 200, {"took": 1, "errors": errors, "items": items}
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def attempts(self, doc_id: str) -> Optional[int]:
+        return self._attempts.get(doc_id)
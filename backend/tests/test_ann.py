@@ -0,0 +1,129 @@
+import os
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.ingest import index_chunks
+from app.retrieval.ann import (
+    ExactSearchBackend,
+    IVFIndex,
+    IVFSearchBackend,
+    ivf_path_for,
+    measure_recall,
+    sample_queries,
+    top_k_indices,
+    top_k_indices_rows,
+)
+from app.retrieval.in_memory_store import InMemoryVectorStore
+
+from conftest import chunk_records, write_chunks_file
+
+
+def _clustered_matrix(rows: int = 2000, dims: int = 16, clusters: int = 20) -> np.ndarray:
+    rng = np.random.default_rng(42)
+    centres = rng.normal(size=(clusters, dims))
+    matrix = centres[rng.integers(clusters, size=rows)] + rng.normal(scale=0.3, size=(rows, dims))
+    matrix = matrix.astype(np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def test_top_k_indices_matches_full_sort() -> None:
+    scores = np.random.default_rng(0).normal(size=500).astype(np.float32)
+    expected = np.argsort(scores)[::-1][:7]
+    np.testing.assert_array_equal(top_k_indices(scores, 7), expected)
+    assert len(top_k_indices(scores, 1000)) == 500
+
+
+def test_ivf_recall_against_brute_force() -> None:
+    matrix = _clustered_matrix()
+    index = IVFIndex.build(matrix, n_lists=32)
+    queries = sample_queries(matrix, 100)
+
+    assert index.list_rows.shape[0] == matrix.shape[0]
+    assert measure_recall(matrix, IVFSearchBackend(matrix, index, n_probe=8), queries, top_k=5) >= 0.9
+    assert measure_recall(matrix, IVFSearchBackend(matrix, index, n_probe=32), queries, top_k=5) == 1.0
+
+
+def test_ivf_backend_returns_best_first() -> None:
+    matrix = _clustered_matrix(rows=300)
+    index = IVFIndex.build(matrix, n_lists=8)
+    query = matrix[17]
+
+    rows, scores = IVFSearchBackend(matrix, index, n_probe=8).search(query, 3)
+    exact_rows, exact_scores = ExactSearchBackend(matrix).search(query, 3)
+
+    np.testing.assert_array_equal(rows, exact_rows)
+    np.testing.assert_allclose(scores, exact_scores, rtol=1e-6)
+    assert rows[0] == 17
+
+
+def test_build_ann_index_persists_sidecar_used_by_store(tmp_path: Path) -> None:
+    matrix = _clustered_matrix(rows=400)
+    chunks_file = write_chunks_file(tmp_path / "chunks.jsonl", chunk_records(matrix))
+
+    recall = index_chunks.build_ann_index(chunks_file, n_lists=10, n_probe=10)
+
+    assert recall == 1.0
+    assert ivf_path_for(chunks_file).exists()
+    store = InMemoryVectorStore(chunks_file, backend="ivf", ivf_n_probe=10)
+    assert store.search(matrix[5], top_k=1)[0].chunk_id == "chunk-5"
+
+
+def test_store_rejects_unknown_backend(tmp_path: Path) -> None:
+    records = chunk_records(_clustered_matrix(rows=10))
+    chunks_file = write_chunks_file(tmp_path / "chunks.jsonl", records)
+    with pytest.raises(ValueError):
+        InMemoryVectorStore(chunks_file, backend="hnsw")
+
+
+def test_top_k_indices_rows_matches_per_row() -> None:
+    scores = np.random.default_rng(1).normal(size=(6, 300)).astype(np.float32)
+    batched = top_k_indices_rows(scores, 5)
+    for row, indices in zip(scores, batched):
+        np.testing.assert_array_equal(indices, top_k_indices(row, 5))
+    assert top_k_indices_rows(scores, 500).shape == (6, 300)
+
+
+@pytest.mark.parametrize(
+    "options",
+    [{}, {"backend": "ivf", "ivf_n_probe": 4}, {"quantization": "int8"}],
+)
+def test_search_batch_matches_single_queries(tmp_path: Path, options: dict) -> None:
+    matrix = _clustered_matrix(rows=500)
+    chunks_file = write_chunks_file(tmp_path / "chunks.jsonl", chunk_records(matrix))
+    store = InMemoryVectorStore(chunks_file, **options)
+    queries = sample_queries(matrix, 20) * 3.0
+
+    batched = store.search_batch(queries, top_k=4)
+
+    assert len(batched) == 20
+    for query, results in zip(queries, batched):
+        single = store.search(query, top_k=4)
+        assert [chunk.chunk_id for chunk in results] == [chunk.chunk_id for chunk in single]
+        np.testing.assert_allclose(
+            [chunk.score for chunk in results], [chunk.score for chunk in single], rtol=1e-5
+        )
+
+
+def test_search_batch_rejects_zero_query(tmp_path: Path) -> None:
+    records = chunk_records(_clustered_matrix(rows=10))
+    store = InMemoryVectorStore(write_chunks_file(tmp_path / "chunks.jsonl", records))
+    with pytest.raises(ValueError):
+        store.search_batch(np.zeros((2, 16), dtype=np.float32))
+
+
+def test_store_rebuilds_ivf_built_from_another_file(tmp_path: Path) -> None:
+    matrix = _clustered_matrix(rows=400)
+    chunks_file = write_chunks_file(tmp_path / "chunks.jsonl", chunk_records(matrix))
+    index_chunks.build_ann_index(chunks_file, n_lists=10, n_probe=10)
+    saved = IVFIndex.load(ivf_path_for(chunks_file))
+
+    # Same row count, different rows: the saved lists would point at the wrong chunks.
+    write_chunks_file(chunks_file, chunk_records(matrix[::-1]))
+    os.utime(chunks_file, ns=(1, 1))
+    store = InMemoryVectorStore(chunks_file, backend="ivf", ivf_n_probe=1)
+
+    assert saved.source_fingerprint is not None
+    assert store.search(matrix[5], top_k=1)[0].chunk_id == "chunk-394"
+    assert ivf_path_for(chunks_file) != ivf_path_for(chunks_file.with_suffix(".npy"))
@@ -0,0 +1,121 @@
+import asyncio
+import sqlite3
+from pathlib import Path
+
+import numpy as np
+
+from app.config import Settings
+from app.fingerprint import file_fingerprint
+from app.services.answer_cache import AnswerCache
+from app.services.chat_service import RetrievalAugmentedChatService
+
+from conftest import DummyEmbedder
+
+
+class Generation:
+    def __init__(self) -> None:
+        self.value = "v1"
+
+    def __call__(self) -> str:
+        return self.value
+
+
+def test_exact_hits_require_same_context() -> None:
+    cache = AnswerCache(8, generation=lambda: "v1")
+    cache.put("What is SEC 3?", ["a", "b"], "answer", model="m")
+
+    assert cache.get("what is  sec 3?", ["a", "b"], model="m") == "answer"
+    assert cache.get("What is SEC 3?", ["b", "a"], model="m") is None
+    assert cache.get("What is SEC 3?", ["a", "b"], model="other") is None
+    assert cache.get("What is SEC 3?", ["a", "b"], model="m", history="User: hi") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 3
+
+
+def test_near_duplicate_queries_reuse_answers() -> None:
+    cache = AnswerCache(8, generation=lambda: "v1", similarity_threshold=0.95)
+    cache.put("How do I secure S3?", ["a"], "answer", query_vector=np.array([1.0, 0.0]))
+
+    assert cache.get("Securing S3 buckets?", ["a"], query_vector=np.array([0.99, 0.05])) == "answer"
+    assert cache.get("Securing S3 buckets?", ["b"], query_vector=np.array([0.99, 0.05])) is None
+    assert cache.get("Cost of S3?", ["a"], query_vector=np.array([0.5, 0.5])) is None
+    assert cache.stats()["near_hits"] == 1
+
+
+def test_lru_eviction_and_generation_invalidation() -> None:
+    generation = Generation()
+    cache = AnswerCache(2, generation=generation)
+    cache.put("q1", ["a"], "one")
+    cache.put("q2", ["a"], "two")
+    cache.get("q1", ["a"])
+    cache.put("q3", ["a"], "three")
+
+    assert cache.get("q2", ["a"]) is None
+    assert cache.get("q1", ["a"]) == "one"
+
+    generation.value = "v2"
+    assert cache.get("q1", ["a"]) is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_sqlite_persistence_survives_restart(tmp_path: Path) -> None:
+    path = tmp_path / "answers.sqlite"
+    cache = AnswerCache(4, generation=lambda: "v1", similarity_threshold=0.9, path=path)
+    cache.put("q1", ["a"], "one", query_vector=np.array([0.0, 1.0]))
+    cache.close()
+
+    restarted = AnswerCache(4, generation=lambda: "v1", similarity_threshold=0.9, path=path)
+    assert restarted.get("q1", ["a"]) == "one"
+    assert restarted.get("other", ["a"], query_vector=np.array([0.0, 2.0])) == "one"
+    restarted.close()
+
+    changed = AnswerCache(4, generation=lambda: "v2", path=path)
+    assert changed.get("q1", ["a"]) is None
+
+
+def test_hits_are_persisted_in_batches(tmp_path: Path) -> None:
+    path = tmp_path / "answers.sqlite"
+    cache = AnswerCache(3, generation=lambda: "v1", path=path)
+    for name in ("q1", "q2", "q3"):
+        cache.put(name, ["a"], name)
+    observer = sqlite3.connect(str(path))
+    before = observer.execute("SELECT last_used FROM answers WHERE answer = 'q1'").fetchone()
+
+    assert cache.get("q1", ["a"]) == "q1"
+    assert observer.execute("SELECT last_used FROM answers WHERE answer = 'q1'").fetchone() == before
+    cache.close()
+    observer.close()
+
+    # The hit reached SQLite on close, so q1 is among the two most recently used.
+    restarted = AnswerCache(2, generation=lambda: "v1", path=path)
+    assert restarted.get("q1", ["a"]) == "q1"
+    assert restarted.get("q2", ["a"]) is None
+    restarted.close()
+
+
+def test_service_closes_cache_and_skips_it_for_elasticsearch(tmp_path: Path) -> None:
+    path = tmp_path / "answers.sqlite"
+
+    def service(vector_store: str) -> RetrievalAugmentedChatService:
+        return RetrievalAugmentedChatService(
+            settings=Settings(vector_store=vector_store, answer_cache_path=path),
+            embedder=DummyEmbedder(),
+            store=None,
+            llm_client=None,
+        )
+
+    memory = service("memory")
+    assert "answer_cache" in memory.stats()
+    asyncio.run(memory.aclose())
+    assert memory._answer_cache._db is None
+
+    assert "answer_cache" not in service("elasticsearch").stats()
+
+
+def test_file_fingerprint_tracks_changes(tmp_path: Path) -> None:
+    path = tmp_path / "embeddings.jsonl"
+    assert file_fingerprint(path) == "missing"
+    path.write_text("one\n", encoding="utf-8")
+    first = file_fingerprint(path)
+    path.write_text("one\ntwo\n", encoding="utf-8")
+    assert file_fingerprint(path) != first
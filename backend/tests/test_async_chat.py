@@ -0,0 +1,98 @@
+import asyncio
+import json
+import time
+
+import httpx
+
+from app.config import Settings
+from app.retrieval.in_memory_store import InMemoryVectorStore
+from app.schemas import ChatRequest
+from app.services.chat_service import RetrievalAugmentedChatService
+from app.services.llm.together import AsyncTogetherClient
+
+from conftest import DummyEmbedder, StubLLM, write_chunks_file
+
+
+class SlowAsyncLLM:
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.closed = False
+
+    async def generate(self, prompt: str, *, system_prompt: str | None = None) -> str:
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        return "async answer"
+
+    async def aclose(self) -> None:
+        self.closed = True
+
+
+def _service(tmp_path, **kwargs) -> RetrievalAugmentedChatService:
+    chunks_file = write_chunks_file(tmp_path / "embeddings.jsonl")
+    return RetrievalAugmentedChatService(
+        settings=Settings(
+            embeddings_file=chunks_file,
+            retrieval_top_k=1,
+            answer_cache_size=0,
+            embedding_executor_workers=2,
+        ),
+        embedder=DummyEmbedder(),
+        store=InMemoryVectorStore(chunks_file),
+        **kwargs,
+    )
+
+
+def test_answer_async_keeps_many_llm_calls_in_flight(tmp_path) -> None:
+    llm = SlowAsyncLLM(delay=0.2)
+    service = _service(tmp_path, llm_client=None, async_llm_client=llm)
+
+    async def run() -> list:
+        requests = [ChatRequest(query=f"Operational question {idx}") for idx in range(100)]
+        return await asyncio.gather(*(service.answer_async(request) for request in requests))
+
+    started = time.perf_counter()
+    responses = asyncio.run(run())
+    elapsed = time.perf_counter() - started
+
+    assert all(response.answer == "async answer" for response in responses)
+    assert llm.peak_in_flight == 100
+    assert elapsed < 2.0
+
+    asyncio.run(service.aclose())
+    assert llm.closed
+
+
+def test_answer_async_offloads_sync_llm_client(tmp_path) -> None:
+    llm = StubLLM()
+    service = _service(tmp_path, llm_client=llm)
+
+    response = asyncio.run(service.answer_async(ChatRequest(query="Operational excellence")))
+
+    assert response.answer == "final answer"
+    assert response.sources == ["https://example.com/1"]
+    assert len(llm.calls) == 1
+
+
+def test_async_together_client_posts_chat_completion() -> None:
+    seen: list[dict] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(json.loads(request.content))
+        assert request.headers["Authorization"] == "Bearer secret"
+        return httpx.Response(200, json={"choices": [{"message": {"content": " hello "}}]})
+
+    async def run() -> str:
+        client = AsyncTogetherClient(
+            "secret", base_url="https://llm.test/v1", transport=httpx.MockTransport(handler)
+        )
+        try:
+            return await client.generate("prompt", system_prompt="system")
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(run()) == "hello"
+    assert [message["role"] for message in seen[0]["messages"]] == ["system", "user"]
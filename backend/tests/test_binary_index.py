@@ -0,0 +1,105 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.ingest.writers import BinaryChunkWriter
+from app.retrieval.binary_index import (
+    load_binary_index,
+    manifest_path_for,
+    metadata_path_for,
+    write_binary_index,
+)
+from app.retrieval.in_memory_store import InMemoryVectorStore
+
+
+def _records() -> list[dict]:
+    return [
+        {
+            "chunk_id": "chunk-1",
+            "source": "https://example.com/1",
+            "pillar": "Operational Excellence",
+            "text": "Operational excellence focuses on continuous improvement.",
+            "summary": "Operational excellence.",
+            "embedding": [3.0, 0.0],
+        },
+        {
+            "chunk_id": "chunk-2",
+            "source": "https://example.com/2",
+            "pillar": "Security",
+            "text": "Security pillar enforces least privilege.",
+            "summary": "Security pillar guidance.",
+            "embedding": [0.0, 2.0],
+        },
+    ]
+
+
+def test_binary_writer_emits_normalised_matrix_and_sidecar(tmp_path: Path) -> None:
+    writer = BinaryChunkWriter(tmp_path / "chunks.jsonl")
+    writer.write(_records())
+
+    assert writer.output_path == tmp_path / "chunks.npy"
+    matrix = np.load(writer.output_path)
+    assert matrix.dtype == np.float32
+    np.testing.assert_allclose(matrix, [[1.0, 0.0], [0.0, 1.0]])
+
+    sidecar = metadata_path_for(writer.output_path).read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["chunk_id"] for line in sidecar] == ["chunk-1", "chunk-2"]
+    assert all("embedding" not in json.loads(line) for line in sidecar)
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_store_memory_maps_binary_index(tmp_path: Path) -> None:
+    writer = BinaryChunkWriter(tmp_path / "chunks.npy")
+    writer.write(_records())
+
+    store = InMemoryVectorStore(writer.output_path)
+
+    assert isinstance(store._embeddings, np.memmap)
+    results = store.search([0.1, 0.9], top_k=1)
+    assert results[0].chunk_id == "chunk-2"
+    assert results[0].source == "https://example.com/2"
+
+
+def test_store_rejects_mismatched_sidecar(tmp_path: Path) -> None:
+    writer = BinaryChunkWriter(tmp_path / "chunks.npy")
+    writer.write(_records())
+    sidecar = metadata_path_for(writer.output_path)
+    sidecar.write_text(sidecar.read_text(encoding="utf-8").splitlines()[0] + "\n", encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        InMemoryVectorStore(writer.output_path)
+
+
+def test_reader_rejects_matrix_swapped_before_its_manifest(tmp_path: Path) -> None:
+    matrix_path = tmp_path / "chunks.npy"
+    write_binary_index(_records(), matrix_path)
+    old_manifest = manifest_path_for(matrix_path).read_text(encoding="utf-8")
+
+    # Simulate a reader arriving between the writer's renames: new files, old manifest.
+    write_binary_index(_records()[1:], matrix_path)
+    new_manifest = manifest_path_for(matrix_path).read_text(encoding="utf-8")
+    manifest_path_for(matrix_path).write_text(old_manifest, encoding="utf-8")
+    with pytest.raises(ValueError, match="manifest"):
+        load_binary_index(matrix_path)
+
+    manifest_path_for(matrix_path).write_text(new_manifest, encoding="utf-8")
+    _, records = load_binary_index(matrix_path)
+    assert [record["chunk_id"] for record in records] == ["chunk-2"]
+
+
+def test_failed_write_keeps_previous_index(tmp_path: Path) -> None:
+    matrix_path = tmp_path / "chunks.npy"
+    write_binary_index(_records(), matrix_path)
+
+    def payloads():
+        yield _records()[0]
+        yield {**_records()[1], "embedding": [1.0, 2.0, 3.0]}
+
+    with pytest.raises(ValueError, match="expected"):
+        write_binary_index(payloads(), matrix_path)
+
+    matrix, records = load_binary_index(matrix_path)
+    assert matrix.shape == (2, 2) and len(records) == 2
+    assert not list(tmp_path.glob("*.tmp"))
@@ -0,0 +1,113 @@
+import json
+from pathlib import Path
+
+import numpy as np
+
+from app.config import Settings
+from app.fingerprint import file_fingerprint
+from app.retrieval.bm25 import BM25Index, bm25_path_for, load_or_build_bm25, tokenize
+from app.retrieval.fusion import reciprocal_rank_fusion
+from app.retrieval.in_memory_store import InMemoryVectorStore, RetrievedChunk
+from app.schemas import ChatRequest
+from app.services.chat_service import RetrievalAugmentedChatService
+
+TEXTS = [
+    "REL10-BP02 Select the appropriate locations for your multi-location deployment.",
+    "SEC 3 How do you manage permissions for people and machines?",
+    "Use Amazon CloudWatch to monitor workloads and resources.",
+    "Cost optimization avoids unnecessary costs across the workload lifecycle.",
+]
+
+
+def test_tokenize_keeps_identifiers() -> None:
+    assert tokenize("See REL10-BP02 and SEC 3.") == ["see", "rel10-bp02", "rel10", "bp02", "and", "sec", "3"]
+
+
+def test_bm25_ranks_exact_identifier_first(tmp_path: Path) -> None:
+    index = BM25Index.build(TEXTS)
+
+    rows, scores = index.search("what does rel10-bp02 say?", top_k=3)
+    assert rows[0] == 0
+    assert np.all(np.diff(scores) <= 0)
+
+    rows, _ = index.search("sec 3 permissions", top_k=3)
+    assert rows[0] == 1
+
+    path = tmp_path / "chunks.bm25.npz"
+    index.save(path)
+    loaded = BM25Index.load(path)
+    np.testing.assert_array_equal(loaded.search("cloudwatch", 2)[0], index.search("cloudwatch", 2)[0])
+
+
+def test_bm25_subset_and_unknown_terms() -> None:
+    index = BM25Index.build(TEXTS)
+
+    assert index.search("workload", top_k=4, subset=np.array([3]))[0].tolist() == [3]
+    assert index.search("kubernetes", top_k=4)[0].size == 0
+
+
+def test_load_or_build_rebuilds_stale_index(tmp_path: Path) -> None:
+    chunks_file = tmp_path / "chunks.jsonl"
+    chunks_file.write_text("old corpus\n", encoding="utf-8")
+    BM25Index.build(TEXTS[:2]).save(bm25_path_for(chunks_file))
+
+    assert len(load_or_build_bm25(chunks_file, TEXTS)) == len(TEXTS)
+
+    # Same row count, but built from an earlier version of the chunks file.
+    BM25Index.build(reversed(TEXTS)).save(
+        bm25_path_for(chunks_file), source_fingerprint=file_fingerprint(chunks_file)
+    )
+    chunks_file.write_text("new corpus, same rows\n", encoding="utf-8")
+    rows, _ = load_or_build_bm25(chunks_file, TEXTS).search("rel10-bp02", 1)
+    assert rows.tolist() == [0]
+
+
+def test_load_or_build_reuses_matching_index(tmp_path: Path) -> None:
+    chunks_file = tmp_path / "chunks.jsonl"
+    chunks_file.write_text("corpus\n", encoding="utf-8")
+    BM25Index.build(TEXTS).save(bm25_path_for(chunks_file), source_fingerprint=file_fingerprint(chunks_file))
+
+    index = load_or_build_bm25(chunks_file, ["unrelated"])
+
+    assert len(index) == len(TEXTS)
+    assert index.source_fingerprint == file_fingerprint(chunks_file)
+
+
+def test_reciprocal_rank_fusion_rewards_agreement() -> None:
+    a, b, c = (RetrievedChunk(chunk_id=name, text=name, score=0.0) for name in "abc")
+
+    fused = reciprocal_rank_fusion([[a, b], [c, b]], top_k=2, k=60)
+
+    assert [chunk.chunk_id for chunk in fused] == ["b", "a"]
+    assert fused[0].score == 1 / 62 + 1 / 62
+
+
+class OperationalEmbedder:
+    def encode(self, sentences, convert_to_numpy=True):
+        return [np.array([1.0, 0.0], dtype=np.float32) for _ in sentences]
+
+
+def test_chat_service_hybrid_surfaces_lexical_match(tmp_path: Path) -> None:
+    chunks_file = tmp_path / "chunks.jsonl"
+    with chunks_file.open("w", encoding="utf-8") as stream:
+        for idx, text in enumerate(TEXTS):
+            embedding = [1.0, 0.1 * idx] if idx != 0 else [0.0, 1.0]
+            payload = {"chunk_id": f"chunk-{idx}", "text": text, "source": f"s{idx}", "embedding": embedding}
+            stream.write(json.dumps(payload) + "\n")
+    store = InMemoryVectorStore(chunks_file)
+    settings = Settings(embeddings_file=chunks_file, retrieval_top_k=2, retrieval_hybrid_candidates=2)
+
+    dense_only = RetrievalAugmentedChatService(
+        settings=settings, embedder=OperationalEmbedder(), store=store, llm_client=None
+    )
+    hybrid = RetrievalAugmentedChatService(
+        settings=settings,
+        embedder=OperationalEmbedder(),
+        store=store,
+        llm_client=None,
+        lexical_index=BM25Index.build(store.texts()),
+    )
+
+    query = ChatRequest(query="Explain REL10-BP02")
+    assert "s0" not in dense_only.answer(query).sources
+    assert "s0" in hybrid.answer(query).sources
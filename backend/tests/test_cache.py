@@ -0,0 +1,44 @@
+from app.services.cache import LRUCache, normalise_query
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_lru_cache_evicts_least_recently_used() -> None:
+    cache: LRUCache[str, int] = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats() == {"size": 2, "max_size": 2, "hits": 3, "misses": 1}
+
+
+def test_lru_cache_expires_entries() -> None:
+    clock = FakeClock()
+    cache: LRUCache[str, int] = LRUCache(4, ttl_seconds=10, clock=clock)
+    cache.put("a", 1)
+
+    clock.now = 9.9
+    assert cache.get("a") == 1
+    clock.now = 10.0
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_lru_cache_size_zero_disables_storage() -> None:
+    cache: LRUCache[str, int] = LRUCache(0)
+    cache.put("a", 1)
+    assert cache.get("a") is None
+
+
+def test_normalise_query_ignores_case_and_spacing() -> None:
+    assert normalise_query("  What is   the Security pillar? ") == "what is the security pillar?"
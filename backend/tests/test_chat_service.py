@@ -1,71 +1,16 @@
-import json
-from pathlib import Path
-
-import numpy as np
+import pytest
+from pydantic import ValidationError
 
 from app.config import Settings
 from app.retrieval.in_memory_store import InMemoryVectorStore
 from app.schemas import ChatMessage, ChatRequest
 from app.services.chat_service import RetrievalAugmentedChatService
 
-
-class DummyEmbedder:
-    def encode(self, sentences, convert_to_numpy=True):
-        vectors = []
-        for text in sentences:
-            if "operational" in text.lower():
-                vectors.append(np.array([1.0, 0.0], dtype=np.float32))
-            else:
-                vectors.append(np.array([0.0, 1.0], dtype=np.float32))
-        return vectors
-
-
-class StubLLM:
-    def __init__(self) -> None:
-        self.calls: list[tuple[str, str | None]] = []
-
-    def generate(self, prompt: str, *, system_prompt: str | None = None) -> str:
-        self.calls.append((prompt, system_prompt))
-        return "final answer"
-
-
-def _write_chunks_file(tmp_path: Path) -> Path:
-    records = [
-        {
-            "chunk_id": "chunk-1",
-            "document_id": "doc-1",
-            "source": "https://example.com/1",
-            "pillar": "Operational Excellence",
-            "chunk_index": 1,
-            "text": "Operational excellence focuses on continuous improvement.",
-            "word_count": 8,
-            "summary": "Operational excellence focuses on continuous improvement.",
-            "doc_type": "html",
-            "embedding": [1.0, 0.0],
-        },
-        {
-            "chunk_id": "chunk-2",
-            "document_id": "doc-2",
-            "source": "https://example.com/2",
-            "pillar": "Security",
-            "chunk_index": 1,
-            "text": "Security pillar enforces least privilege.",
-            "word_count": 6,
-            "summary": "Security pillar guidance.",
-            "doc_type": "html",
-            "embedding": [0.0, 1.0],
-        },
-    ]
-
-    path = tmp_path / "embeddings.jsonl"
-    with path.open("w", encoding="utf-8") as stream:
-        for item in records:
-            stream.write(json.dumps(item) + "\n")
-    return path
+from conftest import DummyEmbedder, StubLLM, write_chunks_file
 
 
 def test_chat_service_without_llm_returns_preview(tmp_path) -> None:
-    chunks_file = _write_chunks_file(tmp_path)
+    chunks_file = write_chunks_file(tmp_path / "embeddings.jsonl")
     settings = Settings(
         embeddings_file=chunks_file,
         deepseek_api_key=None,
@@ -86,7 +31,7 @@ def test_chat_service_without_llm_returns_preview(tmp_path) -> None:
 
 
 def test_chat_service_with_llm(tmp_path) -> None:
-    chunks_file = _write_chunks_file(tmp_path)
+    chunks_file = write_chunks_file(tmp_path / "embeddings.jsonl")
     settings = Settings(
         embeddings_file=chunks_file,
         deepseek_api_key="dummy",
@@ -111,3 +56,78 @@ def test_chat_service_with_llm(tmp_path) -> None:
     assert response.answer == "final answer"
     assert response.sources == ["https://example.com/1", "https://example.com/2"]
     assert llm.calls, "LLM should have been invoked"
+
+
+def test_chat_service_filters_by_pillar(tmp_path) -> None:
+    chunks_file = write_chunks_file(tmp_path / "embeddings.jsonl")
+    settings = Settings(embeddings_file=chunks_file, retrieval_top_k=2)
+
+    service = RetrievalAugmentedChatService(
+        settings=settings,
+        embedder=DummyEmbedder(),
+        store=InMemoryVectorStore(chunks_file),
+        llm_client=None,
+    )
+
+    response = service.answer(ChatRequest(query="Operational excellence", pillar="Security"))
+
+    assert response.sources == ["https://example.com/2"]
+
+
+class CountingEmbedder(DummyEmbedder):
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def encode(self, sentences, convert_to_numpy=True):
+        self.calls += 1
+        return super().encode(sentences, convert_to_numpy=convert_to_numpy)
+
+
+def test_chat_service_caches_query_embeddings(tmp_path) -> None:
+    chunks_file = write_chunks_file(tmp_path / "embeddings.jsonl")
+    embedder = CountingEmbedder()
+    service = RetrievalAugmentedChatService(
+        settings=Settings(embeddings_file=chunks_file, retrieval_top_k=1),
+        embedder=embedder,
+        store=InMemoryVectorStore(chunks_file),
+        llm_client=None,
+    )
+
+    first = service.answer(ChatRequest(query="Operational excellence"))
+    second = service.answer(ChatRequest(query="  operational   EXCELLENCE "))
+
+    assert embedder.calls == 1
+    assert first.sources == second.sources
+    assert service.stats()["query_cache"]["hits"] == 1
+    assert service.stats()["query_cache"]["misses"] == 1
+
+
+def test_chat_service_reuses_cached_answers(tmp_path) -> None:
+    chunks_file = write_chunks_file(tmp_path / "embeddings.jsonl")
+    llm = StubLLM()
+    service = RetrievalAugmentedChatService(
+        settings=Settings(embeddings_file=chunks_file, retrieval_top_k=1),
+        embedder=DummyEmbedder(),
+        store=InMemoryVectorStore(chunks_file),
+        llm_client=llm,
+    )
+
+    first = service.answer(ChatRequest(query="Operational excellence"))
+    second = service.answer(ChatRequest(query="operational excellence"))
+    follow_up = service.answer(
+        ChatRequest(
+            query="operational excellence",
+            history=[ChatMessage(role="user", content="Earlier question")],
+        )
+    )
+
+    assert first.answer == second.answer == follow_up.answer == "final answer"
+    assert len(llm.calls) == 2
+    assert service.stats()["answer_cache"]["hits"] == 1
+
+
+def test_chat_request_normalises_pillar_and_rejects_unknown_ones() -> None:
+    assert ChatRequest(query="q", pillar="  cost   optimization ").pillar == "Cost Optimization"
+    assert ChatRequest(query="q", pillar="SECURITY").pillar == "Security"
+    with pytest.raises(ValidationError):
+        ChatRequest(query="q", pillar="Securty")
@@ -0,0 +1,100 @@
+import json
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+from app.retrieval.chunk_table import ChunkTable
+from app.retrieval.in_memory_store import InMemoryVectorStore, RetrievedChunk
+from app.retrieval.shared_segment import (
+    SharedIndexSegment,
+    prepare_shared_index,
+    segment_path_for,
+)
+
+from conftest import chunk_records, random_matrix, write_chunks_file
+
+
+def _records() -> list[dict]:
+    return [
+        {"chunk_id": "a", "text": "alpha", "pillar": "Security", "chunk_index": 0, "extra": 1},
+        {
+            "chunk_id": "b",
+            "text": "bêta",
+            "summary": "",
+            "source": "https://x/1",
+            "token_count": 7,
+        },
+        {"chunk_id": "c", "text": "", "pillar": "Security", "summary": "gamma", "chunk_index": 2},
+    ]
+
+
+def test_columns_round_trip_values_and_missing_fields() -> None:
+    table = ChunkTable.from_records(_records())
+
+    assert len(table) == 3
+    assert list(table.strings["chunk_id"]) == ["a", "b", "c"]
+    assert list(table.texts) == ["alpha", "bêta", ""]
+    assert list(table.strings["summary"]) == [None, "", "gamma"]
+    assert [table.category("pillar", row) for row in range(3)] == ["Security", None, "Security"]
+    assert [table.category("source", row) for row in range(3)] == [None, "https://x/1", None]
+    assert [table.integer("chunk_index", row) for row in range(3)] == [0, None, 2]
+    assert table.integer("token_count", 1) == 7
+    assert table.vocabularies["pillar"] == ["Security"]
+
+
+def test_rows_where_groups_rows_in_order() -> None:
+    table = ChunkTable.from_records(_records())
+
+    np.testing.assert_array_equal(table.rows_where("pillar", "Security"), [0, 2])
+    np.testing.assert_array_equal(table.rows_where("source", "https://x/1"), [1])
+    assert table.rows_where("pillar", "Reliability").shape == (0,)
+    assert table.rows_where("doc_type", "html").shape == (0,)
+
+
+def test_table_is_an_order_of_magnitude_smaller_than_records(tmp_path: Path) -> None:
+    records = chunk_records(random_matrix(rows=1000, dims=128))
+    chunks_file = write_chunks_file(tmp_path / "chunks.jsonl", records)
+    lines = chunks_file.read_text().splitlines()
+
+    tracemalloc.start()
+    try:
+        # The payload dicts the store used to keep, boxed embedding floats included.
+        records = [json.loads(line) for line in lines]
+        records_bytes = tracemalloc.get_traced_memory()[0]
+        table = ChunkTable.from_records(records)
+        del records
+        table_bytes = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    assert table_bytes * 10 < records_bytes
+    assert table.nbytes < table_bytes
+
+
+def test_store_materialises_slotted_chunks_for_top_rows_only(tmp_path: Path) -> None:
+    matrix = random_matrix(rows=50)
+    chunks_file = write_chunks_file(tmp_path / "chunks.jsonl", chunk_records(matrix))
+    store = InMemoryVectorStore(chunks_file)
+
+    results = store.search(matrix[7], top_k=3)
+
+    assert len(results) == 3 and results[0].chunk_id == "chunk-7"
+    assert results[0].text == "text 7" and results[0].pillar == "Reliability"
+    assert not hasattr(results[0], "__dict__")
+    assert RetrievedChunk.__slots__
+
+
+def test_segment_maps_table_columns_read_only(tmp_path: Path) -> None:
+    chunks_file = write_chunks_file(tmp_path / "chunks.jsonl", chunk_records(random_matrix(rows=30)))
+    segment = segment_path_for(chunks_file)
+    prepare_shared_index(chunks_file, segment)
+
+    table = SharedIndexSegment(segment).table
+    lines = chunks_file.read_text().splitlines()
+    expected = ChunkTable.from_records(json.loads(line) for line in lines)
+
+    assert isinstance(table.codes["pillar"], np.memmap)
+    assert not table.codes["pillar"].flags.writeable
+    assert list(table.texts) == list(expected.texts)
+    np.testing.assert_array_equal(table.rows_where("document_id", "doc-2"), range(20, 30))
@@ -0,0 +1,25 @@
+from pathlib import Path
+
+import pytest
+from pydantic import ValidationError
+
+from app import main
+from app.config import Settings
+
+ENV_EXAMPLE = Path(__file__).resolve().parents[1] / ".env.example"
+
+
+def test_env_example_loads() -> None:
+    settings = Settings(_env_file=ENV_EXAMPLE)
+
+    assert settings.frontend_origins == ["http://localhost:5173", "http://127.0.0.1:5173"]
+    assert settings.llm_hedge_percentile is None
+    assert settings.shared_index_path is None
+    assert main._index_source(settings) == settings.embeddings_file
+    assert Settings(llm_hedge_percentile="95").llm_hedge_percentile == 95.0
+
+
+def test_shared_index_path_must_be_a_file(tmp_path: Path) -> None:
+    assert Settings(shared_index_path=tmp_path / "missing.segment").shared_index_path is not None
+    with pytest.raises(ValidationError, match="segment file"):
+        Settings(shared_index_path=tmp_path)
@@ -0,0 +1,140 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+from pydantic import ValidationError
+
+from app.config import Settings
+from app.retrieval.diversity import merge_adjacent, mmr_select
+from app.retrieval.in_memory_store import InMemoryVectorStore, RetrievedChunk
+from app.schemas import ChatRequest
+from app.services.chat_service import RetrievalAugmentedChatService
+
+from conftest import DummyEmbedder, StubLLM
+
+
+def _unit(*rows: list[float]) -> np.ndarray:
+    matrix = np.asarray(rows, dtype=np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def _chunk(chunk_id: str, text: str, score: float, document_id=None, chunk_index=None):
+    return RetrievedChunk(
+        chunk_id=chunk_id,
+        text=text,
+        score=score,
+        document_id=document_id,
+        chunk_index=chunk_index,
+        token_count=len(text.split()),
+    )
+
+
+def test_mmr_with_lambda_one_keeps_relevance_order() -> None:
+    vectors = _unit([1.0, 0.1], [1.0, 0.0], [0.0, 1.0], [1.0, 0.3])
+    query = _unit([1.0, 0.0])[0]
+
+    assert mmr_select(query, vectors, 3, 1.0) == [1, 0, 3]
+    assert mmr_select(query, vectors, 0, 0.5) == []
+    assert mmr_select(query, vectors[:0], 3, 0.5) == []
+
+
+def test_mmr_skips_near_duplicates() -> None:
+    # Rows 0-2 are near-copies of one passage; row 3 is less relevant but different.
+    vectors = _unit([1.0, 0.20], [1.0, 0.21], [1.0, 0.22], [0.6, 0.8])
+    query = _unit([1.0, 0.3])[0]
+
+    assert mmr_select(query, vectors, 2, 1.0) == [2, 1]
+    assert mmr_select(query, vectors, 2, 0.5) == [2, 3]
+    assert sorted(mmr_select(query, vectors, 10, 0.5)) == [0, 1, 2, 3]
+
+
+def test_merge_adjacent_joins_overlapping_windows_in_rank_order() -> None:
+    chunks = [
+        _chunk("d1-2", "three four five six", 0.9, "d1", 2),
+        _chunk("d2-0", "other passage", 0.8, "d2", 0),
+        _chunk("d1-1", "one two three four", 0.7, "d1", 1),
+        _chunk("d1-4", "far away", 0.6, "d1", 4),
+        _chunk("loose", "no document", 0.5),
+    ]
+
+    merged = merge_adjacent(chunks)
+
+    assert [chunk.chunk_id for chunk in merged] == ["d1-1+d1-2", "d2-0", "d1-4", "loose"]
+    assert merged[0].text == "one two three four five six"
+    assert merged[0].score == 0.9 and merged[0].chunk_index == 1
+    assert merged[0].token_count is None
+    assert merged[1:] == chunks[1:2] + chunks[3:]
+
+
+def _write_overlapping_document(tmp_path: Path) -> Path:
+    words = [f"w{idx}" for idx in range(12)]
+    records = [
+        # Three overlapping windows of one document, all close to the query.
+        {
+            "chunk_id": f"ops-{idx}",
+            "document_id": "ops",
+            "chunk_index": idx,
+            "source": "https://example.com/ops",
+            "text": " ".join(words[idx * 3 : idx * 3 + 6]),
+            "embedding": [1.0, 0.05 * idx],
+        }
+        for idx in range(3)
+    ]
+    records.append(
+        {
+            "chunk_id": "rel-0",
+            "document_id": "rel",
+            "chunk_index": 0,
+            "source": "https://example.com/rel",
+            "text": "reliability",
+            "embedding": [0.7, 0.7],
+        }
+    )
+    path = tmp_path / "embeddings.jsonl"
+    path.write_text("".join(json.dumps(record) + "\n" for record in records))
+    return path
+
+
+def _service(tmp_path: Path, **overrides) -> tuple[RetrievalAugmentedChatService, StubLLM]:
+    path = _write_overlapping_document(tmp_path)
+    llm = StubLLM()
+    service = RetrievalAugmentedChatService(
+        settings=Settings(
+            embeddings_file=path, retrieval_top_k=2, answer_cache_size=0, **overrides
+        ),
+        embedder=DummyEmbedder(),
+        store=InMemoryVectorStore(path),
+        llm_client=llm,
+    )
+    return service, llm
+
+
+def test_chat_request_options_diversify_and_merge(tmp_path) -> None:
+    service, llm = _service(tmp_path)
+    query = "Operational excellence"
+
+    plain = service.answer(ChatRequest(query=query))
+    diverse = service.answer(ChatRequest(query=query, mmr_lambda=0.3))
+    merged = service.answer(ChatRequest(query=query, merge_adjacent=True))
+
+    assert plain.sources == ["https://example.com/ops"]
+    assert diverse.sources == ["https://example.com/ops", "https://example.com/rel"]
+    assert merged.sources == ["https://example.com/ops"]
+    merged_prompt = llm.calls[2][0]
+    assert "\nw0 w1 w2 w3 w4 w5 w6 w7 w8\n" in merged_prompt
+    assert merged_prompt.count("w3") == 1
+
+
+def test_settings_supply_diversity_defaults(tmp_path) -> None:
+    service, _ = _service(tmp_path, retrieval_mmr_lambda=0.3)
+
+    assert service.answer(ChatRequest(query="Operational excellence")).sources == [
+        "https://example.com/ops",
+        "https://example.com/rel",
+    ]
+    assert service.answer(
+        ChatRequest(query="Operational excellence", mmr_lambda=1.0)
+    ).sources == ["https://example.com/ops"]
+    with pytest.raises(ValidationError):
+        ChatRequest(query="Operational excellence", mmr_lambda=1.5)
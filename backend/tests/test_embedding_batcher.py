@@ -0,0 +1,90 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from app.config import Settings
+from app.retrieval.in_memory_store import InMemoryVectorStore
+from app.schemas import ChatRequest
+from app.services.chat_service import RetrievalAugmentedChatService
+from app.services.embedding_batcher import EmbeddingMicroBatcher
+
+from conftest import DummyEmbedder, write_chunks_file
+
+
+class RecordingModel(DummyEmbedder):
+    def __init__(self) -> None:
+        self.batches: list[list[str]] = []
+
+    def encode(self, sentences, convert_to_numpy=True):
+        self.batches.append(list(sentences))
+        return super().encode(sentences, convert_to_numpy=convert_to_numpy)
+
+
+class FailingModel:
+    def encode(self, sentences, convert_to_numpy=True):
+        raise RuntimeError("model crashed")
+
+
+def test_concurrent_submissions_share_one_batch() -> None:
+    model = RecordingModel()
+    batcher = EmbeddingMicroBatcher(model, max_batch_size=8, max_wait_ms=200)
+
+    futures = [batcher.submit(f"operational {idx}") for idx in range(5)]
+    vectors = [future.result(timeout=2) for future in futures]
+    batcher.close()
+
+    assert model.batches == [[f"operational {idx}" for idx in range(5)]]
+    np.testing.assert_array_equal(vectors[0], [1.0, 0.0])
+    assert batcher.stats() == {
+        "batches": 1,
+        "items": 5,
+        "mean_batch_size": 5.0,
+        "batch_size_histogram": {"5": 1},
+    }
+
+
+def test_batches_are_capped_and_encode_is_drop_in() -> None:
+    model = RecordingModel()
+    batcher = EmbeddingMicroBatcher(model, max_batch_size=2, max_wait_ms=50)
+
+    matrix = batcher.encode(["a", "b", "operational c"])
+    batcher.close()
+
+    assert matrix.shape == (3, 2)
+    assert [len(batch) for batch in model.batches] == [2, 1]
+
+
+def test_model_errors_reach_every_caller() -> None:
+    batcher = EmbeddingMicroBatcher(FailingModel(), max_batch_size=4, max_wait_ms=20)
+    futures = [batcher.submit("a"), batcher.submit("b")]
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(timeout=2)
+    batcher.close()
+
+
+def test_async_answers_are_encoded_in_shared_batches(tmp_path) -> None:
+    chunks_file = write_chunks_file(tmp_path / "embeddings.jsonl")
+    model = RecordingModel()
+    batcher = EmbeddingMicroBatcher(model, max_batch_size=32, max_wait_ms=50)
+    service = RetrievalAugmentedChatService(
+        settings=Settings(embeddings_file=chunks_file, retrieval_top_k=1, embedding_executor_workers=1),
+        embedder=batcher,
+        store=InMemoryVectorStore(chunks_file),
+        llm_client=None,
+    )
+
+    async def run() -> list:
+        requests = [ChatRequest(query=f"Operational question {idx}") for idx in range(20)]
+        return await asyncio.gather(*(service.answer_async(request) for request in requests))
+
+    responses = asyncio.run(run())
+    batcher.close()
+
+    assert all(response.sources == ["https://example.com/1"] for response in responses)
+    assert sum(len(batch) for batch in model.batches) == 20
+    assert len(model.batches) < 20
+    assert service.stats()["embedding_batcher"]["items"] == 20
+    assert not [thread for thread in threading.enumerate() if thread.name == "wafr-embedding-batcher"]
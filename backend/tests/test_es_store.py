@@ -0,0 +1,102 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.config import Settings
+from app.ingest.writers import ElasticsearchChunkWriter
+from app.retrieval.es_store import ElasticsearchVectorStore, create_client, ensure_index
+from app.retrieval.in_memory_store import InMemoryVectorStore
+from app.schemas import ChatRequest
+from app.services.chat_service import RetrievalAugmentedChatService
+
+from conftest import DummyEmbedder, write_chunks_file
+from fake_elasticsearch import FakeElasticsearch
+
+
+@pytest.fixture
+def fake_es():
+    server = FakeElasticsearch()
+    yield server
+    server.close()
+
+
+def _load_corpus(fake_es: FakeElasticsearch, tmp_path, **store_kwargs):
+    chunks_file = write_chunks_file(tmp_path / "embeddings.jsonl")
+    payloads = [json.loads(line) for line in chunks_file.read_text().splitlines()]
+    client = create_client(fake_es.url)
+    ElasticsearchChunkWriter(client, index_name="wafr").write(payloads)
+    return chunks_file, ElasticsearchVectorStore(client, "wafr", **store_kwargs)
+
+
+def test_ensure_index_bootstraps_knn_mapping(fake_es) -> None:
+    client = create_client(fake_es.url)
+
+    assert ensure_index(client, "wafr", 384) is True
+    assert ensure_index(client, "wafr", 384) is False
+
+    embedding = fake_es.mappings["wafr"]["properties"]["embedding"]
+    assert embedding == {"type": "dense_vector", "dims": 384, "index": True, "similarity": "cosine"}
+    assert fake_es.mappings["wafr"]["properties"]["pillar"] == {"type": "keyword"}
+
+
+def test_es_store_matches_in_memory_store(fake_es, tmp_path) -> None:
+    chunks_file, store = _load_corpus(fake_es, tmp_path)
+    memory = InMemoryVectorStore(chunks_file)
+    query = np.array([0.9, 0.1], dtype=np.float32)
+
+    remote = store.search(query, top_k=2)
+    local = memory.search(query, top_k=2)
+
+    assert [chunk.chunk_id for chunk in remote] == [chunk.chunk_id for chunk in local]
+    assert [chunk.score for chunk in remote] == pytest.approx([chunk.score for chunk in local], abs=1e-5)
+    assert remote[0].source == "https://example.com/1"
+    assert len(store) == 2
+    assert "embedding" in fake_es.documents["wafr"]["chunk-1"]
+    assert all("embedding" in search["_source"]["excludes"] for search in fake_es.searches)
+
+
+def test_es_store_applies_filters_as_knn_prefilters(fake_es, tmp_path) -> None:
+    _, store = _load_corpus(fake_es, tmp_path)
+
+    results = store.search([1.0, 0.0], top_k=2, filters={"pillar": "Security"})
+
+    assert [chunk.chunk_id for chunk in results] == ["chunk-2"]
+    assert fake_es.searches[-1]["knn"]["filter"] == [{"term": {"pillar": "Security"}}]
+    with pytest.raises(ValueError):
+        store.search([1.0, 0.0], filters={"summary": "x"})
+
+
+def test_es_store_hybrid_fuses_bm25_in_one_round_trip(fake_es, tmp_path) -> None:
+    _, store = _load_corpus(fake_es, tmp_path, hybrid=True, hybrid_candidates=2)
+
+    dense_only = store.search([1.0, 0.0], top_k=1)
+    hybrid = store.search([1.0, 0.0], top_k=1, query_text="least privilege")
+
+    assert dense_only[0].chunk_id == "chunk-1"
+    # chunk-2 is second by vector but the only BM25 match, so fusion ranks it first.
+    assert hybrid[0].chunk_id == "chunk-2"
+    assert "knn" in fake_es.searches[-2]
+    assert fake_es.searches[-1]["query"]["bool"]["must"] == {"match": {"text": "least privilege"}}
+
+
+def test_es_store_search_batch(fake_es, tmp_path) -> None:
+    _, store = _load_corpus(fake_es, tmp_path)
+
+    results = store.search_batch(np.array([[1.0, 0.0], [0.0, 1.0]]), top_k=1)
+
+    assert [[chunk.chunk_id for chunk in hits] for hits in results] == [["chunk-1"], ["chunk-2"]]
+
+
+def test_chat_service_uses_es_store(fake_es, tmp_path) -> None:
+    chunks_file, store = _load_corpus(fake_es, tmp_path)
+    service = RetrievalAugmentedChatService(
+        settings=Settings(embeddings_file=chunks_file, retrieval_top_k=1),
+        embedder=DummyEmbedder(),
+        store=store,
+        llm_client=None,
+    )
+
+    response = service.answer(ChatRequest(query="Security guidance", pillar="Security"))
+
+    assert response.sources == ["https://example.com/2"]
@@ -0,0 +1,84 @@
+import pytest
+from elasticsearch import Elasticsearch
+
+from app.ingest.writers import BulkIndexError, ElasticsearchChunkWriter
+
+from fake_elasticsearch import FakeElasticsearch
+
+
+@pytest.fixture
+def fake_es():
+    server = FakeElasticsearch()
+    yield server
+    server.close()
+
+
+def _payloads(count: int):
+    for idx in range(count):
+        yield {"chunk_id": f"chunk-{idx}", "text": f"text {idx}", "embedding": [0.1] * 8}
+
+
+def _writer(fake_es: FakeElasticsearch, **kwargs) -> ElasticsearchChunkWriter:
+    return ElasticsearchChunkWriter(
+        Elasticsearch(fake_es.url), index_name="wafr", initial_backoff=0.01, **kwargs
+    )
+
+
+def test_bulk_writer_flushes_by_count_and_bytes(fake_es) -> None:
+    writer = _writer(fake_es, max_docs=10, max_bytes=1_000)
+
+    writer.write(_payloads(45))
+
+    assert len(fake_es.documents["wafr"]) == 45
+    assert writer.indexed == 45
+    assert all(len(batch) <= 10 for batch in fake_es.bulk_requests)
+    # Each action + document pair is ~130 bytes, so the byte limit splits batches below 10.
+    assert max(len(batch) for batch in fake_es.bulk_requests) < 10
+    assert sorted(doc for batch in fake_es.bulk_requests for doc in batch) == sorted(
+        f"chunk-{idx}" for idx in range(45)
+    )
+
+
+def test_bulk_writer_runs_requests_in_parallel() -> None:
+    fake_es = FakeElasticsearch(bulk_delay=0.1)
+    try:
+        writer = _writer(fake_es, max_docs=5, parallelism=4)
+        writer.write(_payloads(40))
+    finally:
+        fake_es.close()
+
+    assert len(fake_es.documents["wafr"]) == 40
+    assert 1 < fake_es.peak_in_flight <= 4
+
+
+def test_bulk_writer_retries_only_failed_items(fake_es) -> None:
+    fake_es.bulk_status = lambda doc_id, attempt: 429 if doc_id == "chunk-3" and attempt < 2 else 201
+    writer = _writer(fake_es, max_docs=10)
+
+    writer.write(_payloads(10))
+
+    assert len(fake_es.documents["wafr"]) == 10
+    assert fake_es.bulk_requests[1:] == [["chunk-3"], ["chunk-3"]]
+    assert writer.retried == 2
+
+
+def test_bulk_writer_retries_rejected_requests(fake_es) -> None:
+    fake_es.request_status = lambda number: 429 if number == 0 else 200
+    writer = _writer(fake_es, max_docs=10)
+
+    writer.write(_payloads(5))
+
+    assert len(fake_es.documents["wafr"]) == 5
+    assert len(fake_es.bulk_requests) == 2
+
+
+def test_bulk_writer_reports_permanent_failures(fake_es) -> None:
+    fake_es.bulk_status = lambda doc_id, attempt: 400 if doc_id == "chunk-1" else 201
+    writer = _writer(fake_es, max_docs=10)
+
+    with pytest.raises(BulkIndexError) as excinfo:
+        writer.write(_payloads(4))
+
+    assert list(excinfo.value.failures) == ["chunk-1"]
+    assert fake_es.attempts("chunk-1") == 1
+    assert len(fake_es.documents["wafr"]) == 3
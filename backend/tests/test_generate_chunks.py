@@ -0,0 +1,70 @@
+import json
+
+from app.ingest import generate_chunks
+
+
+def _write_raw(raw_dir, slug: str, content: str) -> None:
+    payload = {"id": slug, "source": f"https://example.com/{slug}", "content": content}
+    (raw_dir / f"{slug}.jsonl").write_text(json.dumps(payload) + "\n", encoding="utf-8")
+
+
+def _run(raw_dir, out_dir, *extra: str):
+    return generate_chunks.run(["--input", str(raw_dir), "--output", str(out_dir), *extra])
+
+
+def test_generate_chunks_reuses_unchanged_documents(tmp_path, monkeypatch) -> None:
+    raw_dir, out_dir = tmp_path / "raw", tmp_path / "processed"
+    raw_dir.mkdir()
+    _write_raw(raw_dir, "security_pillar", "Use least privilege for every identity.")
+    _write_raw(raw_dir, "cost_pillar", "Adopt a consumption model.")
+    output = _run(raw_dir, out_dir)
+
+    chunked = []
+    original = generate_chunks.build_chunk_payloads
+    monkeypatch.setattr(
+        generate_chunks,
+        "build_chunk_payloads",
+        lambda document, **kwargs: chunked.append(document.identifier) or original(document, **kwargs),
+    )
+
+    mtime = output.stat().st_mtime_ns
+    _run(raw_dir, out_dir)
+    assert chunked == []
+    assert output.stat().st_mtime_ns == mtime
+
+    _write_raw(raw_dir, "cost_pillar", "Analyze and attribute expenditure.")
+    _run(raw_dir, out_dir)
+    assert chunked == ["cost_pillar"]
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [record["document_id"] for record in records] == ["cost_pillar", "security_pillar"]
+    assert records[0]["text"] == "Analyze and attribute expenditure."
+
+    _run(raw_dir, out_dir, "--chunk-size", "3", "--overlap", "1")
+    assert chunked == ["cost_pillar", "cost_pillar", "security_pillar"]
+
+
+def test_generate_chunks_rechunks_when_format_version_changes(tmp_path, monkeypatch) -> None:
+    raw_dir, out_dir = tmp_path / "raw", tmp_path / "processed"
+    raw_dir.mkdir()
+    _write_raw(raw_dir, "security_pillar", "Use least privilege for every identity.")
+    _write_raw(raw_dir, "cost_pillar", "Adopt a consumption model.")
+    output = _run(raw_dir, out_dir)
+    before = output.read_bytes()
+
+    chunked = []
+    original = generate_chunks.build_chunk_payloads
+    monkeypatch.setattr(
+        generate_chunks,
+        "build_chunk_payloads",
+        lambda document, **kwargs: chunked.append(document.identifier) or original(document, **kwargs),
+    )
+    _write_raw(raw_dir, "cost_pillar", "Analyze and attribute expenditure.")
+    _run(raw_dir, out_dir)
+    # The unchanged document is copied byte for byte from the previous output.
+    assert chunked == ["cost_pillar"]
+    assert output.read_bytes().endswith(before[before.index(b'{"chunk_id": "security') :])
+
+    monkeypatch.setattr(generate_chunks, "CHUNK_FORMAT_VERSION", generate_chunks.CHUNK_FORMAT_VERSION + 1)
+    _run(raw_dir, out_dir)
+    assert chunked == ["cost_pillar", "cost_pillar", "security_pillar"]
+    assert not list(out_dir.glob("*.tmp"))
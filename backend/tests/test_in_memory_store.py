@@ -0,0 +1,51 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.retrieval.in_memory_store import InMemoryVectorStore
+
+from conftest import PILLARS, chunk_records, random_matrix, write_chunks_file
+
+
+@pytest.mark.parametrize(
+    "options",
+    [{}, {"backend": "ivf", "ivf_n_probe": 2}, {"quantization": "int8"}],
+)
+def test_filtered_search_matches_post_filtered_brute_force(tmp_path: Path, options: dict) -> None:
+    matrix = random_matrix()
+    chunks_file = write_chunks_file(tmp_path / "chunks.jsonl", chunk_records(matrix))
+    store = InMemoryVectorStore(chunks_file, **options)
+    query = matrix[0] + matrix[1]
+
+    results = store.search(query, top_k=5, filters={"pillar": "Reliability"})
+
+    unit = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+    scores = unit @ (query / np.linalg.norm(query))
+    allowed = [idx for idx in np.argsort(scores)[::-1] if PILLARS[idx % 3] == "Reliability"][:5]
+    assert all(chunk.pillar == "Reliability" for chunk in results)
+    if not options:
+        assert [chunk.chunk_id for chunk in results] == [f"chunk-{idx}" for idx in allowed]
+
+
+def test_filters_are_combined_and_scope_batches(tmp_path: Path) -> None:
+    matrix = random_matrix()
+    chunks_file = write_chunks_file(tmp_path / "chunks.jsonl", chunk_records(matrix))
+    store = InMemoryVectorStore(chunks_file)
+    filters = {"pillar": "Security", "document_id": "doc-4"}
+
+    results = store.search(matrix[40], top_k=10, filters=filters)
+    batched = store.search_batch(matrix[[40, 41]], top_k=10, filters=filters)
+
+    assert {chunk.chunk_id for chunk in results} == {"chunk-42", "chunk-45", "chunk-48"}
+    assert [len(batch) for batch in batched] == [3, 3]
+
+
+def test_unknown_filter_value_returns_nothing(tmp_path: Path) -> None:
+    matrix = random_matrix()
+    chunks_file = write_chunks_file(tmp_path / "chunks.jsonl", chunk_records(matrix))
+    store = InMemoryVectorStore(chunks_file)
+
+    assert store.search(matrix[0], filters={"pillar": "Sustainability"}) == []
+    with pytest.raises(ValueError):
+        store.search(matrix[0], filters={"source": "https://example.com"})
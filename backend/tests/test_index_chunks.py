@@ -1,9 +1,12 @@
+import json
 from collections import deque
 from typing import Iterator
 
 import pytest
 
 from app.ingest import index_chunks
+from app.ingest.embedding_cache import EmbeddingCache, EmbeddingStats, PreviousEmbeddings
+from app.ingest.writers import BinaryChunkWriter, FileChunkWriter
 
 
 class DummyModel:
@@ -25,3 +28,114 @@ def test_add_embeddings_batches(monkeypatch: pytest.MonkeyPatch) -> None:
     assert enriched[0]["embedding"] == [5.0]
     assert enriched[1]["embedding"] == [5.0]
     assert model.calls == [["hello", "world"]]
+
+
+def _records(*texts: str) -> list[dict]:
+    return [{"chunk_id": f"c{idx}", "text": text} for idx, text in enumerate(texts)]
+
+
+def test_add_embeddings_reuses_previous_output(monkeypatch: pytest.MonkeyPatch, tmp_path) -> None:
+    model = DummyModel()
+    monkeypatch.setattr(index_chunks, "get_embedding_model", lambda name: model)
+
+    for writer in (FileChunkWriter(tmp_path / "out.jsonl"), BinaryChunkWriter(tmp_path / "out.npy")):
+        model.calls.clear()
+        writer.write(index_chunks.add_embeddings(_records("alpha", "beta"), model_name="m"))
+
+        stats = EmbeddingStats()
+        enriched = list(
+            index_chunks.add_embeddings(
+                _records("alpha", "gamma!", "beta"),
+                model_name="m",
+                previous=PreviousEmbeddings.load(writer.output_path),
+                stats=stats,
+            )
+        )
+
+        assert [record["chunk_id"] for record in enriched] == ["c0", "c1", "c2"]
+        assert model.calls[-1] == ["gamma!"]
+        assert (stats.reused, stats.computed) == (2, 1)
+        assert enriched[1]["embedding"] == [6.0]
+
+
+def test_file_writer_replaces_output_only_when_complete(tmp_path) -> None:
+    output = tmp_path / "out.jsonl"
+    writer = FileChunkWriter(output)
+    writer.write(_records("alpha"))
+
+    def failing() -> Iterator[dict]:
+        yield from _records("beta", "gamma")
+        raise RuntimeError("embedding failed")
+
+    with pytest.raises(RuntimeError):
+        writer.write(failing())
+
+    assert [json.loads(line)["text"] for line in output.read_text().splitlines()] == ["alpha"]
+    assert list(tmp_path.iterdir()) == [output]
+
+
+def test_add_embeddings_uses_local_cache_keyed_by_model(monkeypatch: pytest.MonkeyPatch, tmp_path) -> None:
+    model = DummyModel()
+    monkeypatch.setattr(index_chunks, "get_embedding_model", lambda name: model)
+    cache = EmbeddingCache(tmp_path / "cache.sqlite")
+
+    list(index_chunks.add_embeddings(_records("alpha", "beta"), model_name="m", cache=cache))
+    stats = EmbeddingStats()
+    enriched = list(
+        index_chunks.add_embeddings(_records("beta", "alpha"), model_name="m", cache=cache, stats=stats)
+    )
+    other_model = EmbeddingStats()
+    list(index_chunks.add_embeddings(_records("beta"), model_name="other", cache=cache, stats=other_model))
+    cache.close()
+
+    assert [record["embedding"] for record in enriched] == [[4.0], [5.0]]
+    assert (stats.reused, stats.computed) == (2, 0)
+    assert (other_model.reused, other_model.computed) == (0, 1)
+    assert len(model.calls) == 2
+
+
+def test_add_embeddings_process_pool_preserves_order() -> None:
+    texts = [f"chunk number {idx}" for idx in range(23)]
+
+    serial = list(index_chunks.add_embeddings(_records(*texts), model_name="dummy", batch_size=4))
+    stats = EmbeddingStats()
+    parallel = list(
+        index_chunks.add_embeddings(
+            _records(*texts), model_name="dummy", batch_size=4, workers=2, stats=stats
+        )
+    )
+
+    assert [record["chunk_id"] for record in parallel] == [record["chunk_id"] for record in serial]
+    assert [record["embedding"] for record in parallel] == [record["embedding"] for record in serial]
+    assert stats.computed == 23
+
+
+@pytest.mark.parametrize(
+    ("options", "creates_cache"),
+    [
+        (["--writer", "stdout"], False),
+        (["--writer", "file", "--reembed-all"], False),
+        (["--writer", "file"], True),
+    ],
+)
+def test_run_opens_embedding_cache_only_when_it_is_used(
+    monkeypatch: pytest.MonkeyPatch, tmp_path, capsys, options: list[str], creates_cache: bool
+) -> None:
+    monkeypatch.setattr(index_chunks, "get_embedding_model", lambda name: DummyModel())
+    chunks_path = tmp_path / "chunks.jsonl"
+    chunks_path.write_text("".join(json.dumps(record) + "\n" for record in _records("a", "bb")))
+    cache_path = tmp_path / "embedding_cache.sqlite"
+
+    index_chunks.run(
+        [
+            "--chunks-path",
+            str(chunks_path),
+            "--output",
+            str(tmp_path / "embeddings.jsonl"),
+            "--embedding-cache",
+            str(cache_path),
+            *options,
+        ]
+    )
+
+    assert cache_path.exists() is creates_cache
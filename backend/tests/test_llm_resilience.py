@@ -0,0 +1,228 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.config import Settings
+from app.http_utils import parse_retry_after
+from app.retrieval.in_memory_store import InMemoryVectorStore
+from app.schemas import ChatRequest
+from app.services.chat_service import RetrievalAugmentedChatService
+from app.services.llm.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LLMUnavailableError,
+    RetryPolicy,
+)
+from app.services.llm.together import AsyncTogetherClient, TogetherClient
+
+from conftest import DummyEmbedder, write_chunks_file
+
+FAST_RETRIES = RetryPolicy(max_retries=2, base_delay=0.01, max_delay=0.05)
+
+
+class StubCompletionsServer:
+    """Local HTTP/1.1 server replaying scripted `(status, headers, delay)` responses."""
+
+    def __init__(self) -> None:
+        self.script: list[tuple[int, dict[str, str], float]] = []
+        self.requests = 0
+        lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self) -> None:  # noqa: N802 - http.server API
+                self.rfile.read(int(self.headers["Content-Length"]))
+                with lock:
+                    stub.requests += 1
+                    status, headers, delay = stub.script.pop(0) if stub.script else (200, {}, 0.0)
+                time.sleep(delay)
+                body = json.dumps(
+                    {"choices": [{"message": {"content": f"answer {status}"}}]}
+                ).encode("utf-8")
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def stub_server():
+    server = StubCompletionsServer()
+    yield server
+    server.close()
+
+
+def test_retry_after_header_overrides_backoff() -> None:
+    policy = RetryPolicy(max_retries=3, base_delay=0.1, max_delay=10.0)
+
+    assert policy.delay(0, "2") == 2.0
+    assert policy.delay(0, "120") == 10.0
+    assert 0 <= policy.delay(3) <= 0.8
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:10 GMT", now=1445412480.0) == 10.0
+    assert parse_retry_after("soon") is None
+
+
+def test_sync_client_retries_5xx_and_reuses_connection(stub_server) -> None:
+    stub_server.script = [(503, {"Retry-After": "0"}, 0.0), (429, {}, 0.0)]
+    client = TogetherClient("key", base_url=stub_server.url, retry_policy=FAST_RETRIES)
+
+    assert client.generate("hello") == "answer 200"
+    assert client.generate("again") == "answer 200"
+
+    stats = client.stats()
+    assert stats["requests"] == 4
+    assert stats["retries"] == 2
+    assert stats["connections_opened"] == 1
+    assert stats["connections_reused"] == 3
+    client.close()
+
+
+def test_sync_client_gives_up_after_max_retries(stub_server) -> None:
+    stub_server.script = [(500, {}, 0.0)] * 3
+    client = TogetherClient("key", base_url=stub_server.url, retry_policy=FAST_RETRIES)
+
+    with pytest.raises(LLMUnavailableError):
+        client.generate("hello")
+    assert stub_server.requests == 3
+    client.close()
+
+
+def test_non_retryable_status_is_not_retried(stub_server) -> None:
+    stub_server.script = [(400, {}, 0.0)]
+    client = TogetherClient("key", base_url=stub_server.url, retry_policy=FAST_RETRIES)
+
+    with pytest.raises(LLMUnavailableError):
+        client.generate("hello")
+    assert stub_server.requests == 1
+    client.close()
+
+
+def test_circuit_breaker_opens_and_recovers(stub_server) -> None:
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10.0, clock=lambda: now[0])
+    stub_server.script = [(500, {}, 0.0)] * 2
+    client = TogetherClient(
+        "key",
+        base_url=stub_server.url,
+        retry_policy=RetryPolicy(max_retries=0),
+        circuit_breaker=breaker,
+    )
+
+    for _ in range(2):
+        with pytest.raises(LLMUnavailableError):
+            client.generate("hello")
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        client.generate("hello")
+    assert stub_server.requests == 2
+
+    now[0] = 11.0
+    assert breaker.state == "half-open"
+    assert client.generate("hello") == "answer 200"
+    assert breaker.state == "closed"
+    client.close()
+
+
+def test_cancelled_half_open_trial_does_not_keep_circuit_open(stub_server) -> None:
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10.0, clock=lambda: now[0])
+    breaker.record_failure()
+    client = AsyncTogetherClient(
+        "key",
+        base_url=stub_server.url,
+        retry_policy=RetryPolicy(max_retries=0),
+        circuit_breaker=breaker,
+    )
+
+    async def run() -> str:
+        stub_server.script = [(200, {}, 1.0)]
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(client.generate("trial"), timeout=0.1)
+        try:
+            return await client.generate("after reset")
+        finally:
+            await client.aclose()
+
+    now[0] = 11.0
+    assert breaker.state == "half-open"
+    assert asyncio.run(run()) == "answer 200"
+    assert breaker.state == "closed"
+
+
+def test_async_client_hedges_slow_requests(stub_server) -> None:
+    client = AsyncTogetherClient(
+        "key",
+        base_url=stub_server.url,
+        retry_policy=FAST_RETRIES,
+        hedge_percentile=90,
+        hedge_min_samples=3,
+    )
+
+    async def run() -> tuple[str, float]:
+        for _ in range(3):
+            await client.generate("warm up")
+        stub_server.script = [(200, {}, 2.0)]
+        started = time.perf_counter()
+        answer = await client.generate("hedged")
+        elapsed = time.perf_counter() - started
+        await client.aclose()
+        return answer, elapsed
+
+    answer, elapsed = asyncio.run(run())
+
+    assert answer == "answer 200"
+    assert elapsed < 1.0
+    stats = client.stats()
+    assert stats["hedges"] == 1
+    assert stats["hedge_wins"] == 1
+
+
+def test_chat_service_falls_back_to_preview_when_circuit_open(tmp_path, stub_server) -> None:
+    chunks_file = write_chunks_file(tmp_path / "embeddings.jsonl")
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60.0)
+    stub_server.script = [(503, {}, 0.0)]
+    client = TogetherClient(
+        "key",
+        base_url=stub_server.url,
+        retry_policy=RetryPolicy(max_retries=0),
+        circuit_breaker=breaker,
+    )
+    service = RetrievalAugmentedChatService(
+        settings=Settings(embeddings_file=chunks_file, retrieval_top_k=1, answer_cache_size=0),
+        embedder=DummyEmbedder(),
+        store=InMemoryVectorStore(chunks_file),
+        llm_client=client,
+    )
+
+    first = service.answer(ChatRequest(query="Operational excellence"))
+    second = service.answer(ChatRequest(query="Operational excellence"))
+
+    for response in (first, second):
+        assert response.answer.startswith("The language model is temporarily unavailable.")
+        assert "Operational excellence focuses" in response.answer
+        assert response.sources == ["https://example.com/1"]
+    assert stub_server.requests == 1
+    assert service.stats()["llm"]["circuit"] == "open"
+    client.close()
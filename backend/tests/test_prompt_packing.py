@@ -0,0 +1,90 @@
+from app.config import Settings
+from app.ingest.generate_chunks import RawDocument, build_chunk_payloads
+from app.ingest.tokenizer import count_tokens, truncate_to_tokens
+from app.retrieval.in_memory_store import InMemoryVectorStore, RetrievedChunk
+from app.schemas import ChatMessage, ChatRequest
+from app.services.chat_service import RetrievalAugmentedChatService
+from app.services.prompt_packing import fit_history, pack_context
+
+from conftest import DummyEmbedder, StubLLM, write_chunks_file
+
+
+def _chunk(chunk_id: str, words: int, score: float) -> RetrievedChunk:
+    return RetrievedChunk(chunk_id=chunk_id, text=" ".join(["word"] * words), score=score)
+
+
+def test_count_tokens_approximates_bpe() -> None:
+    assert count_tokens("") == 0
+    assert count_tokens("Use least privilege.") == 5
+    assert count_tokens("REL10-BP02") == 5
+    assert count_tokens("observability") == 3
+    assert truncate_to_tokens("one two three four", 2) == "one two"
+
+
+def test_chunk_payloads_carry_token_counts() -> None:
+    document = RawDocument(
+        identifier="security-pillar",
+        source="https://example.com",
+        content="Grant least privilege to every workload identity.",
+        doc_type="html",
+    )
+
+    (payload,) = build_chunk_payloads(document, chunk_size=50, overlap=0)
+
+    assert payload["token_count"] == count_tokens(payload["text"])
+
+
+def test_pack_context_fills_budget_by_score_and_skips_oversized_chunks() -> None:
+    chunks = [_chunk("low", 10, 0.1), _chunk("big", 100, 0.9), _chunk("mid", 20, 0.5)]
+
+    selected, used = pack_context(chunks, budget=60)
+
+    assert [chunk.chunk_id for chunk in selected] == ["mid", "low"]
+    assert used <= 60
+
+
+def test_pack_context_truncates_best_chunk_when_nothing_fits() -> None:
+    selected, used = pack_context([_chunk("big", 100, 0.9)], budget=20)
+
+    assert [chunk.chunk_id for chunk in selected] == ["big"]
+    assert used <= 20
+    assert selected[0].token_count == count_tokens(selected[0].text)
+
+
+def test_fit_history_keeps_newest_turns() -> None:
+    turns = [f"User: message number {idx} " + "filler " * 20 for idx in range(10)]
+
+    kept, used = fit_history(turns, budget=80)
+
+    assert kept[0].startswith("[") and "earlier messages omitted" in kept[0]
+    assert kept[-1] == turns[-1]
+    assert used <= 80
+    assert fit_history(turns[:2], budget=1000) == (turns[:2], sum(count_tokens(t) for t in turns[:2]))
+
+
+def test_prompt_stays_within_budget_for_long_conversations(tmp_path) -> None:
+    chunks_file = write_chunks_file(tmp_path / "embeddings.jsonl")
+    llm = StubLLM()
+    service = RetrievalAugmentedChatService(
+        settings=Settings(
+            embeddings_file=chunks_file,
+            retrieval_top_k=2,
+            max_prompt_tokens=200,
+            answer_cache_size=0,
+        ),
+        embedder=DummyEmbedder(),
+        store=InMemoryVectorStore(chunks_file),
+        llm_client=llm,
+    )
+    history = [
+        ChatMessage(role="user" if idx % 2 == 0 else "assistant", content=f"Turn {idx} " + "detail " * 40)
+        for idx in range(50)
+    ]
+
+    service.answer(ChatRequest(query="Operational excellence", history=history))
+
+    prompt, _ = llm.calls[0]
+    assert count_tokens(prompt) <= 200
+    assert "Turn 49" in prompt
+    assert "Turn 0 " not in prompt
+    assert "[1] Source: https://example.com/1" in prompt
@@ -0,0 +1,91 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from app.fingerprint import file_fingerprint
+from app.ingest.writers import BinaryChunkWriter
+from app.retrieval.ann import ExactSearchBackend, RescoringBackend, measure_recall, sample_queries
+from app.retrieval.in_memory_store import InMemoryVectorStore
+from app.retrieval.quantization import ScalarQuantizedMatrix, quantized_path_for
+
+from conftest import chunk_records, write_chunks_file
+
+
+def _unit_matrix(rows: int = 1500, dims: int = 32) -> np.ndarray:
+    matrix = np.random.default_rng(7).normal(size=(rows, dims)).astype(np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def test_quantized_scores_approximate_float32() -> None:
+    matrix = _unit_matrix()
+    quantized = ScalarQuantizedMatrix.quantize(matrix, block_size=100)
+    query = matrix[3]
+
+    assert quantized.codes.nbytes * 4 == matrix.nbytes
+    np.testing.assert_allclose(quantized @ query, matrix @ query, atol=0.02)
+    np.testing.assert_allclose(quantized[[5, 9]] @ query, matrix[[5, 9]] @ query, atol=0.02)
+
+    queries = matrix[:4].T
+    np.testing.assert_allclose(quantized @ queries, matrix @ queries, atol=0.02)
+
+
+def test_rescoring_keeps_top_k_quality() -> None:
+    matrix = _unit_matrix()
+    quantized = ScalarQuantizedMatrix.quantize(matrix)
+    backend = RescoringBackend(ExactSearchBackend(quantized), matrix, rescore_factor=4)
+
+    rows, scores = backend.search(matrix[11], 5)
+
+    assert rows[0] == 11
+    np.testing.assert_allclose(scores, matrix[rows] @ matrix[11], rtol=1e-6)
+    assert measure_recall(matrix, backend, sample_queries(matrix, 50), top_k=5) == 1.0
+
+
+def test_store_uses_quantized_sidecar(tmp_path: Path) -> None:
+    matrix = _unit_matrix(rows=200, dims=8)
+    payloads = [
+        {"chunk_id": f"chunk-{idx}", "text": f"text {idx}", "embedding": vector.tolist()}
+        for idx, vector in enumerate(matrix)
+    ]
+    writer = BinaryChunkWriter(tmp_path / "chunks.npy")
+    writer.write(json.loads(json.dumps(payloads)))
+
+    saved = ScalarQuantizedMatrix.load(quantized_path_for(writer.output_path))
+    assert saved.source_fingerprint == file_fingerprint(writer.output_path)
+    store = InMemoryVectorStore(writer.output_path, quantization="int8", rescore_factor=3)
+
+    assert store._quantized is not None
+    result = store.search(matrix[42], top_k=2)
+    assert result[0].chunk_id == "chunk-42"
+    assert abs(result[0].score - 1.0) < 1e-5
+
+
+def test_store_requantizes_when_sidecar_is_stale(tmp_path: Path) -> None:
+    matrix = _unit_matrix(rows=30, dims=8)
+    chunks_file = write_chunks_file(tmp_path / "chunks.jsonl", chunk_records(matrix))
+    placeholder = ScalarQuantizedMatrix(np.zeros(matrix.shape, dtype=np.int8), np.ones(8, dtype=np.float32))
+    placeholder.save(quantized_path_for(chunks_file), source_fingerprint=file_fingerprint(chunks_file))
+
+    reused = InMemoryVectorStore(chunks_file, quantization="int8")
+    assert not reused._quantized.codes.any()
+
+    # Same shape, different file: the saved codes must not be trusted.
+    write_chunks_file(chunks_file, chunk_records(matrix[::-1]))
+    os.utime(chunks_file, ns=(1, 1))  # same size; make sure coarse mtimes still differ
+    rebuilt = InMemoryVectorStore(chunks_file, quantization="int8")
+    assert rebuilt._quantized.codes.any()
+    assert rebuilt.search(matrix[0], top_k=1)[0].chunk_id == "chunk-29"
+
+
+def test_quantized_jsonl_store_keeps_float32_rows_off_the_heap(tmp_path: Path) -> None:
+    matrix = _unit_matrix(rows=30, dims=8)
+    chunks_file = write_chunks_file(tmp_path / "chunks.jsonl", chunk_records(matrix))
+
+    store = InMemoryVectorStore(chunks_file, quantization="int8")
+    retrieved = store.search(matrix[4], top_k=2)
+
+    assert isinstance(store.embeddings, np.memmap)
+    assert retrieved[0].chunk_id == "chunk-4"
+    np.testing.assert_allclose(store.embeddings_for(retrieved[:1])[0], matrix[4], atol=1e-6)
@@ -0,0 +1,354 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from app.scraper.crawler import normalize_url, slug_for_url
+from app.scraper.politeness import TokenBucket
+from app.scraper.wafr_scraper import DocumentSpec, WAFRScraper
+
+
+class FixtureSite:
+    """Local HTTP server for scraper tests; `pages` maps paths to `(status, headers, body)`."""
+
+    def __init__(self, *, delay: float = 0.0) -> None:
+        self.pages: dict[str, tuple[int, dict[str, str], bytes]] = {}
+        self.failures: dict[str, list[int]] = {}
+        self.requests: list[tuple[str, dict[str, str]]] = []
+        self.delay = delay
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:  # noqa: N802 - http.server API
+                site.requests.append((self.path, dict(self.headers)))
+                time.sleep(site.delay)
+                pending = site.failures.get(self.path)
+                if pending:
+                    status, headers, body = pending.pop(0), {}, b""
+                else:
+                    status, headers, body = site.pages.get(self.path, (404, {}, b"missing"))
+                    if callable(body):
+                        status, headers, body = body(dict(self.headers))
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+        class Server(ThreadingHTTPServer):
+            # The default backlog of 5 drops concurrent connects, adding 1s SYN retries.
+            request_queue_size = 64
+
+        self._server = Server(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def add_html(self, path: str, body: str, **headers: str) -> None:
+        self.pages[path] = (200, {"Content-Type": "text/html; charset=utf-8", **headers}, body.encode())
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def site():
+    server = FixtureSite()
+    yield server
+    server.close()
+
+
+def _page(title: str) -> str:
+    return f"<html><body><main><h1>{title}</h1><p>{title} guidance.</p></main></body></html>"
+
+
+def test_concurrent_scrape_is_faster_than_serial(tmp_path) -> None:
+    site = FixtureSite(delay=0.2)
+    try:
+        specs = []
+        for idx in range(8):
+            site.add_html(f"/doc{idx}.html", _page(f"Doc {idx}"))
+            specs.append(DocumentSpec(slug=f"doc{idx}", url=f"{site.url}/doc{idx}.html", content_selector="main"))
+
+        timings = {}
+        for concurrency in (1, 8):
+            scraper = WAFRScraper(
+                output_dir=tmp_path / str(concurrency), concurrency=concurrency, host_rate=0
+            )
+            started = time.perf_counter()
+            result = scraper.scrape(specs)
+            timings[concurrency] = time.perf_counter() - started
+            assert [path.name for path in result.changed] == [f"doc{idx}.jsonl" for idx in range(8)]
+    finally:
+        site.close()
+
+    payload = json.loads((tmp_path / "8" / "doc3.jsonl").read_text())
+    assert payload == {"id": "doc3", "source": f"{site.url}/doc3.html", "content": "Doc 3\nDoc 3 guidance."}
+    assert timings[1] >= 1.6
+    assert timings[8] < timings[1] / 3
+
+
+def test_scraper_retries_transient_errors(site, tmp_path) -> None:
+    site.add_html("/flaky.html", _page("Flaky"))
+    site.failures["/flaky.html"] = [503, 429]
+    site.pages["/gone.html"] = (404, {}, b"")
+    scraper = WAFRScraper(output_dir=tmp_path, host_rate=0, retry_backoff=0.01)
+
+    result = scraper.scrape(
+        [
+            DocumentSpec(slug="flaky", url=f"{site.url}/flaky.html"),
+            DocumentSpec(slug="gone", url=f"{site.url}/gone.html"),
+        ]
+    )
+
+    assert [path.name for path in result.changed] == ["flaky.jsonl"]
+    assert result.failed == [f"{site.url}/gone.html"]
+    assert [path for path, _ in site.requests].count("/flaky.html") == 3
+    assert [path for path, _ in site.requests].count("/gone.html") == 1
+
+
+def test_retry_delay_is_capped(tmp_path) -> None:
+    scraper = WAFRScraper(output_dir=tmp_path, retry_backoff=1.0, retry_max_delay=5.0)
+
+    assert scraper._retry_delay(0, httpx.Response(429, headers={"Retry-After": "2"})) == 2.0
+    assert scraper._retry_delay(0, httpx.Response(503, headers={"Retry-After": "86400"})) == 5.0
+    assert scraper._retry_delay(10, None) == 5.0
+
+
+def test_scraper_streams_pdfs_to_disk(site, tmp_path) -> None:
+    site.pages["/paper.pdf"] = (200, {"Content-Type": "application/pdf"}, b"%PDF-1.4" + b"x" * 100_000)
+    scraper = WAFRScraper(output_dir=tmp_path, host_rate=0)
+
+    result = scraper.scrape([DocumentSpec(slug="paper", url=f"{site.url}/paper.pdf", file_name="paper.pdf")])
+
+    (saved,) = result.changed
+
+    assert saved.read_bytes().startswith(b"%PDF-1.4")
+    assert saved.stat().st_size == 100_008
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_scraper_sends_conditional_requests(site, tmp_path) -> None:
+    def page(headers: dict[str, str]):
+        if headers.get("If-None-Match") == '"v1"':
+            return 304, {}, b""
+        return 200, {"Content-Type": "text/html", "ETag": '"v1"', "Last-Modified": "Wed, 01 Jan 2025 00:00:00 GMT"}, _page("Pillar").encode()
+
+    site.pages["/pillar.html"] = (200, {}, page)
+    spec = DocumentSpec(slug="pillar", url=f"{site.url}/pillar.html")
+
+    first = WAFRScraper(output_dir=tmp_path, host_rate=0).scrape([spec])
+    second = WAFRScraper(output_dir=tmp_path, host_rate=0).scrape([spec])
+
+    assert [path.name for path in first.changed] == ["pillar.jsonl"]
+    assert second.changed == [] and [path.name for path in second.unchanged] == ["pillar.jsonl"]
+    headers = site.requests[-1][1]
+    assert headers["If-None-Match"] == '"v1"'
+    assert headers["If-Modified-Since"] == "Wed, 01 Jan 2025 00:00:00 GMT"
+    manifest = json.loads((tmp_path / "scrape_manifest.json").read_text())
+    assert manifest[spec.url]["etag"] == '"v1"'
+
+
+def test_scraper_skips_identical_content(site, tmp_path) -> None:
+    site.add_html("/doc.html", _page("Same"))
+    spec = DocumentSpec(slug="doc", url=f"{site.url}/doc.html", content_selector="main")
+    output = tmp_path / "doc.jsonl"
+
+    WAFRScraper(output_dir=tmp_path, host_rate=0).scrape([spec])
+    output.write_text("sentinel")  # a rewrite would replace this
+    unchanged = WAFRScraper(output_dir=tmp_path, host_rate=0).scrape([spec])
+    site.add_html("/doc.html", _page("Updated"))
+    changed = WAFRScraper(output_dir=tmp_path, host_rate=0).scrape([spec])
+
+    assert unchanged.changed == [] and unchanged.unchanged == [output]
+    assert changed.changed == [output]
+    assert "Updated guidance." in json.loads(output.read_text())["content"]
+    assert all("If-None-Match" not in headers for _, headers in site.requests)
+
+
+def test_scraper_refetches_missing_or_forced_documents(site, tmp_path) -> None:
+    site.add_html("/doc.html", _page("Doc"))
+    spec = DocumentSpec(slug="doc", url=f"{site.url}/doc.html")
+    WAFRScraper(output_dir=tmp_path, host_rate=0).scrape([spec])
+
+    forced = WAFRScraper(output_dir=tmp_path, host_rate=0, conditional=False).scrape([spec])
+    (tmp_path / "doc.jsonl").unlink()
+    missing = WAFRScraper(output_dir=tmp_path, host_rate=0).scrape([spec])
+
+    assert forced.changed == [tmp_path / "doc.jsonl"]
+    assert missing.changed == [tmp_path / "doc.jsonl"]
+
+
+def test_token_bucket_limits_request_rate() -> None:
+    async def run() -> float:
+        bucket = TokenBucket(rate=20.0, burst=2)
+        started = time.perf_counter()
+        for _ in range(6):
+            await bucket.acquire()
+        return time.perf_counter() - started
+
+    # Two tokens are available immediately; the remaining four arrive at 20/s.
+    assert 0.18 <= asyncio.run(run()) < 0.5
+
+
+def _linked_page(title: str, *hrefs: str) -> str:
+    anchors = "".join(f'<a href="{href}">{href}</a>' for href in hrefs)
+    return f"<html><body><nav>{anchors}</nav><main><p>{title} guidance.</p></main></body></html>"
+
+
+@pytest.fixture
+def guide(site):
+    site.add_html(
+        "/guide/welcome.html",
+        _linked_page(
+            "Welcome",
+            "a.html",
+            "b.html#section",
+            "./a.html",
+            "../outside.html",
+            "https://elsewhere.example/x.html",
+            "paper.pdf",
+            "mailto:team@example.com",
+        ),
+    )
+    site.add_html("/guide/a.html", _linked_page("A", "welcome.html", "b.html"))
+    site.add_html("/guide/b.html", _linked_page("B", "deep/c.html"))
+    site.add_html("/guide/deep/c.html", _linked_page("C", "d.html"))
+    site.add_html("/guide/deep/d.html", _linked_page("D"))
+    site.add_html("/outside.html", _linked_page("Outside"))
+    return site
+
+
+def _fetched(site) -> list[str]:
+    return [path for path, _ in site.requests]
+
+
+def _page_file(site, path: str) -> str:
+    return f"{slug_for_url(site.url + path)}.jsonl"
+
+
+def test_normalize_url() -> None:
+    base = "https://Docs.Example.com:443/guide/deep/page.html"
+
+    assert normalize_url("../a.html#top", base) == "https://docs.example.com/guide/a.html"
+    assert normalize_url("./b.html?x=1", base) == "https://docs.example.com/guide/deep/b.html?x=1"
+    assert normalize_url("HTTP://example.com:8080", None) == "http://example.com:8080/"
+    assert normalize_url("mailto:team@example.com", base) is None
+
+
+def test_crawl_follows_in_scope_links_up_to_max_depth(guide, tmp_path) -> None:
+    scraper = WAFRScraper(output_dir=tmp_path, host_rate=0, concurrency=2)
+
+    result = scraper.crawl([f"{guide.url}/guide/welcome.html"], max_depth=2)
+
+    pages = ["/guide/a.html", "/guide/b.html", "/guide/deep/c.html", "/guide/welcome.html"]
+    assert sorted(path.name for path in result.changed) == sorted(_page_file(guide, page) for page in pages)
+    assert sorted(_fetched(guide)) == pages
+    assert json.loads((tmp_path / _page_file(guide, "/guide/b.html")).read_text())["content"] == "B guidance."
+    assert not (tmp_path / "crawl_state.json").exists()
+
+
+def test_crawl_respects_page_cap(guide, tmp_path) -> None:
+    scraper = WAFRScraper(output_dir=tmp_path, host_rate=0)
+
+    result = scraper.crawl([f"{guide.url}/guide/welcome.html"], max_depth=5, max_pages=2)
+
+    assert [path.name for path in result.changed] == [
+        _page_file(guide, "/guide/welcome.html"),
+        _page_file(guide, "/guide/a.html"),
+    ]
+    assert len(guide.requests) == 2
+
+
+def test_crawl_seeds_from_toc(guide, tmp_path) -> None:
+    toc = {"contents": [{"title": "Welcome", "href": "welcome.html", "contents": [{"href": "deep/c.html"}]}]}
+    guide.pages["/guide/toc-contents.json"] = (200, {"Content-Type": "application/json"}, json.dumps(toc).encode())
+    scraper = WAFRScraper(output_dir=tmp_path, host_rate=0)
+
+    result = scraper.crawl([f"{guide.url}/guide/toc-contents.json"], max_depth=0)
+
+    assert [path.name for path in result.changed] == [
+        _page_file(guide, "/guide/welcome.html"),
+        _page_file(guide, "/guide/deep/c.html"),
+    ]
+    assert not list(tmp_path.glob("guide_toc_contents*"))
+
+
+def test_crawl_resumes_after_interruption(guide, tmp_path, monkeypatch) -> None:
+    roots = [f"{guide.url}/guide/welcome.html"]
+    original = WAFRScraper._scrape_single
+    calls = []
+
+    async def flaky(self, client, limiter, manifest, spec):
+        calls.append(spec.url)
+        if len(calls) == 3:
+            raise RuntimeError("interrupted")
+        return await original(self, client, limiter, manifest, spec)
+
+    monkeypatch.setattr(WAFRScraper, "_scrape_single", flaky)
+    with pytest.raises(RuntimeError):
+        WAFRScraper(output_dir=tmp_path, host_rate=0, concurrency=1).crawl(roots, max_depth=3)
+    monkeypatch.setattr(WAFRScraper, "_scrape_single", original)
+
+    state = json.loads((tmp_path / "crawl_state.json").read_text())
+    assert len(state["visited"]) == 2
+    result = WAFRScraper(output_dir=tmp_path, host_rate=0, concurrency=1).crawl(roots, max_depth=3)
+
+    assert [path.name for path in result.changed] == [
+        _page_file(guide, page) for page in ["/guide/b.html", "/guide/deep/c.html", "/guide/deep/d.html"]
+    ]
+    assert sorted(_fetched(guide)) == sorted(set(_fetched(guide)))
+    assert not (tmp_path / "crawl_state.json").exists()
+
+
+def test_recrawl_expands_unchanged_pages_from_manifest(guide, tmp_path) -> None:
+    roots = [f"{guide.url}/guide/welcome.html"]
+    WAFRScraper(output_dir=tmp_path, host_rate=0).crawl(roots, max_depth=3)
+
+    again = WAFRScraper(output_dir=tmp_path, host_rate=0).crawl(roots, max_depth=3)
+
+    assert again.changed == []
+    assert len(again.unchanged) == 5
+
+
+def test_slug_for_url_keeps_distinct_urls_apart() -> None:
+    base = "https://docs.example.com/guide"
+    slugs = {
+        slug_for_url(f"{base}/a-b.html"),
+        slug_for_url(f"{base}/a_b.html"),
+        slug_for_url(f"{base}/a-b.html?page=2"),
+        slug_for_url("https://other.example.com/guide/a-b.html"),
+    }
+
+    assert len(slugs) == 4
+    assert all(slug.startswith("guide_a_b_") for slug in slugs)
+    assert slug_for_url("https://Docs.Example.com:443/guide/x.html#top") == slug_for_url(f"{base}/x.html")
+
+
+def test_crawl_after_default_scrape_reuses_spec_files(guide, tmp_path) -> None:
+    specs = [
+        DocumentSpec(slug="wafr_guide", url=f"{guide.url}/guide/welcome.html", content_selector="main"),
+        DocumentSpec(slug="wafr_guide_a", url=f"{guide.url}/guide/a.html"),
+    ]
+    WAFRScraper(output_dir=tmp_path, host_rate=0).scrape(specs)
+
+    result = WAFRScraper(output_dir=tmp_path, host_rate=0).crawl(
+        [specs[0].url], max_depth=1, specs=specs
+    )
+
+    assert sorted(path.name for path in result.unchanged) == ["wafr_guide.jsonl", "wafr_guide_a.jsonl"]
+    assert [path.name for path in result.changed] == [_page_file(guide, "/guide/b.html")]
+    saved = [json.loads(path.read_text()) for path in tmp_path.glob("*.jsonl")]
+    sources = [payload["source"] for payload in saved]
+    assert len(sources) == len(set(sources)) == 3
@@ -0,0 +1,135 @@
+import os
+from pathlib import Path
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app import __main__ as launcher
+from app import main
+from app.config import Settings, get_settings
+from app.retrieval.bm25 import BM25Index, bm25_path_for
+from app.retrieval.in_memory_store import InMemoryVectorStore
+from app.retrieval.shared_segment import (
+    SharedIndexSegment,
+    prepare_shared_index,
+    read_header,
+    segment_path_for,
+)
+
+from conftest import DummyEmbedder, chunk_records, random_matrix, write_chunks_file
+
+
+def test_segment_store_matches_jsonl_store(tmp_path: Path) -> None:
+    matrix = random_matrix()
+    chunks_file = write_chunks_file(tmp_path / "chunks.jsonl", chunk_records(matrix))
+    segment = segment_path_for(chunks_file)
+    assert prepare_shared_index(chunks_file, segment) is True
+
+    jsonl_store = InMemoryVectorStore(chunks_file)
+    segment_store = InMemoryVectorStore(segment)
+    query = matrix[3] + matrix[7]
+
+    assert len(segment_store) == len(jsonl_store) == 300
+    assert list(segment_store.texts()) == list(jsonl_store.texts())
+    assert segment_store.search(query, top_k=5) == jsonl_store.search(query, top_k=5)
+    filters = {"pillar": "Security"}
+    assert segment_store.search(query, top_k=5, filters=filters) == jsonl_store.search(
+        query, top_k=5, filters=filters
+    )
+
+
+def test_segment_is_mapped_read_only(tmp_path: Path) -> None:
+    matrix = random_matrix(rows=4)
+    chunks_file = write_chunks_file(tmp_path / "chunks.jsonl", chunk_records(matrix))
+    segment = segment_path_for(chunks_file)
+    prepare_shared_index(chunks_file, segment)
+
+    mapped = SharedIndexSegment(segment)
+
+    unit = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.testing.assert_allclose(mapped.matrix, unit, rtol=1e-6)
+    assert list(mapped.table.texts) == [f"text {idx}" for idx in range(4)]
+    assert mapped.table.vocabularies["pillar"] == ["Security", "Reliability", "Cost Optimization"]
+    assert not mapped.matrix.flags.writeable
+    with pytest.raises(ValueError):
+        mapped.matrix[0, 0] = 1.0
+
+
+def test_prepare_rebuilds_only_when_source_changes(tmp_path: Path) -> None:
+    chunks_file = write_chunks_file(tmp_path / "chunks.jsonl", chunk_records(random_matrix(rows=4)))
+    segment = segment_path_for(chunks_file)
+
+    assert prepare_shared_index(chunks_file, segment) is True
+    assert prepare_shared_index(chunks_file, segment) is False
+
+    write_chunks_file(chunks_file, chunk_records(random_matrix(rows=6)))
+    os.utime(chunks_file, ns=(0, 1))
+    assert prepare_shared_index(chunks_file, segment) is True
+    assert read_header(segment)["rows"] == 6
+
+    segment.write_bytes(b"garbage")
+    assert prepare_shared_index(chunks_file, segment) is True
+
+
+def test_launcher_prepares_segment_and_points_workers_at_it(tmp_path, monkeypatch) -> None:
+    chunks_file = write_chunks_file(tmp_path / "chunks.jsonl", chunk_records(random_matrix(rows=4)))
+    monkeypatch.setenv("EMBEDDINGS_FILE", str(chunks_file))
+    get_settings.cache_clear()
+    runs = []
+    monkeypatch.setattr(launcher.uvicorn, "run", lambda app, **kwargs: runs.append(kwargs))
+    try:
+        launcher.main(["--prepare-only"])
+        assert runs == [] and segment_path_for(chunks_file).exists()
+
+        launcher.main(["--shared-index", "--workers", "4"])
+        shared_index_path = os.environ.get("SHARED_INDEX_PATH")
+    finally:
+        os.environ.pop("SHARED_INDEX_PATH", None)
+        get_settings.cache_clear()
+
+    assert runs[0]["workers"] == 4 and runs[0]["reload"] is False
+    assert shared_index_path == str(segment_path_for(chunks_file))
+
+
+def test_app_serves_from_shared_index_path(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(main, "get_embedding_model", lambda name: DummyEmbedder())
+    chunks_file = write_chunks_file(tmp_path / "embeddings.jsonl")
+    segment = segment_path_for(chunks_file)
+    prepare_shared_index(chunks_file, segment)
+    chunks_file.unlink()
+    app = main.create_app(
+        Settings(
+            embeddings_file=chunks_file,
+            shared_index_path=segment,
+            embedding_model_name="dummy",
+            deepseek_api_key=None,
+            retrieval_top_k=1,
+            store_watch_interval_seconds=0,
+        )
+    )
+
+    with TestClient(app) as client:
+        response = client.post("/chat", json={"query": "Operational excellence"})
+        status = client.get("/index/status").json()
+
+    assert response.json()["sources"] == ["https://example.com/1"]
+    assert status["source"] == str(segment) and status["chunks"] == 2
+
+
+def test_hybrid_index_reads_bm25_from_the_segment(tmp_path: Path) -> None:
+    chunks_file = write_chunks_file(tmp_path / "chunks.jsonl", chunk_records(random_matrix(rows=30)))
+    segment = segment_path_for(chunks_file)
+    prepare_shared_index(chunks_file, segment)
+    # A sidecar left over from another corpus with the same row count must not be used.
+    BM25Index.build(f"stale {idx}" for idx in range(30)).save(bm25_path_for(chunks_file))
+
+    index = main._load_index(
+        Settings(embeddings_file=chunks_file, shared_index_path=segment, retrieval_hybrid=True)
+    )
+    rows, _ = index.lexical_index.search("text 17", 1)
+    mapped = SharedIndexSegment(segment).lexical_index()
+
+    assert index.lexical_index.search("stale", 5)[0].shape == (0,)
+    assert [chunk.text for chunk in index.store.chunks_for_rows(rows, [0.0])] == ["text 17"]
+    assert isinstance(mapped.arrays()["doc_ids"], np.memmap)
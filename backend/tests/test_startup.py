@@ -0,0 +1,121 @@
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app.config import Settings
+
+from conftest import DummyEmbedder, write_chunks_file
+
+HEAVY_MODULES = ("torch", "sentence_transformers", "transformers", "elasticsearch")
+
+
+class RecordingEmbedder(DummyEmbedder):
+    def __init__(self) -> None:
+        self.calls: list[list[str]] = []
+
+    def encode(self, sentences, convert_to_numpy=True):
+        self.calls.append(list(sentences))
+        return super().encode(sentences, convert_to_numpy)
+
+
+def _settings(tmp_path, **overrides) -> Settings:
+    return Settings(
+        embeddings_file=write_chunks_file(tmp_path / "embeddings.jsonl"),
+        embedding_model_name="dummy",
+        deepseek_api_key=None,
+        **overrides,
+    )
+
+
+def test_importing_app_main_stays_light() -> None:
+    code = (
+        "import sys, time\n"
+        "started = time.perf_counter()\n"
+        "import app.main\n"
+        "print(time.perf_counter() - started)\n"
+        f"print(','.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))\n"
+    )
+    backend = Path(__file__).resolve().parents[1]
+    completed = subprocess.run(
+        [sys.executable, "-c", code], cwd=backend, capture_output=True, text=True, check=True
+    )
+    seconds, heavy = completed.stdout.splitlines()
+
+    assert heavy == ""
+    # Eager loading took several seconds; the lazy app imports in well under one.
+    assert float(seconds) < 3.0
+
+
+def test_lifespan_loads_and_warms_up_services(tmp_path, monkeypatch) -> None:
+    embedder = RecordingEmbedder()
+    monkeypatch.setattr(main, "get_embedding_model", lambda name: embedder)
+    app = main.create_app(_settings(tmp_path))
+
+    assert app.state.services.chat_service is None
+    with TestClient(app) as client:
+        ready = client.get("/ready")
+        warmup_calls = len(embedder.calls)
+        response = client.post("/chat", json={"query": "Operational excellence"})
+
+    assert ready.status_code == 200 and ready.json()["load_seconds"] >= 0
+    assert warmup_calls == 1
+    assert response.status_code == 200
+
+
+def test_background_load_reports_readiness(tmp_path, monkeypatch) -> None:
+    gate = threading.Event()
+
+    def slow_model(name):
+        gate.wait(5)
+        return RecordingEmbedder()
+
+    monkeypatch.setattr(main, "get_embedding_model", slow_model)
+    app = main.create_app(_settings(tmp_path, startup_background_load=True, startup_warmup=False))
+
+    with TestClient(app) as client:
+        assert client.get("/health").status_code == 200
+        loading = client.get("/ready")
+        refused = client.post("/chat", json={"query": "Operational excellence"})
+        gate.set()
+        deadline = time.monotonic() + 5
+        while client.get("/ready").status_code != 200 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        response = client.post("/chat", json={"query": "Operational excellence"})
+
+    assert loading.status_code == 503 and loading.json() == {"status": "loading"}
+    assert refused.status_code == 503 and refused.headers["Retry-After"] == "5"
+    assert response.status_code == 200
+
+
+def test_background_load_failure_is_reported(tmp_path, monkeypatch) -> None:
+    def broken_model(name):
+        raise OSError("model download failed")
+
+    monkeypatch.setattr(main, "get_embedding_model", broken_model)
+    app = main.create_app(_settings(tmp_path, startup_background_load=True))
+
+    with TestClient(app) as client:
+        deadline = time.monotonic() + 5
+        while app.state.services.error is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        ready = client.get("/ready")
+
+    assert ready.status_code == 503
+    assert ready.json() == {"status": "failed", "detail": "OSError: model download failed"}
+
+
+def test_chat_rejects_unknown_pillar(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(main, "get_embedding_model", lambda name: DummyEmbedder())
+    app = main.create_app(_settings(tmp_path, retrieval_top_k=1))
+
+    with TestClient(app) as client:
+        typo = client.post("/chat", json={"query": "Least privilege", "pillar": "Securty"})
+        lower = client.post("/chat", json={"query": "Least privilege", "pillar": "security"})
+
+    assert typo.status_code == 422
+    assert lower.status_code == 200 and lower.json()["sources"] == ["https://example.com/2"]
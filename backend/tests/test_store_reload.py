@@ -0,0 +1,233 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.config import Settings
+from app.retrieval.in_memory_store import InMemoryVectorStore
+from app.schemas import ChatRequest
+from app.services.chat_service import RetrievalAugmentedChatService, RetrievalIndex
+from app.services.store_reloader import StoreReloader
+
+from conftest import DummyEmbedder, write_chunks_file
+
+
+def _rewrite_sources(path, source: str) -> None:
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    for record in records:
+        record["source"] = source
+    path.write_text("".join(json.dumps(record) + "\n" for record in records))
+
+
+def _wait_for(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class BlockingStore:
+    """Store whose searches wait on `release`, to hold a request mid-retrieval."""
+
+    def __init__(self, store: InMemoryVectorStore) -> None:
+        self._store = store
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def search(self, *args, **kwargs):
+        self.entered.set()
+        self.release.wait(5)
+        return self._store.search(*args, **kwargs)
+
+
+def test_reloader_builds_once_per_reload_and_reports_status(tmp_path) -> None:
+    path = write_chunks_file(tmp_path / "embeddings.jsonl")
+    gate = threading.Event()
+    builds = []
+
+    def build():
+        builds.append(1)
+        if len(builds) > 1:
+            gate.wait(5)
+        return len(builds)
+
+    swapped = []
+    reloader = StoreReloader(path, build)
+    try:
+        assert reloader.load() == 1
+        reloader.start(swapped.append)
+
+        first, second = reloader.reload(), reloader.reload()
+        assert first is second and reloader.status()["reloading"] is True
+        gate.set()
+
+        assert first.result(5) == 2
+        status = reloader.status()
+    finally:
+        reloader.close()
+
+    assert swapped == [2]
+    assert len(builds) == 2
+    assert status["version"] == 2 and status["reloading"] is False
+    assert status["load_seconds"] >= 0 and status["loaded_at"]
+
+
+def test_reloader_keeps_serving_after_failed_build(tmp_path) -> None:
+    path = write_chunks_file(tmp_path / "embeddings.jsonl")
+    attempts = []
+
+    def build():
+        attempts.append(1)
+        if len(attempts) > 1:
+            raise ValueError("truncated file")
+        return "v1"
+
+    swapped = []
+    reloader = StoreReloader(path, build, watch_interval=0.02)
+    try:
+        reloader.load()
+        reloader.start(swapped.append)
+        path.write_text(path.read_text() + "\n")
+
+        assert _wait_for(lambda: reloader.last_error is not None)
+        time.sleep(0.2)  # the watcher must not retry an unchanged, known-bad file
+    finally:
+        reloader.close()
+
+    assert swapped == []
+    assert len(attempts) == 2
+    assert reloader.version == 1
+    assert reloader.status()["last_error"] == "ValueError: truncated file"
+
+
+def test_watcher_reloads_when_a_sidecar_lands(tmp_path) -> None:
+    path = write_chunks_file(tmp_path / "embeddings.jsonl")
+    sidecar = tmp_path / "embeddings.bm25.npz"
+    builds = []
+
+    def build():
+        builds.append(sidecar.exists())
+        return len(builds)
+
+    swapped = []
+    reloader = StoreReloader(path, build, watch_interval=0.02, sidecars=[sidecar])
+    try:
+        reloader.load()
+        reloader.start(swapped.append)
+        sidecar.write_bytes(b"postings")
+
+        assert _wait_for(lambda: reloader.version == 2)
+    finally:
+        reloader.close()
+
+    assert builds == [False, True]
+    assert swapped == [2]
+
+
+def test_in_flight_request_finishes_on_old_index(tmp_path) -> None:
+    path = write_chunks_file(tmp_path / "embeddings.jsonl")
+    old_store = BlockingStore(InMemoryVectorStore(path))
+    service = RetrievalAugmentedChatService(
+        settings=Settings(embeddings_file=path, retrieval_top_k=1, answer_cache_size=0),
+        embedder=DummyEmbedder(),
+        store=old_store,
+        llm_client=None,
+    )
+    request = ChatRequest(query="Operational excellence")
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        in_flight = executor.submit(service.answer, request)
+        assert old_store.entered.wait(5)
+        _rewrite_sources(path, "https://example.com/new")
+        previous = service.swap_index(RetrievalIndex(InMemoryVectorStore(path)))
+        old_store.release.set()
+        old_answer = in_flight.result(5)
+
+    assert previous.store is old_store
+    assert old_answer.sources == ["https://example.com/1"]
+    assert service.answer(request).sources == ["https://example.com/new"]
+
+
+@pytest.fixture
+def reload_app(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "get_embedding_model", lambda name: DummyEmbedder())
+    path = write_chunks_file(tmp_path / "embeddings.jsonl")
+    settings = Settings(
+        embeddings_file=path,
+        embedding_model_name="dummy",
+        deepseek_api_key=None,
+        retrieval_top_k=1,
+        store_watch_interval_seconds=0,
+        admin_token="s3cret",
+    )
+    return path, main.create_app(settings)
+
+
+def test_admin_reload_swaps_index_without_dropping_requests(reload_app) -> None:
+    path, app = reload_app
+    query = {"query": "Operational excellence"}
+
+    with TestClient(app) as client:
+        before = client.post("/chat", json=query).json()["sources"]
+        forbidden = client.post("/admin/reload", headers={"X-Admin-Token": "wrong"})
+        _rewrite_sources(path, "https://example.com/new")
+
+        stop = threading.Event()
+        statuses: list[int] = []
+
+        def hammer() -> None:
+            while not stop.is_set():
+                statuses.append(client.post("/chat", json=query).status_code)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            for _ in range(4):
+                executor.submit(hammer)
+            reloaded = client.post(
+                "/admin/reload", params={"wait": "true"}, headers={"X-Admin-Token": "s3cret"}
+            )
+            time.sleep(0.1)
+            stop.set()
+
+        after = client.post("/chat", json=query).json()["sources"]
+        status = client.get("/index/status").json()
+
+    assert forbidden.status_code == 403
+    assert before == ["https://example.com/1"]
+    assert reloaded.status_code == 200 and reloaded.json()["version"] == 2
+    assert after == ["https://example.com/new"]
+    assert statuses and set(statuses) == {200}
+    assert status["store"] == "memory" and status["chunks"] == 2 and status["version"] == 2
+    assert status["load_seconds"] >= 0 and status["last_error"] is None
+
+
+def test_watcher_picks_up_new_embeddings_file(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(main, "get_embedding_model", lambda name: DummyEmbedder())
+    path = tmp_path / "embeddings.jsonl"
+    app = main.create_app(
+        Settings(
+            embeddings_file=path,
+            embedding_model_name="dummy",
+            deepseek_api_key=None,
+            retrieval_top_k=1,
+            store_watch_interval_seconds=0.02,
+        )
+    )
+    query = {"query": "Operational excellence"}
+
+    with TestClient(app) as client:
+        missing = client.post("/chat", json=query).json()
+        write_chunks_file(tmp_path / "embeddings.jsonl")
+        assert _wait_for(lambda: client.get("/index/status").json()["version"] == 1)
+        loaded = client.post("/chat", json=query).json()
+
+    assert "loads the file as soon as it appears" in missing["answer"]
+    assert loaded["sources"] == ["https://example.com/1"]
@@ -0,0 +1,110 @@
+import asyncio
+import importlib
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import Settings, get_settings
+from app.retrieval.in_memory_store import InMemoryVectorStore
+from app.schemas import ChatRequest
+from app.services.chat_service import RetrievalAugmentedChatService
+from app.services.llm.together import AsyncTogetherClient, parse_stream_line
+
+from conftest import DummyEmbedder, write_chunks_file
+
+
+class StreamingLLM:
+    def __init__(self) -> None:
+        self.streams = 0
+
+    async def generate(self, prompt: str, *, system_prompt: str | None = None) -> str:
+        raise AssertionError("stream() should be preferred")
+
+    async def stream(self, prompt: str, *, system_prompt: str | None = None):
+        self.streams += 1
+        for token in ["Operational ", "excellence ", "matters."]:
+            await asyncio.sleep(0)
+            yield token
+
+    async def aclose(self) -> None:
+        pass
+
+
+async def _collect(events) -> list:
+    return [event async for event in events]
+
+
+def test_parse_stream_line() -> None:
+    chunk = {"choices": [{"delta": {"content": "Hi"}}]}
+    assert parse_stream_line("data: " + json.dumps(chunk)) == "Hi"
+    assert parse_stream_line("data: [DONE]") is None
+    assert parse_stream_line(": keep-alive") is None
+    assert parse_stream_line('data: {"choices": [{"delta": {}}]}') is None
+
+
+def test_async_client_streams_deltas() -> None:
+    body = "".join(
+        f"data: {json.dumps({'choices': [{'delta': {'content': token}}]})}\n\n" for token in ["a", "b"]
+    ) + "data: [DONE]\n\n"
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert json.loads(request.content)["stream"] is True
+        return httpx.Response(200, text=body, headers={"Content-Type": "text/event-stream"})
+
+    async def run() -> list[str]:
+        client = AsyncTogetherClient("key", transport=httpx.MockTransport(handler))
+        try:
+            return [delta async for delta in client.stream("prompt")]
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(run()) == ["a", "b"]
+
+
+def test_stream_answer_sends_sources_first_and_caches_answer(tmp_path) -> None:
+    chunks_file = write_chunks_file(tmp_path / "embeddings.jsonl")
+    llm = StreamingLLM()
+    service = RetrievalAugmentedChatService(
+        settings=Settings(embeddings_file=chunks_file, retrieval_top_k=1),
+        embedder=DummyEmbedder(),
+        store=InMemoryVectorStore(chunks_file),
+        llm_client=None,
+        async_llm_client=llm,
+    )
+    request = ChatRequest(query="Operational excellence")
+
+    events = asyncio.run(_collect(service.stream_answer(request)))
+
+    assert [event.event for event in events] == ["sources", "token", "token", "token", "done"]
+    assert events[0].data == ["https://example.com/1"]
+    assert "".join(event.data for event in events if event.event == "token") == "Operational excellence matters."
+
+    replay = asyncio.run(_collect(service.stream_answer(request)))
+    assert [event.event for event in replay] == ["sources", "token", "done"]
+    assert replay[1].data == "Operational excellence matters."
+    assert llm.streams == 1
+
+
+def test_chat_stream_endpoint_emits_server_sent_events(tmp_path, monkeypatch: pytest.MonkeyPatch) -> None:
+    chunks_file = write_chunks_file(tmp_path / "embeddings.jsonl")
+    monkeypatch.setenv("EMBEDDING_MODEL_NAME", "dummy")
+    get_settings.cache_clear()
+    main = importlib.import_module("app.main")
+    monkeypatch.setattr(main, "get_embedding_model", lambda name: DummyEmbedder())
+    app = main.create_app(
+        Settings(embeddings_file=chunks_file, embedding_model_name="dummy", deepseek_api_key=None)
+    )
+
+    with TestClient(app) as client:
+        response = client.post("/chat/stream", json={"query": "Operational excellence"})
+        rejected = client.post("/chat/stream", json={"query": "   "})
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    frames = [frame for frame in response.text.split("\n\n") if frame]
+    assert frames[0].startswith("event: sources\ndata: ")
+    assert frames[1].startswith("event: token\n")
+    assert frames[-1].startswith("event: done\n")
+    assert rejected.status_code == 400
+    get_settings.cache_clear()